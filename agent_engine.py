@@ -0,0 +1,901 @@
+# Начальные модули
+import itertools
+import numpy as np
+from distributions import draw_days
+from infection_tree import HOUSEHOLD, IMPORT, SCHOOL, SEED, SETTING_BY_ROLE, VISITOR
+from kernels import get_backend, RECOVERED_DECAY, VACCINATED_DECAY, SUSCEPTIBLE_THRESHOLD
+from models import HealthState, Parameters, SCHOOL_CONFIG, draw_immunity, duration_spec
+from shared_population import attach_static
+from strains import StrainPool
+from utils import Utils
+
+# Коды состояний в массиве state
+SUSCEPTIBLE = HealthState.SUSCEPTIBLE.value
+EXPOSED = HealthState.EXPOSED.value
+INFECTED = HealthState.INFECTED.value
+RECOVERED = HealthState.RECOVERED.value
+VACCINATED = HealthState.VACCINATED.value
+
+ROLES = ("student", "teacher")
+AGE_GROUPS = ("child", "teen", "adult")
+STUDENT, TEACHER = 0, 1
+
+# Таблицы Parameters в виде массивов по кодам ролей и возрастных групп
+AGE_SUSCEPTIBILITY = np.array([Parameters.AGE_SUSCEPTIBILITY.value[g] for g in AGE_GROUPS])
+ROLE_INFECTIVITY = np.array([Parameters.ROLE_INFECTIVITY.value[r] for r in ROLES])
+CONTACT_WEIGHT = np.array([
+    [Parameters.CONTACT_WEIGHT.value[(src, dst)] for dst in ROLES]
+    for src in ROLES
+])
+
+# Число учителей-предметников, как в Population
+SUBJECT_TEACHERS = 30
+
+# Среднее значение случайного множителя uniform(0.7, 1.0) из try_infect
+CONTACT_NOISE_MEAN = 0.85
+
+# На сколько дней вперёд хранятся запланированные начала болезни (см. expose)
+ONSET_HORIZON = 64
+
+# Группа получателя в канале _record_attributed: источник — из любой группы пула
+ANY_GROUP = -2
+
+# Дневной множитель антител по кодам состояний: убывают только у R и V (Person.update)
+ANTIBODY_DECAY = np.ones(VACCINATED + 1)
+ANTIBODY_DECAY[RECOVERED] = RECOVERED_DECAY
+ANTIBODY_DECAY[VACCINATED] = VACCINATED_DECAY
+
+
+def age_group_codes(age):
+    """Векторный аналог Person.age_group"""
+    return np.where(age <= 10, 0, np.where(age <= 18, 1, 2)).astype(np.int8)
+
+
+def sample_without_replacement(sizes, k, rng):
+    """
+    Для каждой строки — k различных индексов из range(sizes[i]).
+    Индексы, для которых k > sizes[i], помечаются -1 (как min(k, n) в random.sample)
+    """
+    sizes = np.asarray(sizes, dtype=np.int64)
+    picked = np.full((len(sizes), k), -1, dtype=np.int64)
+    u = rng.random((len(sizes), k))
+    for j in range(k):
+        valid = sizes > j
+        draw = (u[:, j] * np.maximum(sizes - j, 1)).astype(np.int64)
+        # сдвиг мимо уже выбранных индексов по возрастанию
+        for prev in np.sort(picked[:, :j], axis=1).T:
+            draw += (draw >= prev) & (prev >= 0)
+        picked[:, j] = np.where(valid, draw, -1)
+    return picked
+
+
+def sample_distinct(n, k, rng):
+    """
+    k различных индексов из range(n) по возрастанию за O(k), а не O(n), как
+    rng.choice(n, k, replace=False): повторы дотягиваются новыми числами.
+    Дотягивание — то же, что выбор без возвращения, поэтому выборка равномерна
+    """
+    if 2 * k > n:
+        return np.sort(rng.choice(n, k, replace=False))
+    idx = np.unique(rng.integers(0, n, k))
+    while len(idx) < k:
+        idx = np.unique(np.r_[idx, rng.integers(0, n, k - len(idx))])
+    return idx
+
+
+def expand_groups(ptr, members, groups):
+    """Все участники групп groups из CSR-индекса (ptr, members) и номер строки запроса"""
+    lengths = ptr[groups + 1] - ptr[groups]
+    owner = np.repeat(np.arange(len(groups)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return members[np.repeat(ptr[groups], lengths) + offsets], owner
+
+
+class VectorPopulation:
+    """
+    Популяция школы в виде массивов по агентам: та же структура, что у Population
+    (ученики по классам, классные руководители, предметники), но состояние,
+    счётчики и иммунитет хранятся в NumPy-массивах и обновляются целиком.
+    Иммунитет хранится по штаммам: antibody/memory имеют форму [агенты × штаммы]
+    и содержат уровень на день immunity_t0; текущий уровень — current_immunity
+    """
+
+    def __init__(self, config=SCHOOL_CONFIG, seed=None, strains=None, transmission="pairs",
+                 backend=None, static=None):
+        """
+        transmission — "pairs" (перебор контактов, как в Population) или
+        "foi" (сила инфекции по классам и пулам учителей, O(агентов) в день);
+        backend — ядра обновления и заражения: "numpy", "numba" или None (лучшее доступное);
+        static — путь к файлу shared_population.save_static или словарь attach_static:
+        статические массивы не строятся заново, а читаются из общего файла (config не нужен)
+        """
+        self.config = config
+        self.static = attach_static(static) if isinstance(static, str) else static
+        self.rng = np.random.default_rng(seed)
+        self.kernels = get_backend(backend)
+        self.strains = strains if strains is not None else StrainPool()
+        self.transmission = transmission
+        self.day = 0
+        self.timetable = None   # timetable.Timetable: контакты по слотам расписания вместо пар
+        self.external_force = None  # [штаммы]: заразность приходящих извне (см. sharding)
+        self.policy = None      # interventions.AgentPolicy: меры по расписанию и порогам
+        self.community = None   # community.CommunityLayer: семьи и завоз инфекции извне
+        self.pending_imports = None  # число завозов следующего дня, уже выбранное в fast_forward
+        self.recorder = None    # infection_tree.InfectionRecorder: журнал заражений
+
+        self._build()
+        self._init_state()
+
+    # ---------
+
+    def _build(self):
+        """Статические атрибуты агентов и индекс классов (CSR)"""
+        self.contact_weight = CONTACT_WEIGHT.copy()
+        if self.static is not None:
+            for name, value in self.static.items():
+                setattr(self, name, value)
+            return
+
+        class_ids = list(self.config["classes"])
+        sizes = np.array([self.config["classes"][c]["size"] for c in class_ids], dtype=np.int64)
+        n_classes = len(class_ids)
+        n_students = int(sizes.sum())
+
+        student_ages = []
+        for class_id in class_ids:
+            info = self.config["classes"][class_id]
+            age_min, age_max = Utils.age_range_for_grade(info["grade"])
+            student_ages.append(self.rng.integers(age_min, age_max + 1, info["size"]))
+
+        n_teachers = n_classes + SUBJECT_TEACHERS
+        teacher_ages = self.rng.integers(30, 61, n_teachers)
+
+        self.class_ids = class_ids
+        self.n_students = n_students
+        self.n = n_students + n_teachers
+
+        self.role = np.r_[np.full(n_students, STUDENT), np.full(n_teachers, TEACHER)].astype(np.int8)
+        self.age = np.concatenate(student_ages + [teacher_ages]).astype(np.int16)
+        self.age_group = age_group_codes(self.age)
+        self.class_idx = np.r_[
+            np.repeat(np.arange(n_classes), sizes),
+            np.arange(n_classes),
+            np.full(SUBJECT_TEACHERS, -1),
+        ].astype(np.int32)
+        self.is_homeroom = np.r_[
+            np.zeros(n_students, bool), np.ones(n_classes, bool), np.zeros(SUBJECT_TEACHERS, bool)
+        ]
+
+        # копии таблиц Parameters: их можно менять для одной популяции (см. sensitivity)
+        self.susceptibility = AGE_SUSCEPTIBILITY[self.age_group]
+        self.infectivity = ROLE_INFECTIVITY[self.role]
+
+        self.class_ptr = np.r_[0, np.cumsum(sizes)]
+        self.class_members = np.arange(n_students)
+        self.homeroom_of_class = n_students + np.arange(n_classes)
+        self.subject_teachers = np.arange(n_students + n_classes, self.n)
+        # группа для счётчиков начал болезни: класс ученика, учителя — последняя
+        self.onset_group = np.where(self.role == STUDENT, self.class_idx, n_classes)
+
+    def _init_state(self):
+        n = self.n
+        self.state = np.full(n, SUSCEPTIBLE, dtype=np.int8)
+        self.days_in_state = np.zeros(n, dtype=np.int16)
+        self.strain = np.zeros(n, dtype=np.int16)              # текущий или последний штамм
+        self.incubation_period = np.zeros(n, dtype=np.int16)
+        self.infectious_period = np.zeros(n, dtype=np.int16)
+
+        # индивидуальные параметры иммунитета — одна выборка на всю популяцию
+        immunity = draw_immunity(n, self.rng)
+        self.innate_strength = immunity["innate_strength"]
+        self.adaptive_delay = immunity["adaptive_delay"]
+        self.memory_decay_rate = immunity["memory_decay_rate"]
+        self.immunocompromised = immunity["immunocompromised"]
+
+        # начальный иммунитет относится к базовому штамму. Уровни записаны на день
+        # immunity_t0, убывание у R и V считается при чтении (current_immunity),
+        # а день перехода R -> S известен заранее: wane_day и корзины wane_buckets по дням
+        self.antibody = np.zeros((n, self.strains.capacity), dtype=np.float32)
+        self.memory = np.zeros((n, self.strains.capacity), dtype=np.float32)
+        self.immunity_t0 = np.zeros(n, dtype=np.int32)
+        self.wane_day = np.full(n, -1, dtype=np.int32)
+        self.wane_buckets = {}
+
+        # меры на текущий день: множитель весов контактов, присутствие в школе.
+        # present = открытый класс (class_present) и не сидит дома с симптомами;
+        # все стадии заражения смотрят только в present
+        n_classes = len(self.class_ids)
+        self.contact_scale = np.ones((len(ROLES), len(ROLES)))
+        self.class_closed = np.zeros(n_classes, dtype=bool)
+        self.class_present = np.ones(n, dtype=bool)
+        self.present = np.ones(n, dtype=bool)
+
+        # самоизоляция: доля соблюдающих и день болезни, с которого они дома
+        self.isolation_rate = 0.0
+        self.isolation_delay = 1
+        self.complies = np.zeros(n, dtype=bool)
+
+        # начала болезни по дням (кольцо) и классам; последний столбец — учителя
+        self.onsets = np.zeros((ONSET_HORIZON, n_classes + 1), dtype=np.int32)
+        self.antibody[:, 0] = immunity["antibody_level"]
+        self.memory[:, 0] = immunity["memory_strength"]
+
+    def _sync_strain_capacity(self):
+        """Расширяет столбцы иммунитета, если пул штаммов вырос"""
+        extra = self.strains.capacity - self.antibody.shape[1]
+        if extra > 0:
+            pad = np.zeros((self.n, extra), dtype=np.float32)
+            self.antibody = np.hstack([self.antibody, pad])
+            self.memory = np.hstack([self.memory, pad])
+
+    # ---------
+
+    def seed_infections(self, count=5, strain=0):
+        """Начальные заражённые среди учеников (с повторами, как random.choice)"""
+        idx = self.rng.integers(0, self.n_students, count)
+        self.state[idx] = INFECTED
+        self.days_in_state[idx] = 0
+        self.strain[idx] = strain
+        self.infectious_period[idx] = draw_days(
+            duration_spec("infectious_period"), len(idx), self.rng, self.strains.base_duration[strain]
+        )
+        if self.recorder is not None:
+            self._record(np.unique(idx), -1, SEED)
+
+    def expose(self, idx, strains):
+        """
+        Переводит агентов idx в EXPOSED штаммами strains; индивидуальные
+        длительности выбираются здесь же одной выборкой вокруг средних штамма.
+        День начала болезни известен сразу, поэтому счётчик onsets обновляется
+        здесь, без просмотра всей популяции
+        """
+        # повторное заражение в инкубации (мутация) отменяет прежний план
+        again = idx[self.state[idx] == EXPOSED]
+        self._schedule_onsets(again, -1)
+        # у R и V иммунитет перестаёт убывать — фиксируем уровень на сегодня
+        waning = idx[(self.state[idx] == RECOVERED) | (self.state[idx] == VACCINATED)]
+        self._materialize(waning, self.day)
+
+        self.state[idx] = EXPOSED
+        self.days_in_state[idx] = 0
+        self.strain[idx] = strains
+        self.incubation_period[idx] = draw_days(
+            duration_spec("incubation_period"), len(idx), self.rng, self.strains.time_incubation[strains]
+        )
+        self.infectious_period[idx] = draw_days(
+            duration_spec("infectious_period"), len(idx), self.rng, self.strains.base_duration[strains]
+        )
+        self._schedule_onsets(idx, 1)
+
+    def _schedule_onsets(self, idx, sign):
+        """Начало болезни — день заражения + инкубация - 1 (переход случается в update)"""
+        ahead = self.incubation_period[idx] - self.days_in_state[idx] - 1
+        day = self.day + np.clip(ahead, 0, ONSET_HORIZON - 1)
+        np.add.at(self.onsets, (day % ONSET_HORIZON, self.onset_group[idx]), sign)
+
+    def take_onsets(self):
+        """Начала болезни за текущий день по классам (+ учителя); слот кольца освобождается"""
+        slot = self.day % ONSET_HORIZON
+        today = self.onsets[slot].copy()
+        self.onsets[slot] = 0
+        return today
+
+    def set_closed_classes(self, closed):
+        """Ученики закрытых классов не приходят в школу"""
+        if np.array_equal(closed, self.class_closed):
+            return
+        self.class_closed = np.asarray(closed, dtype=bool).copy()
+        self.class_present = np.ones(self.n, dtype=bool)
+        self.class_present[self.class_members] = ~self.class_closed[self.class_idx[self.class_members]]
+
+    def set_isolation(self, rate, delay=1):
+        """
+        Заболевшие с симптомами остаются дома начиная с delay-го дня болезни;
+        соблюдающие (доля rate) выбираются один раз при изменении rate
+        """
+        self.isolation_delay = delay
+        if rate != self.isolation_rate:
+            self.isolation_rate = rate
+            self.complies = self.rng.random(self.n) < rate if rate > 0 else np.zeros(self.n, dtype=bool)
+
+    def update_presence(self):
+        """Маска присутствия на день: закрытые классы и самоизоляция, без циклов по агентам"""
+        present = self.class_present
+        if self.isolation_rate > 0:
+            isolated = self.complies & (self.state == INFECTED) & (self.days_in_state >= self.isolation_delay)
+            present = present & ~isolated
+        self.present = present
+
+    def absent_students(self):
+        return int(self.n_students - np.count_nonzero(self.present[:self.n_students]))
+
+    def weights(self):
+        """Веса контактов по ролям с учётом мер текущего дня"""
+        return self.contact_weight * self.contact_scale
+
+    def eligible(self, idx, strains):
+        """
+        Может ли агент idx заразиться штаммом strains: S и V — всегда,
+        R — только другим штаммом (перекрёстная защита учтена в вероятности)
+        """
+        state = self.state[idx]
+        return (
+            (state == SUSCEPTIBLE) | (state == VACCINATED)
+            | ((state == RECOVERED) & (self.strain[idx] != strains))
+        )
+
+    def random_infections(self, chance=0.002):
+        """
+        chance — вероятность заражения каждого человека вне контактов (базовым штаммом).
+        Выбирается биномиальное число агентов без повторов — без числа на каждого агента
+        """
+        count = self.rng.binomial(self.n, chance) if self.pending_imports is None else self.pending_imports
+        self.pending_imports = None
+        idx = sample_distinct(self.n, count, self.rng)
+        idx = idx[self.eligible(idx, 0)]
+        self.expose(idx, np.zeros(len(idx), dtype=np.int16))
+        self._record(idx, -1, IMPORT)
+        return idx
+
+    def _record(self, targets, sources, setting):
+        if self.recorder is not None:
+            self.recorder.add(self.day, sources, targets, setting)
+
+    def _record_attributed(self, targets, strains, pools, channels, setting=None):
+        """
+        Запись заражений от силы инфекции с источником, выбранным в два этапа.
+        pools — заразные по группам: (источники, группа источника, число групп);
+        channels — пути заражения: (коэффициент получателя, номер пула, группа
+        получателя: своя группа, ANY_GROUP — весь пул, -1 — путь ему не подходит).
+        Сначала путь — пропорционально коэффициенту × суммарной заразности
+        группы по штамму заражения, затем источник в группе — пропорционально
+        заразности; всё за O(заражённых + источников + групп) с одной сортировкой,
+        сам выбор — ядро backend'а (pick_sources).
+        Случайные числа — из генератора журнала, поэтому запись не меняет прогон.
+        setting=None — место по ролям источника и заражённого, как у пар контактов
+        """
+        if self.recorder is None or len(targets) == 0:
+            return
+        rng = self.recorder.rng
+        sizes = [n_groups for _, _, n_groups in pools]
+        offsets = [0, *itertools.accumulate(sizes)]
+        G = offsets[-1]
+        # ключ (штамм, пул, группа): группы пула одного штамма идут подряд.
+        # Пулы по классам уже упорядочены номерами агентов — тогда без сортировки
+        K = self.strains.count
+        key = np.concatenate([
+            (offset + group).astype(np.int64) if K == 1 else self.strain[sources].astype(np.int64) * G + offset + group
+            for (sources, group, _), offset in zip(pools, offsets)
+        ])
+        pool = np.concatenate([sources for sources, _, _ in pools])
+        if np.any(key[1:] < key[:-1]):
+            order = np.argsort(key, kind="stable")
+            key, pool = key[order], pool[order]
+        cumulative = np.zeros(len(pool) + 1)
+        np.cumsum(self.infectivity[pool], out=cumulative[1:])
+        bounds = np.searchsorted(key, np.arange(G * K + 1))
+
+        # диапазоны ключей [low, high) каждого пути [пути × заражённые]
+        n = len(targets)
+        coef = np.empty((len(channels), n))
+        group = np.empty((len(channels), n), dtype=np.int64)
+        for j, (c, _, g) in enumerate(channels):
+            coef[j], group[j] = c, g
+        first = np.array([offsets[p] for _, p, _ in channels])[:, None] + strains.astype(np.int64) * G
+        size = np.array([sizes[p] for _, p, _ in channels])[:, None]
+        low = first + np.maximum(group, 0)
+        high = np.where(group >= 0, low + 1, first + size * (group == ANY_GROUP))
+        pos = self.kernels.pick_sources(cumulative, bounds[low], bounds[high], coef, rng.random(n), rng.random(n))
+        found = pos >= 0
+        source = np.full(n, -1, dtype=np.int64)
+        source[found] = pool[pos[found]]
+
+        if setting is None:
+            setting = np.full(n, SCHOOL, dtype=np.int8)
+            setting[found] = SETTING_BY_ROLE[self.role[source[found]], self.role[targets[found]]]
+        self.recorder.add(self.day, source, targets, setting)
+
+    # ---------
+
+    def daily_contacts(self, sources):
+        """
+        Пары (источник, контакт) за день — векторный аналог Population.get_daily_contacts:
+        ученик — 3 одноклассника, классный руководитель и 2 предметника;
+        учитель — свой класс (если классный руководитель) и 2 случайных класса
+        """
+        rng = self.rng
+        src_parts, dst_parts = [], []
+
+        students = sources[self.role[sources] == STUDENT]
+        if len(students):
+            cls = self.class_idx[students]
+            sizes = self.class_ptr[cls + 1] - self.class_ptr[cls]
+            picks = sample_without_replacement(sizes, 3, rng)
+            ok = picks >= 0
+            rows = np.nonzero(ok)[0]
+            src_parts.append(students[rows])
+            dst_parts.append(self.class_members[self.class_ptr[cls[rows]] + picks[ok]])
+
+            src_parts.append(students)
+            dst_parts.append(self.homeroom_of_class[cls])
+
+            pool = self.subject_teachers
+            picks = sample_without_replacement(np.full(len(students), len(pool)), 2, rng)
+            ok = picks >= 0
+            src_parts.append(students[np.nonzero(ok)[0]])
+            dst_parts.append(pool[picks[ok]])
+
+        teachers = sources[self.role[sources] == TEACHER]
+        if len(teachers):
+            homeroom = teachers[self.is_homeroom[teachers]]
+            members, owner = expand_groups(self.class_ptr, self.class_members, self.class_idx[homeroom])
+            src_parts.append(homeroom[owner])
+            dst_parts.append(members)
+
+            n_classes = len(self.class_ids)
+            picks = sample_without_replacement(np.full(len(teachers), n_classes), 2, rng)
+            ok = picks >= 0
+            members, owner = expand_groups(self.class_ptr, self.class_members, picks[ok])
+            src_parts.append(teachers[np.nonzero(ok)[0]][owner])
+            dst_parts.append(members)
+
+        if not src_parts:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        return np.concatenate(src_parts), np.concatenate(dst_parts)
+
+    def transmit(self, src, dst):
+        """
+        Заражение по парам контактов: вероятность как в Population.try_infect,
+        с защитой от штамма источника через перекрёстный иммунитет.
+        Возвращает (заражённые, источники)
+        """
+        keep = (src != dst) & self.present[dst]
+        src, dst = src[keep], dst[keep]
+        strains = self.strain[src]
+        keep = self.eligible(dst, strains)
+        src, dst, strains = src[keep], dst[keep], strains[keep]
+        if len(src) == 0:
+            return dst, src
+
+        noise = self.rng.uniform(0.7, 1.0, len(src))  # немного случайности
+        u = self.rng.random(len(src))
+        k = self.strains.count
+        antibody, memory = self.current_immunity()
+        hit = self.kernels.contact_hits(
+            src, dst, strains, self.role, self.susceptibility, self.infectivity,
+            self.strains.infection_probability, self.weights(),
+            np.ascontiguousarray(self.strains.cross[:k, :k]),
+            antibody, memory, noise, u,
+        )
+        # первый успешный контакт определяет штамм
+        targets, first = np.unique(dst[hit], return_index=True)
+        sources = src[hit][first]
+        self.expose(targets, self.strain[sources])
+        if self.recorder is not None:
+            self._record(targets, sources, SETTING_BY_ROLE[self.role[sources], self.role[targets]])
+        return targets, sources
+
+    # ---------
+
+    def current_immunity(self, idx=slice(None), day=None):
+        """
+        Антитела и память агентов idx на начало дня day (по умолчанию текущего):
+        уровень на день immunity_t0, умноженный на дневной множитель состояния
+        в степени прошедших дней — у R это 0.97 и (1 - memory_decay_rate), у V 0.985
+        """
+        day = self.day if day is None else day
+        state = self.state[idx]
+        elapsed = day - self.immunity_t0[idx]
+        memory_decay = np.where(state == RECOVERED, 1 - self.memory_decay_rate[idx], 1.0)
+        antibody = self.antibody[idx] * (ANTIBODY_DECAY[state] ** elapsed).astype(np.float32)[:, None]
+        memory = self.memory[idx] * (memory_decay ** elapsed).astype(np.float32)[:, None]
+        return antibody, memory
+
+    def _materialize(self, idx, day):
+        """Записывает уровень idx на день day; вызывается перед сменой состояния и прибавками"""
+        self.antibody[idx], self.memory[idx] = self.current_immunity(idx, day)
+        self.immunity_t0[idx] = day
+
+    def _schedule_waning(self, idx):
+        """
+        День перехода R -> S: первый шаг j, после которого антитела к своему штамму
+        a × 0.97^j падают ниже порога, j = floor(log(порог / a) / log(0.97)) + 1.
+        Переход случается в update дня immunity_t0 - 1 + j
+        """
+        level = self.antibody[idx, self.strain[idx]].astype(float)
+        steps = np.floor(np.log(SUSCEPTIBLE_THRESHOLD / level) / np.log(RECOVERED_DECAY)) + 1
+        day = self.immunity_t0[idx] - 1 + np.maximum(steps, 1).astype(np.int32)
+        self.wane_day[idx] = day
+        for d in np.unique(day):
+            self.wane_buckets.setdefault(int(d), []).append(idx[day == d])
+
+    def _wane(self, day):
+        """Переходы R -> S, запланированные на день day; возвращает перешедших"""
+        parts = self.wane_buckets.pop(day, None)
+        if parts is None:
+            return np.zeros(0, dtype=np.int64)
+        # заразившиеся другим штаммом и выздоровевшие заново — уже с другим днём
+        idx = np.unique(np.concatenate(parts))
+        idx = idx[(self.state[idx] == RECOVERED) & (self.wane_day[idx] == day)]
+        self._materialize(idx, day + 1)
+        self.state[idx] = SUSCEPTIBLE
+        self.days_in_state[idx] = 0
+        self.wane_day[idx] = -1
+        return idx
+
+    def immunity_factor(self):
+        """[агенты × штаммы]: 1 - защита от каждого штамма с учётом перекрёстного иммунитета"""
+        pool = self.strains
+        antibody, memory = self.current_immunity()
+        factor = np.empty((self.n, pool.count))
+        for k in range(pool.count):
+            strains = np.full(self.n, k)
+            factor[:, k] = 1 - (
+                pool.protection(strains, antibody) * 0.7
+                + pool.protection(strains, memory) * 0.3
+            )
+        return factor
+
+    def eligible_matrix(self):
+        """[агенты × штаммы]: может ли агент заразиться штаммом (см. eligible)"""
+        state = self.state[:, None]
+        strains = np.arange(self.strains.count)[None, :]
+        return (
+            (state == SUSCEPTIBLE) | (state == VACCINATED)
+            | ((state == RECOVERED) & (self.strain[:, None] != strains))
+        )
+
+    def susceptible_factor(self):
+        """Восприимчивость × иммунитет × допустимость по штаммам, [агенты × штаммы]"""
+        return (
+            CONTACT_NOISE_MEAN * self.susceptibility[:, None]
+            * self.immunity_factor() * self.eligible_matrix()
+        )
+
+    def group_hazard(self, group_of, n_groups, contacts, susceptible_factor):
+        """
+        Интенсивность заражения [агенты × штаммы] за один слот по группам:
+        суммарная заразность инфицированных каждой группы считается один раз
+        (по ролям источника и штаммам), затем каждый член группы получает
+        contacts[g] / (размер группы - 1) × Σ_роль W[роль, роль получателя] × λ.
+        group_of — номер группы агента (-1 — агент в слоте отсутствует)
+        """
+        K = self.strains.count
+        present = (group_of >= 0) & self.present
+        infectious = np.flatnonzero(present & (self.state == INFECTED))
+        hazard = np.zeros((self.n, K))
+        if len(infectious) == 0:
+            return hazard
+
+        size = np.bincount(group_of[present], minlength=n_groups)
+        k = self.strain[infectious]
+        key = (group_of[infectious] * 2 + self.role[infectious]) * K + k
+        weight = self.infectivity[infectious] * self.strains.infection_probability[k]
+        force = np.bincount(key, weights=weight, minlength=n_groups * 2 * K).reshape(n_groups, 2, K)
+        # давление на получателя роли q: Σ_r W[r, q] λ[g, r, k]
+        pressure = np.einsum('rq,grk->gqk', self.weights(), force)
+        scale = np.asarray(contacts, dtype=float) / np.maximum(size - 1, 1)
+
+        members = np.flatnonzero(present)
+        g = group_of[members]
+        hazard[members] = (
+            scale[g, None] * pressure[g, self.role[members]] * susceptible_factor[members]
+        )
+        return hazard
+
+    def infect_from_hazard(self, hazard):
+        """
+        Одна бернуллиевская попытка на агента с p = 1 - exp(-Σ интенсивностей);
+        штамм заражения выбирается пропорционально вкладу каждого штамма
+        """
+        total = hazard.sum(axis=1)
+        candidates = np.flatnonzero(total > 0)
+        hit = candidates[self.rng.random(len(candidates)) < -np.expm1(-total[candidates])]
+
+        cumulative = np.cumsum(hazard[hit], axis=1)
+        u = self.rng.random(len(hit)) * cumulative[:, -1]
+        strains = (cumulative < u[:, None]).sum(axis=1).astype(np.int16)
+        self.expose(hit, strains)
+        return hit, strains
+
+    def contact_hazard(self, susceptible_factor, infectious=None):
+        """
+        Интенсивность заражения [агенты × штаммы] за день для контактов
+        get_daily_contacts без перебора пар: суммарная заразность считается
+        один раз на класс, классного руководителя и пул учителей, а каждый
+        получатель берёт ожидаемую долю контактов с каждой группой:
+        ученик выбирает 3 из m одноклассников (3/m), классный руководитель —
+        весь класс, любой учитель — 2 из C классов (2/C), ученик — своего
+        классного руководителя и 2 из P предметников (2/P).
+        infectious — присутствующие заразные, если уже известны
+        """
+        K = self.strains.count
+        n_classes = len(self.class_ids)
+        if infectious is None:
+            infectious = np.flatnonzero((self.state == INFECTED) & self.present)
+        hazard = np.zeros((self.n, K))
+        if len(infectious) == 0:
+            return hazard
+
+        k = self.strain[infectious]
+        weight = self.infectivity[infectious] * self.strains.infection_probability[k]
+        is_student = self.role[infectious] == STUDENT
+        cls = self.class_idx[infectious]
+
+        def total(mask, groups, n_groups):
+            return np.bincount(
+                groups[mask] * K + k[mask], weights=weight[mask], minlength=n_groups * K
+            ).reshape(n_groups, K)
+
+        class_force = total(is_student, cls, n_classes)
+        homeroom = ~is_student & self.is_homeroom[infectious]
+        homeroom_force = total(homeroom, cls, n_classes)
+        teacher_force = total(~is_student, np.zeros_like(cls), 1)[0]
+        student_force = class_force.sum(axis=0)
+
+        sizes = self.class_ptr[1:] - self.class_ptr[:-1]
+        classmates = np.minimum(3, sizes) / np.maximum(sizes, 1)
+        W = self.weights()
+
+        # ученики: от одноклассников, своего классного руководителя и учителей, выбравших класс
+        students = self.class_members
+        c = self.class_idx[students]
+        hazard[students] = (
+            W[STUDENT, STUDENT] * classmates[c, None] * class_force[c]
+            + W[TEACHER, STUDENT] * (homeroom_force[c] + min(2, n_classes) / n_classes * teacher_force)
+        )
+
+        # классные руководители: от учеников своего класса
+        teachers = self.homeroom_of_class
+        hazard[teachers] = W[STUDENT, TEACHER] * class_force[self.class_idx[teachers]]
+
+        # предметники: каждый заражённый ученик выбирает 2 из P
+        pool = len(self.subject_teachers)
+        if pool:
+            hazard[self.subject_teachers] = W[STUDENT, TEACHER] * min(2, pool) / pool * student_force
+
+        return hazard * susceptible_factor * self.present[:, None]
+
+    def contact_channels(self, targets, infectious):
+        """
+        Пулы и пути contact_hazard для _record_attributed: присутствующие
+        заразные infectious — ученики по классам и учителя (классные
+        руководители по классам и предметники отдельно)
+        """
+        is_student = self.role[infectious] == STUDENT
+        students, teachers = infectious[is_student], infectious[~is_student]
+        n_classes = len(self.class_ids)
+        # классные руководители — в группе своего класса, предметники — в отдельной
+        teacher_group = np.where(self.is_homeroom[teachers], self.class_idx[teachers], n_classes)
+        pools = [(students, self.class_idx[students], n_classes), (teachers, teacher_group, n_classes + 1)]
+
+        n_subject = len(self.subject_teachers)
+        sizes = self.class_ptr[1:] - self.class_ptr[:-1]
+        classmates = np.minimum(3, sizes) / np.maximum(sizes, 1)
+        W = self.weights()
+        student = self.role[targets] == STUDENT
+        in_class = student | self.is_homeroom[targets]
+        cls = self.class_idx[targets]
+        # от учеников: ученику — одноклассники, классному руководителю — его класс,
+        # предметнику — любой класс; от учителей — только ученикам
+        from_students = np.where(student, W[STUDENT, STUDENT] * classmates[np.maximum(cls, 0)], W[STUDENT, TEACHER])
+        from_students[~in_class] *= min(2, n_subject) / max(n_subject, 1)
+        channels = [
+            (from_students, 0, np.where(in_class, cls, ANY_GROUP)),
+            (W[TEACHER, STUDENT], 1, np.where(student, cls, -1)),
+            (W[TEACHER, STUDENT] * min(2, n_classes) / n_classes, 1, np.where(student, ANY_GROUP, -1)),
+        ]
+        return pools, channels
+
+    def visitor_hazard(self, force, susceptible_factor):
+        """
+        Интенсивность от заразных посетителей (учителей, работающих в нескольких
+        школах): каждый ведёт уроки в 2 из C классов, как учитель Population.
+        force — суммарная заразность посетителей по штаммам
+        """
+        n_classes = len(self.class_ids)
+        hazard = np.zeros((self.n, self.strains.count))
+        force = np.asarray(force)[:self.strains.count]
+        hazard[self.class_members] = self.weights()[TEACHER, STUDENT] * min(2, n_classes) / n_classes * force
+        return hazard * susceptible_factor * self.present[:, None]
+
+    def slot_transmission(self):
+        """Заражения за день по слотам расписания self.timetable"""
+        slots = self.timetable.slots(self.day)
+        if len(slots) == 0 or not np.any(self.state == INFECTED):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int16)
+
+        factor = self.susceptible_factor()
+        hazard = np.zeros((self.n, self.strains.count))
+        for index in slots:
+            hazard += self.group_hazard(*self.timetable.slot(index), factor)
+        return self.infect_from_hazard(hazard)
+
+    def slot_channels(self, targets):
+        """
+        Пулы и пути slot_transmission для _record_attributed: заразные каждого
+        слота дня по группам и ролям, коэффициент пути —
+        contacts[g] / (размер группы - 1) × W[роль источника, роль получателя]
+        """
+        W = self.weights()
+        pools, channels = [], []
+        for index in self.timetable.slots(self.day):
+            group_of, n_groups, contacts = self.timetable.slot(index)
+            present = (group_of >= 0) & self.present
+            infectious = np.flatnonzero(present & (self.state == INFECTED))
+            size = np.bincount(group_of[present], minlength=n_groups)
+            scale = np.asarray(contacts, dtype=float) / np.maximum(size - 1, 1)
+            group = np.where(present[targets], group_of[targets], -1)
+            pools.append((infectious, group_of[infectious] * 2 + self.role[infectious], 2 * n_groups))
+            for role in (STUDENT, TEACHER):
+                coef = scale[np.maximum(group, 0)] * W[role, self.role[targets]]
+                channels.append((coef, len(pools) - 1, np.where(group >= 0, group * 2 + role, -1)))
+        return pools, channels
+
+    def mutate(self, exposed):
+        """Мутации среди заражённых за день: число событий — биномиальное"""
+        pool = self.strains
+        if pool.mutation_rate <= 0 or len(exposed) == 0:
+            return []
+        events = self.rng.binomial(len(exposed), pool.mutation_rate)
+        new_strains = []
+        for agent in self.rng.choice(exposed, size=min(events, len(exposed)), replace=False):
+            k = pool.mutate(self.strain[agent], self.rng, day=self.day)
+            if k is None:
+                break
+            self._sync_strain_capacity()
+            self.expose(np.array([agent]), np.array([k], dtype=np.int16))
+            new_strains.append(k)
+        return new_strains
+
+    # ---------
+
+    def update(self):
+        """
+        Векторный аналог Person.update для всех агентов сразу: переходы E и I
+        ядром, затем запланированные на сегодня R -> S. Убывание иммунитета
+        не пересчитывается по дням, дни в R и V — day - immunity_t0
+        """
+        recovered = self.kernels.advance_states(
+            self.state, self.days_in_state, self.incubation_period, self.infectious_period,
+            self.strain, self.antibody, self.memory,
+        )
+        self.immunity_t0[recovered] = self.day + 1
+        self._schedule_waning(recovered)
+        self._wane(self.day)
+
+    def counts(self):
+        """Численности по состояниям в формате Population.step_day"""
+        c = np.bincount(self.state, minlength=VACCINATED + 1)
+        return {
+            "S": int(c[SUSCEPTIBLE]),
+            "E": int(c[EXPOSED]),
+            "I": int(c[INFECTED]),
+            "R": int(c[RECOVERED]),
+            "V": int(c[VACCINATED]),
+        }
+
+    def infected_by_strain(self):
+        infected = self.state == INFECTED
+        return np.bincount(self.strain[infected], minlength=self.strains.count)
+
+    def step_day(self):
+        # меры дня: вакцинация, карантины, каникулы и ограничения контактов
+        if self.policy is not None:
+            self.policy.apply(self)
+        self.update_presence()
+
+        imported = self.random_infections(chance=self.import_chance(self.day))
+
+        # заражения через контакты: по расписанию, по силе инфекции групп или по парам.
+        # Без заразных в школе иммунитет всей популяции не вычисляется
+        infectious = np.any(self.state == INFECTED)
+        if not self.contact_scale.any() or not infectious:
+            exposed = np.zeros(0, dtype=np.int64)
+        elif self.timetable is not None:
+            exposed, strains = self.slot_transmission()
+            if self.recorder is not None:
+                self._record_attributed(exposed, strains, *self.slot_channels(exposed))
+        elif self.transmission == "foi":
+            sources = np.flatnonzero((self.state == INFECTED) & self.present)
+            exposed, strains = self.infect_from_hazard(self.contact_hazard(self.susceptible_factor(), sources))
+            if self.recorder is not None:
+                self._record_attributed(exposed, strains, *self.contact_channels(exposed, sources))
+        else:
+            sources = np.flatnonzero((self.state == INFECTED) & self.present)
+            src, dst = self.daily_contacts(sources)
+            exposed, _ = self.transmit(src, dst)
+
+        # вечером и в выходные — контакты в семьях, в том числе у оставшихся дома
+        if self.community is not None and infectious:
+            at_home, strains = self.infect_from_hazard(self.community.household_hazard(self.susceptible_factor()))
+            if self.recorder is not None:
+                self._record_attributed(at_home, strains, *self.community.channels(at_home), HOUSEHOLD)
+            exposed = np.concatenate([exposed, at_home])
+
+        if self.external_force is not None and np.any(self.external_force > 0):
+            visited, _ = self.infect_from_hazard(self.visitor_hazard(self.external_force, self.susceptible_factor()))
+            self._record(visited, -1, VISITOR)
+            exposed = np.concatenate([exposed, visited])
+
+        new_strains = self.mutate(np.concatenate([imported, exposed]))
+
+        # обновляем состояния
+        self.update()
+        onsets = self.take_onsets()
+        self.day += 1
+
+        stats = self.counts()
+        stats["I_by_strain"] = self.infected_by_strain()
+        stats["new_strains"] = new_strains
+        stats["absent"] = self.absent_students()
+        stats["new_cases"] = int(onsets.sum())
+        if self.policy is not None:
+            stats["events"] = self.policy.observe(self, onsets)
+        return stats
+
+    # ---------
+
+    def import_chance(self, day):
+        return self.community.import_chance(day) if self.community is not None else 0.002
+
+    def decay_immunity(self, days):
+        """
+        days дней update без заражённых: иммунитет убывает сам (current_immunity),
+        остаются только запланированные переходы R -> S — обходятся только дни
+        с непустыми корзинами. Возвращает число переходов по дням
+        """
+        lost = np.zeros(days, dtype=np.int64)
+        for day in sorted(d for d in self.wane_buckets if self.day <= d < self.day + days):
+            lost[day - self.day] = len(self._wane(day))
+        return lost
+
+    def fast_forward(self, max_days):
+        """
+        Пропуск тихих дней (нет E и I) одним шагом: день следующего завоза
+        разыгрывается сразу на весь промежуток — при постоянной вероятности
+        геометрическим распределением, иначе одним массивом случайных чисел.
+        До него происходят только запланированные переходы R -> S (decay_immunity);
+        число завозов этого дня выбирается при условии, что оно не ноль.
+        Промежуток кончается перед первым днём вакцинации по расписанию мер.
+        Возвращает (пропущено дней, переходы R -> S по дням)
+        """
+        horizon = max_days
+        if self.policy is not None:
+            horizon = next((d for d in range(max_days) if self.policy.schedule.vaccination(self.day + d)), max_days)
+
+        # вероятность хотя бы одного завоза по дням промежутка
+        if self.community is None:
+            chance = self.import_chance(self.day)
+            p_any = -np.expm1(self.n * np.log1p(-chance))
+            skip = min(horizon, self.rng.geometric(p_any) - 1) if p_any > 0 else horizon
+        else:
+            chances = np.array([self.import_chance(self.day + d) for d in range(horizon)])
+            p_any = -np.expm1(self.n * np.log1p(-chances))
+            hits = np.flatnonzero(self.rng.random(horizon) < p_any)
+            skip = int(hits[0]) if len(hits) else horizon
+            chance = chances[skip] if skip < horizon else 0.0
+
+        if skip < horizon:
+            count = 0
+            while count == 0:
+                count = self.rng.binomial(self.n, chance)
+            self.pending_imports = count
+
+        lost = self.decay_immunity(skip) if skip else np.zeros(0, dtype=np.int64)
+        self.day += skip
+        return skip, lost
+
+    def vaccinate_population(self, rate=0.5, strain=0, role=None):
+        """role — STUDENT или TEACHER, чтобы прививать только одну группу"""
+        susceptible = self.state == SUSCEPTIBLE
+        if role is not None:
+            susceptible &= self.role == role
+        susceptible = np.flatnonzero(susceptible)
+        idx = self.rng.choice(susceptible, int(len(susceptible) * rate), replace=False)
+        self.state[idx] = VACCINATED
+        self.days_in_state[idx] = 0
+        self.immunity_t0[idx] = self.day
+        self.antibody[idx, strain] = np.minimum(1.0, self.antibody[idx, strain] + 0.6)
+        self.memory[idx, strain] = np.minimum(1.0, self.memory[idx, strain] + 0.4)
@@ -0,0 +1,193 @@
+# Начальные модули
+import math
+from statistics import NormalDist
+import numpy as np
+from models import MathematicalModel, virus
+
+# Окно R_t в днях и априорное Gamma(shape, scale) для R, как у Cori et al. (2013)
+RT_WINDOW = 7
+PRIOR_SHAPE = 1.0
+PRIOR_SCALE = 5.0
+RT_QUANTILES = (0.025, 0.975)
+
+# Коэффициент вариации серийного интервала
+SERIAL_INTERVAL_CV = 0.5
+
+# Добавка к случаям перед логарифмом в оценке скорости роста (дни без случаев)
+LOG_OFFSET = 0.5
+
+
+def serial_interval(mean=None, cv=SERIAL_INTERVAL_CV, max_days=None):
+    """
+    Дискретный серийный интервал w_s, s = 1..max_days: гамма со средним mean
+    (по умолчанию инкубация + половина заразного периода вируса), нормированная на 1
+    """
+    mean = virus.time_incubation + virus.base_duration / 2 if mean is None else mean
+    shape = 1 / cv ** 2
+    scale = mean / shape
+    max_days = max_days or int(np.ceil(mean * (1 + 4 * cv)))
+    x = np.arange(1, max_days + 1)
+    log_pdf = (shape - 1) * np.log(x) - x / scale - math.lgamma(shape) - shape * math.log(scale)
+    w = np.exp(log_pdf)
+    return w / w.sum()
+
+
+def gamma_quantile(shape, scale, q):
+    """Квантиль гамма-распределения по приближению Уилсона–Хилферти"""
+    z = NormalDist().inv_cdf(q)
+    c = 1 / (9 * np.asarray(shape, dtype=float))
+    return shape * scale * np.maximum(1 - c + z * np.sqrt(c), 0) ** 3
+
+
+def growth_coefficients(window):
+    """Веса МНК-наклона по window точкам: наклон = Σ c_k y_k"""
+    x = np.arange(window) - (window - 1) / 2
+    return x / np.sum(x ** 2)
+
+
+# =========================
+# ОЦЕНКИ ПО ВСЕМУ РЯДУ
+# =========================
+
+def infection_pressure(incidence, w):
+    """Λ_t = Σ_s I_{t-s} w_s — свёртка ряда случаев с серийным интервалом"""
+    return np.convolve(incidence, np.r_[0.0, w])[:len(incidence)]
+
+
+def rolling_sum(values, window):
+    return np.convolve(values, np.ones(window))[:len(values)]
+
+
+def cori_rt(incidence, w=None, window=RT_WINDOW, shape=PRIOR_SHAPE, scale=PRIOR_SCALE, quantiles=RT_QUANTILES):
+    """
+    R_t методом Cori: по окну из window дней, заканчивающемуся днём t,
+    апостериорное Gamma(shape + Σ I, 1 / (1/scale + Σ Λ)).
+    Возвращает (среднее, нижний, верхний квантиль); первые window дней — NaN
+    """
+    incidence = np.asarray(incidence, dtype=float)
+    w = serial_interval() if w is None else w
+    a = shape + rolling_sum(incidence, window)
+    b = 1 / (1 / scale + rolling_sum(infection_pressure(incidence, w), window))
+    mean, lower, upper = a * b, gamma_quantile(a, b, quantiles[0]), gamma_quantile(a, b, quantiles[1])
+    for series in (mean, lower, upper):
+        series[:window] = np.nan
+    return mean, lower, upper
+
+
+def growth_rate(incidence, window=RT_WINDOW):
+    """Скорость роста r (в день): наклон log(случаев) по окну window дней; первые window - 1 — NaN"""
+    y = np.log(np.asarray(incidence, dtype=float) + LOG_OFFSET)
+    r = np.convolve(y, growth_coefficients(window)[::-1])[:len(y)]
+    r[:window - 1] = np.nan
+    return r
+
+
+def doubling_time(rate):
+    """ln 2 / r: время удвоения в днях; отрицательное — время уменьшения вдвое, при r = 0 — inf"""
+    with np.errstate(divide="ignore"):
+        return np.log(2) / np.asarray(rate, dtype=float)
+
+
+def attack_rate(incidence, population_size):
+    """Доля заболевших нарастающим итогом"""
+    return np.cumsum(incidence) / population_size
+
+
+def estimate(incidence, population_size=None, w=None, window=RT_WINDOW):
+    """Все оценки по ряду дневных случаев (модели или orvi_cases.csv): словарь рядов по дням"""
+    incidence = np.asarray(incidence, dtype=float)
+    R, lower, upper = cori_rt(incidence, w, window)
+    r = growth_rate(incidence, window)
+    result = {"R_t": R, "R_lower": lower, "R_upper": upper, "growth_rate": r, "doubling_time": doubling_time(r)}
+    if population_size:
+        result["attack_rate"] = attack_rate(incidence, population_size)
+    return result
+
+
+def incidence_from_history(history, sigma=None):
+    """
+    Новые случаи по дням из истории модели: ряд new_cases, если он есть
+    (агентная модель и шарды), иначе переходы E -> I как sigma × exposed
+    предыдущего дня (SEIRS; sigma по умолчанию — MathematicalModel)
+    """
+    if "new_cases" in history:
+        return np.asarray(history["new_cases"], dtype=float)
+    sigma = MathematicalModel(1, 1).sigma if sigma is None else sigma
+    exposed = np.asarray(history["exposed"], dtype=float)
+    return sigma * np.r_[exposed[:1], exposed[:-1]]
+
+
+def history_population(history):
+    """Численность по первой записи истории"""
+    return sum(history[key][0] for key in ("healthy", "vaccinated", "exposed", "infected", "cured"))
+
+
+def analyze_history(history, w=None, window=RT_WINDOW):
+    if not history.get("exposed"):
+        return {}
+    return estimate(incidence_from_history(history), history_population(history), w, window)
+
+
+# =========================
+# ОЦЕНКИ ПО МЕРЕ ПОСТУПЛЕНИЯ ДНЕЙ
+# =========================
+
+class RtTracker:
+    """
+    Те же оценки, что estimate, но по одному дню: update(случаи дня) или
+    observe(запись дня модели, как day_record) за O(window + длина w) на день —
+    для живого графика и потока прогресса заданий
+    """
+
+    def __init__(self, population_size=None, w=None, window=RT_WINDOW, shape=PRIOR_SHAPE, scale=PRIOR_SCALE,
+                 sigma=None):
+        self.w = serial_interval() if w is None else np.asarray(w, dtype=float)
+        self.window = window
+        self.shape = shape
+        self.scale = scale
+        self.sigma = MathematicalModel(1, 1).sigma if sigma is None else sigma
+        self.population_size = population_size
+        self.coefficients = growth_coefficients(window)
+        # последние дни: случаи (recent[-1] — последний) и Λ
+        self.recent = np.zeros(max(len(self.w), window))
+        self.pressure = np.zeros(window)
+        self.day = 0
+        self.total = 0.0
+        self.previous_exposed = None
+
+    def update(self, cases):
+        """Добавляет случаи очередного дня; возвращает оценки на этот день"""
+        pressure = np.dot(self.recent[::-1][:len(self.w)], self.w)
+        self.recent = np.roll(self.recent, -1)
+        self.recent[-1] = cases
+        self.pressure = np.roll(self.pressure, -1)
+        self.pressure[-1] = pressure
+        self.total += cases
+        t = self.day
+        self.day += 1
+
+        result = {"day": t, "R_t": np.nan, "R_lower": np.nan, "R_upper": np.nan,
+                  "growth_rate": np.nan, "doubling_time": np.nan}
+        if t >= self.window:
+            a = self.shape + self.recent[-self.window:].sum()
+            b = 1 / (1 / self.scale + self.pressure.sum())
+            result["R_t"] = float(a * b)
+            result["R_lower"] = float(gamma_quantile(a, b, RT_QUANTILES[0]))
+            result["R_upper"] = float(gamma_quantile(a, b, RT_QUANTILES[1]))
+        if t >= self.window - 1:
+            r = float(np.dot(self.coefficients, np.log(self.recent[-self.window:] + LOG_OFFSET)))
+            result["growth_rate"] = r
+            result["doubling_time"] = float(doubling_time(r))
+        if self.population_size:
+            result["attack_rate"] = self.total / self.population_size
+        return result
+
+    def observe(self, record):
+        """Запись дня модели: new_cases или sigma × exposed предыдущего дня, как incidence_from_history"""
+        if self.population_size is None:
+            self.population_size = history_population({key: [value] for key, value in record.items()})
+        if "new_cases" in record:
+            return self.update(record["new_cases"])
+        exposed = record["exposed"] if self.previous_exposed is None else self.previous_exposed
+        self.previous_exposed = record["exposed"]
+        return self.update(self.sigma * exposed)
@@ -0,0 +1,215 @@
+# Начальные модули
+import numpy as np
+from interventions import MathPolicy
+from kernels import NUMBA_AVAILABLE
+from models import MathematicalModel
+from utils import Utils
+
+# Параметры MathematicalModel, которые можно задавать массивом по прогонам
+SEIRS_PARAMETERS = ("beta", "epsilon", "omega_v", "sigma", "gamma", "T_immunity")
+COMPARTMENTS = ("S", "V", "E", "I", "R")
+
+
+def default_parameters(population_size=1000, days=1):
+    """Значения параметров по умолчанию — как у MathematicalModel"""
+    model = MathematicalModel(population_size, days)
+    return {name: getattr(model, name) for name in SEIRS_PARAMETERS}
+
+
+def initial_state(population_size):
+    """Начальные условия MathematicalModel для массива численностей"""
+    N = np.asarray(population_size, dtype=float)
+    E = np.round(N * 0.03)
+    I = np.round(N * 0.05)
+    V = np.zeros_like(N)
+    return {"S": N - I - E - V, "V": V, "E": E, "I": I, "R": np.zeros_like(N)}
+
+
+def school_states(population, vaccinated=0, infected=None, exposed=None, recovered=0):
+    """
+    Начальные отсеки школ [школы × COMPARTMENTS] по численности и привитым
+    (например, из population.csv и vaccination.csv каждой школы); без infected
+    и exposed — доли MathematicalModel, 5% и 3% численности
+    """
+    N = np.asarray(population, dtype=float)
+    I = np.round(N * 0.05) if infected is None else infected
+    E = np.round(N * 0.03) if exposed is None else exposed
+    V, R = vaccinated, recovered
+    S = N - V - E - I - R
+    return np.stack(np.broadcast_arrays(S, V, E, I, R), axis=-1).astype(float)
+
+
+def calendar_factors(start_day, days):
+    """Сезонность, активность и кампания вакцинации — общие для всех прогонов"""
+    calendar = range(start_day, start_day + days)
+    template = MathematicalModel(1, days)
+    season = template.seasonal_factor(np.array(calendar))
+    activity = np.array([Utils.activity_factor(day) for day in calendar])
+    campaign = np.array([template.vaccination_campaign(day) for day in calendar])
+    return season, activity, campaign
+
+
+def seirs_step(S, V, E, I, R, N, beta, epsilon, omega_v, sigma, gamma, delta, season, activity, campaign):
+    """Один день MathematicalModel.run для массивов отсеков; возвращает (S, V, E, I, R, новые заболевшие)"""
+    new_vaccinations = campaign * S
+
+    effective_beta = beta * season * activity
+    imported_exposed = 0.3 * season
+
+    new_exposed = effective_beta * S * I / N
+    infected_vaccinated = epsilon * effective_beta * V * I / N
+    lost_immunity_v = omega_v * V
+    new_infected = sigma * E
+    new_recovered = gamma * I
+    back_to_susceptible = delta * R
+
+    S = np.maximum(S + back_to_susceptible - new_exposed - new_vaccinations + lost_immunity_v, 0)
+    V = np.maximum(V + new_vaccinations - infected_vaccinated - lost_immunity_v, 0)
+    E = np.maximum(E + new_exposed + infected_vaccinated - new_infected + imported_exposed, 0)
+    I = np.maximum(I + new_infected - new_recovered, 0)
+    R = np.maximum(R + new_recovered - back_to_susceptible, 0)
+    return S, V, E, I, R, new_infected
+
+
+def run_seirs_batch(params, days, population_size, initial=None, start_day=0, schedule=None):
+    """
+    Та же динамика, что в MathematicalModel.run, сразу для M наборов параметров:
+    params — словарь {имя: скаляр или массив [M]} (недостающие берутся по умолчанию),
+    population_size — скаляр или массив [M], initial — словарь начальных отсеков,
+    start_day — номер первого дня (для продолжения прогона с сохранённого состояния),
+    schedule — interventions.Schedule вместо выходных и кампании по умолчанию
+    (пороговые меры срабатывают в каждом прогоне отдельно).
+    Возвращает словарь {отсек: массив [M × days]}
+    """
+    values = default_parameters()
+    values.update(params)
+    size = np.broadcast(*[np.asarray(v) for v in values.values()], np.asarray(population_size)).shape
+    beta, epsilon, omega_v, sigma, gamma, T_immunity = (
+        np.broadcast_to(np.asarray(values[name], dtype=float), size) for name in SEIRS_PARAMETERS
+    )
+    delta = 1 / T_immunity
+    N = np.broadcast_to(np.asarray(population_size, dtype=float), size)
+
+    state = initial if initial is not None else initial_state(N)
+    S, V, E, I, R = (np.array(np.broadcast_to(state[c], size), dtype=float) for c in COMPARTMENTS)
+
+    # сезонность, активность и кампания не зависят от прогона — считаются один раз
+    season, activity, campaign = calendar_factors(start_day, days)
+    policy = MathPolicy(schedule, size) if schedule is not None else None
+
+    # дни — первая ось, чтобы запись за день была непрерывной
+    out = {c: np.empty((days,) + size) for c in COMPARTMENTS}
+    for day in range(days):
+        if policy is not None:
+            activity_today, campaign_today = policy.factors(start_day + day)
+        else:
+            activity_today, campaign_today = activity[day], campaign[day]
+        S, V, E, I, R, new_infected = seirs_step(
+            S, V, E, I, R, N, beta, epsilon, omega_v, sigma, gamma, delta,
+            season[day], activity_today, campaign_today,
+        )
+        if policy is not None:
+            policy.observe(start_day + day, new_infected)
+        for c, values_today in zip(COMPARTMENTS, (S, V, E, I, R)):
+            out[c][day] = values_today
+
+    return {c: np.moveaxis(values, 0, -1) for c, values in out.items()}
+
+
+# =========================
+# ШКОЛЫ ГОРОДА
+# =========================
+
+def seirs_schools_numpy(state, N, beta, epsilon, omega_v, sigma, gamma, delta, season, activity, campaign, out):
+    """Все школы одним векторным шагом seirs_step на день; out — [школы × дни × отсеки]"""
+    S, V, E, I, R = (state[:, k].copy() for k in range(len(COMPARTMENTS)))
+    # запись по дням непрерывна, перестановка осей — одна в конце
+    trajectory = np.empty((out.shape[1], len(COMPARTMENTS), len(state)))
+    for day in range(out.shape[1]):
+        S, V, E, I, R, _ = seirs_step(
+            S, V, E, I, R, N, beta, epsilon, omega_v, sigma, gamma, delta,
+            season[day], activity[day], campaign[day],
+        )
+        trajectory[day] = S, V, E, I, R
+    out[:] = trajectory.transpose(2, 0, 1)
+
+
+if NUMBA_AVAILABLE:
+    from numba import njit
+
+    @njit(cache=True)
+    def seirs_schools_numba(state, N, beta, epsilon, omega_v, sigma, gamma, delta, season, activity, campaign, out):
+        """То же, что seirs_schools_numpy, циклом по школам и дням без временных массивов"""
+        for i in range(state.shape[0]):
+            S, V, E, I, R = state[i, 0], state[i, 1], state[i, 2], state[i, 3], state[i, 4]
+            for day in range(out.shape[1]):
+                new_vaccinations = campaign[day] * S
+
+                effective_beta = beta[i] * season[day] * activity[day]
+                imported_exposed = 0.3 * season[day]
+
+                new_exposed = effective_beta * S * I / N[i]
+                infected_vaccinated = epsilon[i] * effective_beta * V * I / N[i]
+                lost_immunity_v = omega_v[i] * V
+                new_infected = sigma[i] * E
+                new_recovered = gamma[i] * I
+                back_to_susceptible = delta[i] * R
+
+                S = max(S + back_to_susceptible - new_exposed - new_vaccinations + lost_immunity_v, 0.0)
+                V = max(V + new_vaccinations - infected_vaccinated - lost_immunity_v, 0.0)
+                E = max(E + new_exposed + infected_vaccinated - new_infected + imported_exposed, 0.0)
+                I = max(I + new_infected - new_recovered, 0.0)
+                R = max(R + new_recovered - back_to_susceptible, 0.0)
+
+                out[i, day, 0] = S
+                out[i, day, 1] = V
+                out[i, day, 2] = E
+                out[i, day, 3] = I
+                out[i, day, 4] = R
+
+SCHOOL_KERNELS = {"numpy": seirs_schools_numpy}
+if NUMBA_AVAILABLE:
+    SCHOOL_KERNELS["numba"] = seirs_schools_numba
+
+
+def run_schools(initial, days, params=None, start_day=0, schedule=None, backend=None):
+    """
+    SEIRS сразу для всех школ города: initial — начальные отсеки [школы × COMPARTMENTS]
+    (см. school_states), численность школы — их сумма; params — {имя: скаляр или
+    массив [школы]}. Один цикл по дням (numpy) или по школам и дням (numba; по
+    умолчанию, если установлена). schedule без пороговых мер сводится к дневным
+    множителям; с пороговыми — прогон через run_seirs_batch.
+    Возвращает массив [школы × дни × COMPARTMENTS]
+    """
+    initial = np.ascontiguousarray(initial, dtype=float)
+    n = len(initial)
+    N = initial.sum(axis=1)
+    values = default_parameters()
+    values.update(params or {})
+    beta, epsilon, omega_v, sigma, gamma, T_immunity = (
+        np.ascontiguousarray(np.broadcast_to(np.asarray(values[name], dtype=float), (n,)))
+        for name in SEIRS_PARAMETERS
+    )
+
+    policy = MathPolicy(schedule, (n,)) if schedule is not None else None
+    if policy is not None and policy.school_triggers:
+        out = run_seirs_batch(params or {}, days, N, initial=dict(zip(COMPARTMENTS, initial.T)),
+                              start_day=start_day, schedule=schedule)
+        return np.stack([out[c] for c in COMPARTMENTS], axis=-1)
+
+    season, activity, campaign = calendar_factors(start_day, days)
+    if policy is not None:
+        factors = [policy.factors(start_day + day) for day in range(days)]
+        activity = np.array([a for a, _ in factors], dtype=float)
+        campaign = np.array([c for _, c in factors], dtype=float)
+
+    if backend is None:
+        backend = "numba" if NUMBA_AVAILABLE else "numpy"
+    if backend not in ("numpy", "numba"):
+        raise ValueError(f"Неизвестный backend: {backend}")
+    kernel = SCHOOL_KERNELS.get(backend, seirs_schools_numpy)
+
+    out = np.empty((n, days, len(COMPARTMENTS)))
+    kernel(initial, N, beta, epsilon, omega_v, sigma, gamma, 1 / T_immunity,
+           season.astype(float), activity.astype(float), campaign.astype(float), out)
+    return out
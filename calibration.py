@@ -1,7 +1,9 @@
 import matplotlib.pyplot as plt
 import csv
+import numpy as np
 from matplotlib.patches import Patch
 from models import MathematicalModel
+import analysis
 import json
 
 data, cases = [], []
@@ -46,6 +48,14 @@ for d, real, model in zip(data, cases, model_cases):
     print(f"{d:>4} | {real:>10} | {model:>6} | {real-model:>8}")
 print(math_model.beta)
 
+# R_t и время удвоения по реальным случаям
+estimates = analysis.estimate(cases, population)
+print("День | R_t (95%)          | Время удвоения (< 0 — уменьшения вдвое)")
+for d, R, lo, hi, td in zip(data, estimates["R_t"], estimates["R_lower"], estimates["R_upper"],
+                            estimates["doubling_time"]):
+    if np.isfinite(R):
+        print(f"{d:>4} | {R:.2f} ({lo:.2f}–{hi:.2f}) | {td:>8.1f}")
+
 fig, (ax1, ax2) = plt.subplots(
     2, 1,
     figsize=(10, 7),
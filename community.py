@@ -0,0 +1,99 @@
+# Начальные модули
+import numpy as np
+from agent_engine import CONTACT_NOISE_MEAN, INFECTED, STUDENT, TEACHER
+from utils import Utils
+
+# Число детей-учеников школы в одной семье: вероятности 1, 2, 3
+CHILDREN_PER_HOUSEHOLD = (0.5, 0.35, 0.15)
+
+
+def build_households(pop, rng, children=CHILDREN_PER_HOUSEHOLD, teacher_parent_share=0.3):
+    """
+    Синтетические семьи: ученики случайно группируются по 1–3 (братья и сёстры
+    из разных классов); доля teacher_parent_share учителей живёт в семье
+    кого-то из учеников, остальные — отдельно. Возвращает номер семьи каждого агента
+    """
+    students = np.flatnonzero(pop.role == STUDENT)
+    teachers = np.flatnonzero(pop.role == TEACHER)
+
+    sizes = rng.choice(np.arange(1, len(children) + 1), size=len(students), p=children)
+    sizes = sizes[:np.searchsorted(np.cumsum(sizes), len(students)) + 1]
+    n_families = len(sizes)
+    household = np.empty(pop.n, dtype=np.int64)
+    household[rng.permutation(students)] = np.repeat(np.arange(n_families), sizes)[:len(students)]
+
+    parent = rng.random(len(teachers)) < teacher_parent_share
+    household[teachers[parent]] = rng.integers(0, n_families, np.count_nonzero(parent))
+    household[teachers[~parent]] = n_families + np.arange(np.count_nonzero(~parent))
+    return household
+
+
+def prevalence_from_history(history, population_size):
+    """Доля заражённых по дням из истории MathematicalModel (или любой модели с ключом infected)"""
+    return np.asarray(history['infected'], dtype=float) / population_size
+
+
+class CommunityLayer:
+    """
+    Внешкольный слой VectorPopulation (pop.community):
+    контакты в семьях — вечером в учебные дни и больше в выходные и каникулы,
+    заражение по силе инфекции семьи, как в group_hazard, но без школьных мер
+    (заболевшие дома остаются источником для семьи);
+    завоз из города — вероятность на человека community_contacts × p × prevalence[day],
+    где prevalence — кривая доли заражённых в городе (например, prevalence_from_history).
+    Без кривой вероятность завоза постоянная, как random_infections(0.002)
+    """
+
+    def __init__(self, pop, prevalence=None, seed=None, evening_contacts=2.0, weekend_contacts=5.0,
+                 community_contacts=10.0, teacher_parent_share=0.3):
+        self.pop = pop
+        self.rng = np.random.default_rng(seed)
+        self.household = build_households(pop, self.rng, teacher_parent_share=teacher_parent_share)
+        self.n_households = int(self.household.max()) + 1
+        self.size = np.bincount(self.household, minlength=self.n_households)
+        self.prevalence = None if prevalence is None else np.asarray(prevalence, dtype=float)
+        self.evening_contacts = evening_contacts
+        self.weekend_contacts = weekend_contacts
+        self.community_contacts = community_contacts
+
+    def day_off(self, day):
+        """Выходной или каникулы: по расписанию мер, если оно задано, иначе по Utils.activity_factor"""
+        if self.pop.policy is not None:
+            return self.pop.policy.schedule.activity(day) < 1
+        return Utils.activity_factor(day) < 1
+
+    def import_chance(self, day):
+        if self.prevalence is None:
+            return 0.002
+        prevalence = self.prevalence[min(day, len(self.prevalence) - 1)]
+        p = self.pop.strains.infection_probability[0] * CONTACT_NOISE_MEAN
+        return min(1.0, self.community_contacts * p * prevalence)
+
+    def household_hazard(self, susceptible_factor):
+        """Интенсивность заражения в семьях [агенты × штаммы] за день"""
+        pop = self.pop
+        K = pop.strains.count
+        infectious = np.flatnonzero(pop.state == INFECTED)
+        hazard = np.zeros((pop.n, K))
+        if len(infectious) == 0:
+            return hazard
+
+        k = pop.strain[infectious]
+        weight = pop.infectivity[infectious] * pop.strains.infection_probability[k]
+        force = np.bincount(
+            self.household[infectious] * K + k, weights=weight, minlength=self.n_households * K
+        ).reshape(self.n_households, K)
+
+        contacts = self.weekend_contacts if self.day_off(pop.day) else self.evening_contacts
+        scale = contacts / np.maximum(self.size - 1, 1)
+        h = self.household
+        return scale[h, None] * force[h] * susceptible_factor
+
+    def channels(self, targets):
+        """Пулы и пути household_hazard для VectorPopulation._record_attributed: семьи"""
+        pop = self.pop
+        infectious = np.flatnonzero(pop.state == INFECTED)
+        contacts = self.weekend_contacts if self.day_off(pop.day) else self.evening_contacts
+        scale = contacts / np.maximum(self.size - 1, 1)
+        h = self.household
+        return [(infectious, h[infectious], self.n_households)], [(scale[h[targets]], 0, h[targets])]
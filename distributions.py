@@ -0,0 +1,36 @@
+# Начальные модули
+import numpy as np
+
+
+def draw(spec, size, rng, mean=None):
+    """
+    Векторная выборка size значений по описанию распределения из конфига.
+    spec — словарь {"distribution": ..., параметры}; mean — среднее по умолчанию
+    (скаляр или массив длины size), если в spec нет своего "mean".
+    Поддерживаются constant, uniform, bernoulli, gamma и lognormal (mean + cv)
+    """
+    kind = spec.get("distribution", "constant")
+    mean = spec.get("mean", mean)
+
+    if kind == "constant":
+        return np.broadcast_to(np.asarray(spec.get("value", mean), dtype=float), (size,)).copy()
+    if kind == "uniform":
+        return rng.uniform(spec["low"], spec["high"], size)
+    if kind == "bernoulli":
+        return rng.random(size) < spec["p"]
+
+    mean = np.asarray(mean, dtype=float)
+    cv = spec["cv"]
+    if kind == "gamma":
+        shape = 1 / cv ** 2
+        return rng.gamma(shape, mean / shape, size)
+    if kind == "lognormal":
+        sigma2 = np.log1p(cv ** 2)
+        return rng.lognormal(np.log(mean) - sigma2 / 2, np.sqrt(sigma2), size)
+
+    raise ValueError(f"Неизвестное распределение: {kind}")
+
+
+def draw_days(spec, size, rng, mean=None):
+    """Длительности в днях: округление и минимум 1 день"""
+    return np.maximum(1, np.rint(draw(spec, size, rng, mean))).astype(np.int16)
@@ -0,0 +1,272 @@
+# Начальные модули
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from agent_engine import VectorPopulation
+from models import AgentBasedModel
+from sensitivity import AGENT_BOUNDS, apply_agent_parameters, peak_outputs, scale
+
+# Параметры эмулятора по умолчанию: самые влиятельные для пика (см. sensitivity)
+EMULATOR_BOUNDS = {name: AGENT_BOUNDS[name] for name in
+                   ("infection_probability", "susceptibility_child", "weight_student_teacher")}
+
+# Пределы гиперпараметров GP: длины корреляции в единичном кубе и доля шума
+LENGTHSCALE_RANGE = (0.02, 20.0)
+NUGGET_RANGE = (1e-6, 1.0)
+
+
+def latin_hypercube(n, k, rng):
+    """n точек в [0, 1]^k: в каждом из n слоёв по каждой оси ровно одна точка"""
+    strata = np.argsort(rng.random((k, n)), axis=1).T
+    return (strata + rng.random((n, k))) / n
+
+
+def rbf(X1, X2, lengthscale):
+    d = (X1[:, None, :] - X2[None, :, :]) / lengthscale
+    return np.exp(-0.5 * np.sum(d * d, axis=-1))
+
+
+class GaussianProcess:
+    """
+    Гауссовский процесс с ядром RBF и своей длиной корреляции по каждой оси (ARD)
+    на точках единичного куба. Выход стандартизуется; известный шум точек
+    (дисперсия среднего по повторам) добавляется к диагонали, общий nugget
+    и длины подбираются по правдоподобию покоординатным поиском
+    """
+
+    def __init__(self, lengthscale=None, nugget=1e-3):
+        self.lengthscale = lengthscale
+        self.nugget = nugget
+
+    def _factor(self, X, z, noise, lengthscale, nugget):
+        K = rbf(X, X, lengthscale) + np.diag(noise + nugget + 1e-8)
+        L = np.linalg.cholesky(K)
+        Linv = np.linalg.inv(L)
+        alpha = Linv.T @ (Linv @ z)
+        log_likelihood = -0.5 * z @ alpha - np.log(np.diag(L)).sum()
+        return log_likelihood, Linv, alpha
+
+    def fit(self, X, y, noise=None, optimize=True):
+        self.X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.mean = y.mean()
+        self.scale = y.std() or 1.0
+        z = (y - self.mean) / self.scale
+        noise = np.zeros(len(y)) if noise is None else np.asarray(noise, dtype=float) / self.scale ** 2
+
+        theta = np.log(np.r_[
+            self.lengthscale if self.lengthscale is not None else np.full(self.X.shape[1], 0.3),
+            self.nugget,
+        ])
+        low = np.log(np.r_[np.full(self.X.shape[1], LENGTHSCALE_RANGE[0]), NUGGET_RANGE[0]])
+        high = np.log(np.r_[np.full(self.X.shape[1], LENGTHSCALE_RANGE[1]), NUGGET_RANGE[1]])
+
+        def score(theta):
+            try:
+                return self._factor(self.X, z, noise, np.exp(theta[:-1]), np.exp(theta[-1]))[0]
+            except np.linalg.LinAlgError:
+                return -np.inf
+
+        if optimize:
+            best = score(theta)
+            for step in (1.0, 0.5, 0.25, 0.125):
+                improved = True
+                while improved:
+                    improved = False
+                    for j in range(len(theta)):
+                        for sign in (1, -1):
+                            trial = theta.copy()
+                            trial[j] = np.clip(trial[j] + sign * step, low[j], high[j])
+                            value = score(trial)
+                            if value > best + 1e-9:
+                                theta, best, improved = trial, value, True
+
+        self.lengthscale, self.nugget = np.exp(theta[:-1]), float(np.exp(theta[-1]))
+        _, self.Linv, self.alpha = self._factor(self.X, z, noise, self.lengthscale, self.nugget)
+        return self
+
+    def predict(self, X):
+        """Среднее и стандартное отклонение скрытой функции в точках X [m × k]"""
+        k = rbf(np.atleast_2d(X), self.X, self.lengthscale)
+        v = k @ self.Linv.T
+        var = np.maximum(1 - np.sum(v * v, axis=1), 0)
+        return self.mean + self.scale * (k @ self.alpha), self.scale * np.sqrt(var)
+
+
+# =========================
+# ПРОГОНЫ АГЕНТНОЙ МОДЕЛИ
+# =========================
+
+def run_agent_curve(args):
+    """Один прогон в процессе пула: заражённые по дням (после раннего завершения — нули)"""
+    values, days, seed, transmission, static = args
+    pop = VectorPopulation(seed=seed, transmission=transmission, static=static)
+    apply_agent_parameters(pop, values)
+    model = AgentBasedModel(0, days, population=pop)
+    model.run(lambda msg: None)
+    curve = np.zeros(days)
+    curve[:len(model.history['infected'])] = model.history['infected']
+    return curve
+
+
+class AgentEmulator:
+    """
+    Суррогат агентной модели: по плану точек параметров (bounds) считаются
+    ансамбли из replicates прогонов, выходы — размер и день пика (среднее
+    по повторам) и коэффициенты главных компонент средней дневной кривой
+    заражённых. Каждый выход приближается GaussianProcess; ответ на запрос —
+    среднее и стандартное отклонение без прогонов модели. refine добавляет
+    прогоны там, где суррогат больше всего не уверен. static — путь к файлу
+    shared_population.save_static: все прогоны на одной школе с общими
+    для процессов статическими массивами
+    """
+
+    def __init__(self, bounds=None, days=200, replicates=4, n_components=3, seed=None, n_workers=None,
+                 transmission="foi", static=None):
+        self.bounds = dict(bounds or EMULATOR_BOUNDS)
+        self.names = list(self.bounds)
+        self.low = np.array([lo for lo, _ in self.bounds.values()])
+        self.high = np.array([hi for _, hi in self.bounds.values()])
+        self.days = days
+        self.replicates = replicates
+        self.n_components = n_components
+        self.transmission = transmission
+        self.static = static
+        self.n_workers = n_workers
+        self.rng = np.random.default_rng(seed)
+        self.seeds = np.random.SeedSequence(seed)
+        self.X = np.zeros((0, len(self.names)))
+        self.curves = np.zeros((0, days))            # средняя кривая точки
+        self.curve_var = np.zeros((0, days))         # дисперсия среднего по повторам
+        self.peaks = np.zeros((0, 2))                # средние пик и день пика
+        self.peak_var = np.zeros((0, 2))
+        self.models = {}
+
+    # ---------
+
+    def simulate(self, unit):
+        """Ансамбли прогонов в точках unit (единичный куб) в пуле процессов; добавляет их к данным"""
+        unit = np.atleast_2d(unit)
+        samples = scale(unit, self.bounds)
+        seeds = self.seeds.spawn(len(unit) * self.replicates)
+        tasks = []
+        for i, row in enumerate(samples):
+            values = {name: float(row[j]) for j, name in enumerate(self.names)}
+            for r in range(self.replicates):
+                tasks.append((values, self.days, seeds[i * self.replicates + r], self.transmission, self.static))
+        with ProcessPoolExecutor(max_workers=self.n_workers or os.cpu_count()) as pool:
+            runs = np.array(list(pool.map(run_agent_curve, tasks, chunksize=max(1, len(tasks) // 64))))
+        runs = runs.reshape(len(unit), self.replicates, self.days)
+
+        outputs = peak_outputs(runs.reshape(-1, self.days))
+        peaks = np.column_stack([outputs["peak"], outputs["peak_day"]]).reshape(len(unit), self.replicates, 2)
+        # дисперсия среднего по повторам; с одним повтором шум берёт на себя nugget
+        ddof = 1 if self.replicates > 1 else 0
+        self.X = np.vstack([self.X, unit])
+        self.curves = np.vstack([self.curves, runs.mean(axis=1)])
+        self.curve_var = np.vstack([self.curve_var, runs.var(axis=1, ddof=ddof) / self.replicates])
+        self.peaks = np.vstack([self.peaks, peaks.mean(axis=1)])
+        self.peak_var = np.vstack([self.peak_var, peaks.var(axis=1, ddof=ddof) / self.replicates])
+
+    def train(self, optimize=True):
+        """GP по всем собранным точкам: пик, день пика и коэффициенты главных компонент кривой"""
+        self.curve_mean = self.curves.mean(axis=0)
+        _, _, Vt = np.linalg.svd(self.curves - self.curve_mean, full_matrices=False)
+        self.components = Vt[:self.n_components]
+        coefficients = (self.curves - self.curve_mean) @ self.components.T
+        # шум коэффициента — проекция дисперсии кривой (дни считаются независимыми)
+        coefficient_var = self.curve_var @ (self.components ** 2).T
+
+        targets = {"peak": (self.peaks[:, 0], self.peak_var[:, 0]),
+                   "peak_day": (self.peaks[:, 1], self.peak_var[:, 1])}
+        for j in range(len(self.components)):
+            targets[f"pc{j}"] = (coefficients[:, j], coefficient_var[:, j])
+        for name, (y, noise) in targets.items():
+            model = self.models.get(name) if not optimize else None
+            model = model or GaussianProcess()
+            self.models[name] = model.fit(self.X, y, noise, optimize=optimize)
+        return self
+
+    def fit(self, n_points=40):
+        """План латинского гиперкуба из n_points точек, прогоны и обучение"""
+        self.simulate(latin_hypercube(n_points, len(self.names), self.rng))
+        return self.train()
+
+    # ---------
+
+    def to_unit(self, values):
+        """Параметры (словарь или массив [m × k] в единицах bounds) в точки единичного куба"""
+        if isinstance(values, dict):
+            values = np.column_stack(np.broadcast_arrays(*[np.asarray(values[name], dtype=float) for name in self.names]))
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+        return (values - self.low) / (self.high - self.low)
+
+    def predict(self, values, curve=True):
+        """
+        Прогноз суррогата: {выход: среднее, выход_std: отклонение} для peak и peak_day,
+        с curve — ещё средняя кривая заражённых [m × дни] и её отклонение
+        """
+        unit = self.to_unit(values)
+        result = {}
+        for name in ("peak", "peak_day"):
+            result[name], result[f"{name}_std"] = self.models[name].predict(unit)
+        if curve:
+            coefficients = np.empty((len(unit), len(self.components)))
+            coefficient_std = np.empty_like(coefficients)
+            for j in range(len(self.components)):
+                coefficients[:, j], coefficient_std[:, j] = self.models[f"pc{j}"].predict(unit)
+            result["curve"] = self.curve_mean + coefficients @ self.components
+            result["curve_std"] = np.sqrt((coefficient_std ** 2) @ (self.components ** 2))
+        return result
+
+    def refine(self, n_new=8, n_candidates=2000):
+        """
+        Активное обучение: из n_candidates случайных точек по очереди выбираются
+        n_new с наибольшей суммарной неопределённостью выходов (отклонения в долях
+        их разброса по данным). Выбранная точка временно считается известной —
+        её прогноз добавляется к данным, — чтобы следующие не собирались рядом.
+        Затем в выбранных точках считаются прогоны, и суррогат обучается заново
+        """
+        candidates = latin_hypercube(n_candidates, len(self.names), self.rng)
+        believers = {}
+        for name, model in self.models.items():
+            believers[name] = (GaussianProcess(model.lengthscale, model.nugget), model.X, model.predict(model.X)[0])
+        chosen = []
+        for _ in range(n_new):
+            spread = np.zeros(len(candidates))
+            for name, (gp, X, y) in believers.items():
+                gp.fit(X, y, optimize=False)
+                spread += (gp.predict(candidates)[1] / self.models[name].scale) ** 2
+            best = int(np.argmax(spread))
+            point = candidates[best:best + 1]
+            chosen.append(point[0])
+            for name, (gp, X, y) in believers.items():
+                believers[name] = (gp, np.vstack([X, point]), np.r_[y, gp.predict(point)[0]])
+            candidates = np.delete(candidates, best, axis=0)
+        self.simulate(np.array(chosen))
+        return self.train()
+
+    # ---------
+
+    def save(self, path='data/emulator/agent.npz'):
+        """Данные прогонов и гиперпараметры: загрузка не требует ни прогонов, ни подбора"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        meta = {"bounds": self.bounds, "days": self.days, "replicates": self.replicates,
+                "n_components": self.n_components, "transmission": self.transmission, "static": self.static,
+                "hyper": {name: {"lengthscale": m.lengthscale.tolist(), "nugget": m.nugget}
+                          for name, m in self.models.items()}}
+        np.savez(path, X=self.X, curves=self.curves, curve_var=self.curve_var, peaks=self.peaks,
+                 peak_var=self.peak_var, meta=json.dumps(meta))
+
+    @classmethod
+    def load(cls, path='data/emulator/agent.npz', seed=None):
+        data = np.load(path)
+        meta = json.loads(str(data["meta"]))
+        emulator = cls({name: tuple(b) for name, b in meta["bounds"].items()}, meta["days"], meta["replicates"],
+                       meta["n_components"], seed=seed, transmission=meta["transmission"], static=meta.get("static"))
+        for name in ("X", "curves", "curve_var", "peaks", "peak_var"):
+            setattr(emulator, name, data[name])
+        emulator.models = {name: GaussianProcess(np.array(h["lengthscale"]), h["nugget"])
+                           for name, h in meta["hyper"].items()}
+        return emulator.train(optimize=False)
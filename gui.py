@@ -1,16 +1,134 @@
 # Начальные модули
+import queue
+import threading
 import tkinter as tk
 from tkinter import scrolledtext, ttk, messagebox
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 from matplotlib.animation import FuncAnimation
+import numpy as np
+import analysis
+import plotting
 from models import AgentBasedModel, MathematicalModel, HybrydModel
+from structured_model import StructuredMathematicalModel
+from agent_engine import VectorPopulation
+from interventions import AgentPolicy, MathPolicy, Schedule, SCHEDULE_PATH
+from result_cache import ResultCache
+
+# Ряды истории: ключ, цвет, подпись
+SERIES = [
+    ('healthy', 'green', 'Здоровые'),
+    ('vaccinated', 'purple', 'Вакцинированные'),
+    ('exposed', 'orange', 'Подверженные'),
+    ('infected', 'red', 'Заражённые'),
+    ('cured', 'blue', 'Вылеченные'),
+]
+
+# Строка заражённых в массиве живого графика
+INFECTED_ROW = [key for key, _, _ in SERIES].index('infected')
+
+# Модели по названию в выпадающем списке
+MODEL_CLASSES = {
+    'Агентная': AgentBasedModel,
+    'Математическая': MathematicalModel,
+    'Структурированная': StructuredMathematicalModel,
+}
+
+# Маркер пика заражений
+PEAK_MARKER = dict(color='red', marker='o', linestyle='', markersize=8, label='Пик заражений')
+
+# Не больше стольких перерисовок живого графика в секунду
+LIVE_MAX_FPS = 10
+
+# Запас по оси Y живого графика, когда значение выходит за её предел
+LIVE_Y_HEADROOM = 1.25
+
+
+# Живой график: точки дописываются по мере расчёта модели
+class LiveChart():
+    def __init__(self, canvas, plot, lines, peak_marker, days):
+        self.canvas = canvas
+        self.plot = plot
+        self.lines = lines
+        self.peak_marker = peak_marker
+        self.x = np.arange(days)
+        self.data = np.zeros((len(SERIES), days))
+        self.n = 0
+        self.ymax = 0
+        self.peak_day = None
+        self.background = None
+        self.needs_full_draw = True
+
+        for artist in self.lines + [self.peak_marker]:
+            artist.set_animated(True)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def on_draw(self, event):
+        """После полной перерисовки запоминаем фон без линий"""
+        self.background = self.canvas.copy_from_bbox(self.plot.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        for artist in self.lines + [self.peak_marker]:
+            self.plot.draw_artist(artist)
+
+    def append(self, day, record):
+        """
+        Дописывает запись дня. Масштаб по Y — численность первой записи; если значение
+        её превысит (у MathematicalModel численность растёт с завозом), ось растягивается с запасом
+        """
+        if self.n >= len(self.x):
+            return
+        for row, (key, _, _) in enumerate(SERIES):
+            self.data[row, self.n] = record[key]
+
+        top = self.data[:, self.n].max()
+        if self.n == 0 or top > self.ymax:
+            total = sum(record[key] for key, _, _ in SERIES)
+            self.ymax = max(total if self.n == 0 else top * LIVE_Y_HEADROOM, 1)
+            self.plot.set_ylim(0, self.ymax)
+            self.needs_full_draw = True
+
+        infected_row = self.data[INFECTED_ROW]
+        if self.peak_day is None or infected_row[self.n] > infected_row[self.peak_day]:
+            self.peak_day = self.n
+        self.n += 1
+
+    def refresh(self):
+        for line, row in zip(self.lines, self.data):
+            line.set_data(self.x[:self.n], row[:self.n])
+        if self.peak_day is not None:
+            self.peak_marker.set_data([self.peak_day], [self.data[INFECTED_ROW, self.peak_day]])
+
+        if self.needs_full_draw or self.background is None:
+            self.needs_full_draw = False
+            self.canvas.draw()
+            return
+
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.plot.bbox)
+
+    def finish(self):
+        """Возвращает обычную отрисовку, чтобы итоговый график не зависел от фона"""
+        for artist in self.lines + [self.peak_marker]:
+            artist.set_animated(False)
+        self.refresh()
+        self.canvas.draw()
 
 # Графический интерфейс
 class GUI():
     def __init__(self, root):
         self.root = root
         self.animate_graph = tk.BooleanVar(value=True)
+        self.live_graph = tk.BooleanVar(value=False)
+        self.seed = tk.IntVar(value=0)     # seed агентной модели: один seed — один прогон, его можно кэшировать
+        self.sim = None
+        self.live_chart = None
+        self.updates = queue.Queue()
+        self.cache = ResultCache()
+        self.cache_key = None
+        self.history = None
         self.font = ('Segoe UI', 13)
         self.graph_canvas = None
         self.build_ui()
@@ -28,6 +146,14 @@ class GUI():
             variable=self.animate_graph,
             font=self.font
         ).pack(pady=10)
+        tk.Checkbutton(
+            top,
+            text="Живой график во время расчёта",
+            variable=self.live_graph,
+            font=self.font
+        ).pack(pady=10)
+        tk.Label(top, text="Seed агентной модели:", font=self.font).pack()
+        tk.Spinbox(top, from_=0, to=2**31 - 1, textvariable=self.seed, font=self.font, width=12).pack(pady=5)
 
         tk.Button(top, text="Закрыть", command=top.destroy).pack(pady=20)
 
@@ -66,7 +192,7 @@ class GUI():
             self.left_frame,
             textvariable=self.model_var,
             state='readonly',
-            values=['Выберите тип модели', 'Агентная', 'Математическая'],
+            values=['Выберите тип модели', 'Агентная', 'Математическая', 'Структурированная'],
             width=20,
             font=self.font
         )
@@ -92,6 +218,7 @@ class GUI():
         )
         self.chart_type_combobox.current(0)
         self.chart_type_combobox.grid(row=2, column=3, padx=(0, 5), pady=5, sticky='w')
+        self.chart_type_combobox.bind('<<ComboboxSelected>>', self.redraw_graph)
 
         # Кнопки
         tk.Button(
@@ -108,6 +235,13 @@ class GUI():
             command=self.open_advanced_settings
         ).grid(row=3, column=2, pady=10, padx=(10, 0))
 
+        tk.Button(
+            self.left_frame,
+            text="⏹ Остановить",
+            font=self.font,
+            command=self.stop_simulation
+        ).grid(row=3, column=3, pady=10, padx=(10, 0))
+
         # Лог
         self.log_output = scrolledtext.ScrolledText(
             self.left_frame, height=20, font=('Consolas', 11)
@@ -142,6 +276,10 @@ class GUI():
 
     # Старт симуляции
     def start_simulation(self):
+        if self.live_chart is not None:
+            messagebox.showwarning("Ошибка", "Симуляция уже выполняется!")
+            return
+
         try:
             population_size = int(self.population_entry.get().replace('.', ''))
             days = int(self.days_entry.get().replace('.', ''))
@@ -158,31 +296,167 @@ class GUI():
         self.log_output.delete(1.0, tk.END)
 
         # Выбор модели
-        if selected_model == 'Агентная':
-            self.sim = AgentBasedModel(population_size, days)
-        elif selected_model == 'Математическая':
-            self.sim = MathematicalModel(population_size, days)
-        else:
+        model_class = MODEL_CLASSES.get(selected_model)
+        if model_class is None:
             messagebox.showerror("Ошибка", "Выбранный тип модели не поддерживается!")
             return
 
+        # Меры по расписанию из data/interventions.json — для любой модели
+        try:
+            schedule = Schedule.load(SCHEDULE_PATH)
+            seed = self.seed.get() if model_class is AgentBasedModel else None
+        except (OSError, ValueError, KeyError, tk.TclError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось прочитать расписание мер или seed: {e}")
+            return
+
+        self.sim = self.build_model(model_class, population_size, days, schedule, seed)
+
+        # Готовый результат с теми же параметрами, расписанием и seed — без пересчёта
+        self.cache_key = ResultCache.key_for(self.sim, seed, SCHEDULE_PATH)
+        cached = self.cache.get(self.cache_key)
+        if cached is not None:
+            self.log_message("Результат взят из кэша.")
+            self.show_result(cached['history'], cached['peak_day'])
+            return
+
+        # Живой режим: модель считается в отдельном потоке, график дополняется по дням
+        if self.live_graph.get():
+            self.start_live_simulation(days)
+            return
+
         # Запуск модели
         self.sim.run(self.log_message)
-
-        if hasattr(self.sim, 'peak_day'):
-            self.peak_day = self.sim.peak_day
+        self.finish_simulation()
+
+    # Модель с мерами расписания: агентная — на VectorPopulation, которая применяет AgentPolicy
+    def build_model(self, model_class, population_size, days, schedule, seed=None):
+        if model_class is AgentBasedModel:
+            population = VectorPopulation(seed=seed)
+            population.policy = AgentPolicy(schedule)
+            return AgentBasedModel(population_size, days, population=population)
+        model = model_class(population_size, days)
+        model.policy = MathPolicy(schedule)
+        return model
+
+    # Итоги прогона: пик, кэш и график
+    def finish_simulation(self, draw=True):
+        # Остановленный прогон неполон — в кэш не попадает
+        if self.cache_key is not None and not self.sim.stop_requested:
+            self.cache.put(self.cache_key, {
+                'history': self.sim.history,
+                'peak_day': getattr(self.sim, 'peak_day', 0),
+                'max_infected': getattr(self.sim, 'max_infected', 0),
+            })
+        self.show_result(self.sim.history, getattr(self.sim, 'peak_day', None), draw)
+
+    # Пик, оценки и график по истории (свежего прогона или из кэша)
+    def show_result(self, history, peak_day=None, draw=True):
+        if peak_day is not None:
+            self.peak_day = peak_day
             self.log_message(f"День пика заражений: {self.peak_day}")
+        self.log_estimates(history)
 
         # Отрисовка графика
-        self.draw_graph(self.sim.history)
+        self.history = history
+        if draw:
+            self.draw_graph(self.history)
+
+    # Смена типа графика перерисовывает последний результат без пересчёта
+    def redraw_graph(self, event=None):
+        if self.history is not None and self.live_chart is None:
+            self.draw_graph(self.history)
+
+    # Запуск модели в фоне с живым графиком
+    def start_live_simulation(self, days):
+        fig, plot = self.prepare_canvas()
+        lines, peak_marker = self.setup_line_plot(plot, days, 1)
+        plot.legend()
+        self.live_chart = LiveChart(self.graph_canvas, plot, lines, peak_marker, days)
+        self.rt_tracker = analysis.RtTracker()
+
+        sim, updates = self.sim, self.updates
+
+        def worker():
+            try:
+                sim.run(
+                    lambda msg: updates.put(('log', msg)),
+                    lambda day, record: updates.put(('day', (day, record)))
+                )
+            except Exception as e:
+                updates.put(('error', f"{type(e).__name__}: {e}"))
+            finally:
+                updates.put(('done', None))
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(1000 // LIVE_MAX_FPS, self.poll_live_simulation)
+
+    # Разбор накопившихся записей и одна перерисовка за тик
+    def poll_live_simulation(self):
+        done = failed = False
+        while True:
+            try:
+                kind, payload = self.updates.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'log':
+                self.log_message(payload)
+            elif kind == 'day':
+                self.live_chart.append(*payload)
+                estimate = self.rt_tracker.observe(payload[1])
+                if np.isfinite(estimate['R_t']):
+                    self.log_message(
+                        f"R_t: {estimate['R_t']:.2f} ({estimate['R_lower']:.2f}–{estimate['R_upper']:.2f})"
+                    )
+            elif kind == 'error':
+                self.log_message(f"Ошибка расчёта: {payload}")
+                failed = True
+            else:
+                done = True
+
+        if not done:
+            self.live_chart.refresh()
+            self.root.after(1000 // LIVE_MAX_FPS, self.poll_live_simulation)
+            return
+
+        self.live_chart.finish()
+        self.live_chart = None
+        # Прогон с ошибкой неполон: без итогов и кэша
+        if not failed:
+            self.finish_simulation(draw=False)
+
+    # Остановка текущей симуляции
+    def stop_simulation(self):
+        if self.sim is not None:
+            self.sim.stop()
+
+    # R_t, время удвоения и доля заболевших на последний день
+    def log_estimates(self, history):
+        estimates = analysis.analyze_history(history)
+        if not estimates or not np.isfinite(estimates['R_t'][-1]):
+            return
+        doubling = estimates['doubling_time'][-1]
+        kind = "удвоения" if doubling > 0 else "уменьшения вдвое"
+        self.log_message(
+            f"R_t на последний день: {estimates['R_t'][-1]:.2f} "
+            f"({estimates['R_lower'][-1]:.2f}–{estimates['R_upper'][-1]:.2f}), "
+            f"время {kind}: {abs(doubling):.1f} дн., "
+            f"доля заболевших: {estimates['attack_rate'][-1]:.1%}"
+        )
 
     # Вывод в лог
     def log_message(self, msg):
         self.log_output.insert(tk.END, msg + '\n')
         self.log_output.see(tk.END)
 
-    # Отрисовка графика
-    def draw_graph(self, history):
+    # Ширина канвы в пикселях: столько точек имеет смысл рисовать
+    def canvas_width(self, fig):
+        width = self.graph_canvas.get_tk_widget().winfo_width()
+        if width <= 1:
+            width = int(fig.get_figwidth() * fig.dpi)
+        return width
+
+    # Подготовка канвы вместо заглушки или прошлого графика
+    def prepare_canvas(self):
         if hasattr(self, 'graph_placeholder') and self.graph_placeholder:
             self.graph_placeholder.pack_forget()
             self.graph_placeholder = None
@@ -190,63 +464,78 @@ class GUI():
         if self.graph_canvas:
             self.graph_canvas.get_tk_widget().destroy()
 
-        chart_type = self.chart_type_var.get()
         fig = Figure(figsize=(6, 4), dpi=100)
         plot = fig.add_subplot(111)
 
-        # Подготовка канвы
         self.graph_canvas = FigureCanvasTkAgg(fig, master=self.right_frame)
         canvas_widget = self.graph_canvas.get_tk_widget()
         canvas_widget.pack(fill='both', expand=True)
+        return fig, plot
+
+    # Оси, линии и маркер пика линейного графика
+    def setup_line_plot(self, plot, n_days, ymax):
+        plot.set_xlim(0, n_days)
+        plot.set_ylim(0, ymax)
+        plot.set_xlabel('Дни')
+        plot.set_ylabel('Люди')
+        plot.set_title('Симуляция')
+        plot.grid(True, linestyle='--', alpha=0.5)
+
+        peak_marker, = plot.plot([], [], **PEAK_MARKER)
+        lines = [plot.plot([], [], color=color, label=label)[0] for _, color, label in SERIES]
+        return lines, peak_marker
+
+    # Отрисовка графика
+    def draw_graph(self, history, ensemble=None):
+        """
+        history — словарь рядов модели по дням,
+        ensemble — необязательный словарь {ключ: [прогоны × дни]} для полос квантилей
+        """
+        chart_type = self.chart_type_var.get()
+        fig, plot = self.prepare_canvas()
+        width = self.canvas_width(fig)
 
         # Берём данные
-        days = list(range(len(history['infected'])))
-        healthy = history['healthy']
-        vaccinated = history['vaccinated']
-        exposed = history['exposed']
-        infected = history['infected']
-        cured = history['cured']
+        series = {key: np.asarray(history[key], dtype=float) for key, _, _ in SERIES}
+        days = np.arange(len(series['infected']))
 
         # Линейный график с анимацией
         if chart_type == "Линейный":
-            plot.set_xlim(0, len(days))
-            plot.set_ylim(0, max(healthy + vaccinated + exposed + infected + cured))
-            plot.set_xlabel('Дни')
-            plot.set_ylabel('Люди')
-            plot.set_title('Симуляция')
-            plot.grid(True, linestyle='--', alpha=0.5)
+            ymax = max(values.max(initial=0) for values in series.values())
+            lines, peak_marker = self.setup_line_plot(plot, len(days), ymax)
 
             peak_day_idx = self.peak_day - 1 if hasattr(self, 'peak_day') else None
             if peak_day_idx is not None:
-                peak_value = infected[peak_day_idx]
-                plot.plot(peak_day_idx, peak_value, 'ro', markersize=8, label='Пик заражений')
+                peak_value = series['infected'][peak_day_idx]
+                peak_marker.set_data([peak_day_idx], [peak_value])
 
-            line_h, = plot.plot([], [], color='green', label='Здоровые')
-            line_v, = plot.plot([], [], color='purple', label='Вакцинированные')
-            line_e, = plot.plot([], [], color='orange', label='Подверженные')
-            line_i, = plot.plot([], [], color='red', label='Заражённые')
-            line_c, = plot.plot([], [], color='blue', label='Вылеченные')
+            # Полосы ансамбля
+            for key, color, _ in SERIES:
+                if ensemble is None or key not in ensemble:
+                    continue
+                lower, median, upper = plotting.quantile_bands(ensemble[key])
+                band_x, band_lo, band_hi = plotting.envelope(np.arange(len(median)), lower, upper, width)
+                plot.fill_between(band_x, band_lo, band_hi, color=color, alpha=0.2, linewidth=0)
 
-            plot.legend()
+            # Прореживание до ширины канвы
+            curves = [plotting.lttb(days, series[key], width) for key, _, _ in SERIES]
 
+            plot.legend()
 
             if self.animate_graph.get():  # <<< проверка галочки
-                # Обновление кадров
-                def update(frame):
-                    line_h.set_data(days[:frame], healthy[:frame])
-                    line_v.set_data(days[:frame], vaccinated[:frame])
-                    line_e.set_data(days[:frame], exposed[:frame])
-                    line_i.set_data(days[:frame], infected[:frame])
-                    line_c.set_data(days[:frame], cured[:frame])
-
-                    return line_h, line_v, line_e, line_i, line_c
-
-                # Запуск анимации
+                # Обновление кадров: кадр — последний показанный день
+                def update(end_day):
+                    for line, (x, y) in zip(lines, curves):
+                        k = np.searchsorted(x, end_day)
+                        line.set_data(x[:k], y[:k])
+                    return lines
+
+                # Запуск анимации фиксированной длительности
                 self.animation = FuncAnimation(
                     fig,
                     update,
-                    frames=len(days) + 1,
-                    interval=40,
+                    frames=plotting.animation_frames(len(days)),
+                    interval=plotting.FRAME_INTERVAL_MS,
                     blit=True,
                     repeat=False
                 )
@@ -254,22 +543,14 @@ class GUI():
                 self.graph_canvas.draw()
                 return
             else:
-                line_h.set_data(days, healthy)
-                line_v.set_data(days, vaccinated)
-                line_e.set_data(days, exposed)
-                line_i.set_data(days, infected)
-                line_c.set_data(days, cured)
+                for line, (x, y) in zip(lines, curves):
+                    line.set_data(x, y)
 
                 self.graph_canvas.draw()
                 return
         # Круговая диаграмма
         elif chart_type == "Круговой":
-            sizes = [
-                sum(history['healthy']) / len(history['healthy']),
-                sum(history['exposed']) / len(history['exposed']),
-                sum(history['infected']) / len(history['infected']),
-                sum(history['cured']) / len(history['cured']),
-            ]
+            sizes = [series[key].mean() for key in ('healthy', 'exposed', 'infected', 'cured')]
             labels = ['Здоровые', 'Подверженные', 'Заражённые', 'Вылеченные']
             plot.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90,
                      colors=['green', 'orange', 'red', 'blue'])
@@ -277,16 +558,18 @@ class GUI():
 
         # Столбчатая диаграмма
         elif chart_type == "Столбчатый":
-            days_idx = list(range(1, len(healthy) + 1))
-
-            plot.bar(days_idx, healthy, label='Здоровые', color='green')
-            plot.bar(days_idx, exposed, bottom=healthy, label='Подверженные', color='orange')
-            plot.bar(days_idx, infected,
-                     bottom=[healthy[i] + exposed[i] for i in range(len(days_idx))],
-                     label='Заражённые', color='red')
-            plot.bar(days_idx, cured,
-                     bottom=[healthy[i] + exposed[i] + infected[i] for i in range(len(days_idx))],
-                     label='Вылеченные', color='blue')
+            # Не больше одного столбца на 3 пикселя: длинные истории усредняются по корзинам
+            layers = [(key, color, label) for key, color, label in SERIES if key != 'vaccinated']
+            n_bars = max(1, width // 3)
+            means = []
+            for key, _, _ in layers:
+                mean, starts, sizes = plotting.bucket_mean(series[key], n_bars)
+                means.append(mean)
+            bottoms = plotting.stacked_offsets(means)
+            bars_x = starts + sizes / 2 + 0.5
+
+            for (key, color, label), height, bottom in zip(layers, means, bottoms):
+                plot.bar(bars_x, height, width=sizes, bottom=bottom, label=label, color=color)
 
             plot.legend()
             plot.set_xlabel("Дни")
@@ -294,4 +577,4 @@ class GUI():
             plot.set_title("Столбчатая диаграмма")
             plot.grid(axis='y', linestyle='--', alpha=0.5)
 
-        self.graph_canvas.draw()
\ No newline at end of file
+        self.graph_canvas.draw()
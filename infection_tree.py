@@ -0,0 +1,182 @@
+# Начальные модули
+import os
+import json
+import numpy as np
+
+# Запись журнала заражений: день, источник (-1 — неизвестен), заражённый, место
+RECORD_DTYPE = np.dtype([("day", np.int32), ("source", np.int32), ("target", np.int32), ("setting", np.int8)])
+
+# Места заражения. school — заражение в школе, источник которого не найден
+SETTINGS = ("seed", "import", "classmates", "teacher_to_student", "student_to_teacher",
+            "teacher_to_teacher", "school", "household", "visitor")
+(SEED, IMPORT, CLASSMATES, TEACHER_TO_STUDENT, STUDENT_TO_TEACHER,
+ TEACHER_TO_TEACHER, SCHOOL, HOUSEHOLD, VISITOR) = range(len(SETTINGS))
+
+# Место контакта по ролям (источник, заражённый), как Parameters.CONTACT_WEIGHT
+ROLE_SETTING = {
+    ("student", "student"): CLASSMATES,
+    ("teacher", "student"): TEACHER_TO_STUDENT,
+    ("student", "teacher"): STUDENT_TO_TEACHER,
+    ("teacher", "teacher"): TEACHER_TO_TEACHER,
+}
+# то же по кодам ролей агентного движка (0 — ученик, 1 — учитель)
+SETTING_BY_ROLE = np.array([
+    [ROLE_SETTING[(src, dst)] for dst in ("student", "teacher")]
+    for src in ("student", "teacher")
+], dtype=np.int8)
+
+
+class InfectionRecorder:
+    """
+    Журнал заражений (кто кого, когда и где) для Population и VectorPopulation
+    (атрибут recorder; None — запись выключена). Записи копятся в заранее
+    выделенном массиве RECORD_DTYPE, который растёт удвоением. С path полные
+    блоки по chunk_size записей дописываются в двоичный файл с JSON-заголовком
+    рядом, как DailyStream, и в памяти остаётся только текущий блок.
+    rng — генератор для выбора источника заражений от силы инфекции
+    (VectorPopulation): свой, чтобы запись не меняла ход прогона
+    """
+
+    def __init__(self, path=None, chunk_size=65536, capacity=1024, seed=0):
+        self.path = path
+        self.rng = np.random.default_rng(seed)
+        self.chunk_size = chunk_size
+        self.buffer = np.empty(chunk_size if path is not None else capacity, dtype=RECORD_DTYPE)
+        self.filled = 0
+        self.written = 0
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            open(path, 'wb').close()
+
+    def _reserve(self, count):
+        if self.filled + count > len(self.buffer):
+            grown = np.empty(max(2 * len(self.buffer), self.filled + count), dtype=RECORD_DTYPE)
+            grown[:self.filled] = self.buffer[:self.filled]
+            self.buffer = grown
+
+    def add(self, day, sources, targets, setting):
+        """Заражения одного дня: sources и setting — массивы той же длины, что targets, или числа"""
+        count = len(targets)
+        if count == 0:
+            return
+        self._reserve(count)
+        block = self.buffer[self.filled:self.filled + count]
+        block["day"] = day
+        block["source"] = sources
+        block["target"] = targets
+        block["setting"] = setting
+        self.filled += count
+        if self.path is not None and self.filled >= self.chunk_size:
+            self.flush()
+
+    def add_one(self, day, source, target, setting):
+        """Одно заражение (объектная Population)"""
+        self._reserve(1)
+        self.buffer[self.filled] = (day, source, target, setting)
+        self.filled += 1
+        if self.path is not None and self.filled >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.path is None:
+            return
+        with open(self.path, 'ab') as f:
+            self.buffer[:self.filled].tofile(f)
+        self.written += self.filled
+        self.filled = 0
+        with open(self.path + '.json', 'w', encoding='utf-8') as f:
+            json.dump({"count": self.written, "settings": list(SETTINGS)}, f)
+
+    def records(self):
+        """Все записи: из памяти или (с path) memmap файла после flush"""
+        if self.path is None:
+            return self.buffer[:self.filled]
+        self.flush()
+        return read_tree(self.path)
+
+
+def read_tree(path):
+    with open(path + '.json', 'r', encoding='utf-8') as f:
+        header = json.load(f)
+    if header["count"] == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', shape=(header["count"],))
+
+
+# =========================
+# ОЦЕНКИ ПО ЖУРНАЛУ
+# =========================
+
+def infector_record(records):
+    """
+    Для каждой записи — номер записи заражения её источника (последнего
+    до этого дня, с учётом повторных заражений); -1, если источник неизвестен.
+    Если заражения от контактов есть, но источник не известен ни у одного,
+    оценки по журналу бессмысленны — ValueError
+    """
+    day = records["day"].astype(np.int64)
+    source = records["source"].astype(np.int64)
+    contact = (records["setting"] != SEED) & (records["setting"] != IMPORT)
+    if np.any(contact) and not np.any(source >= 0):
+        raise ValueError("В журнале нет ни одного известного источника заражения")
+    span = int(day.max()) + 2 if len(day) else 1
+    key = records["target"].astype(np.int64) * span + day
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+
+    parent = np.full(len(records), -1, dtype=np.int64)
+    known = np.flatnonzero(source >= 0)
+    # заражение источника — раньше или в тот же день (начальные заражённые заразны сразу)
+    pos = np.searchsorted(sorted_key, source[known] * span + day[known], side="right") - 1
+    valid = pos >= 0
+    valid[valid] = sorted_key[pos[valid]] // span == source[known][valid]
+    parent[known[valid]] = order[pos[valid]]
+    return parent
+
+
+def secondary_cases(records, parent=None):
+    """Число вторичных заражений от каждого записанного заражения"""
+    parent = infector_record(records) if parent is None else parent
+    return np.bincount(parent[parent >= 0], minlength=len(records))
+
+
+def offspring_distribution(records, until=None):
+    """
+    Распределение числа вторичных случаев: доля заражений с 0, 1, 2, ... потомками.
+    until — учитывать только заражённых до этого дня (у поздних потомки ещё не все)
+    """
+    offspring = secondary_cases(records)
+    if until is not None:
+        offspring = offspring[records["day"] < until]
+    counts = np.bincount(offspring)
+    return counts / max(counts.sum(), 1)
+
+
+def generation_intervals(records, parent=None):
+    """Дни между заражением источника и заражением от него"""
+    parent = infector_record(records) if parent is None else parent
+    child = np.flatnonzero(parent >= 0)
+    return records["day"][child] - records["day"][parent[child]]
+
+
+def case_reproduction_number(records, days=None):
+    """
+    R_t по дню заражения: среднее число вторичных случаев у заразившихся в день t.
+    Источники от силы инфекции выбраны пропорционально вкладу в интенсивность,
+    поэтому R_t точна в среднем, а не по отдельным цепочкам; для последних
+    дней занижена — их вторичные случаи ещё впереди. Возвращает (дни, R_t, заражений)
+    """
+    offspring = secondary_cases(records)
+    day = records["day"]
+    if days is None:
+        days = int(day.max()) + 1 if len(day) else 0
+    cases = np.bincount(day, minlength=days)[:days]
+    total = np.bincount(day, weights=offspring, minlength=days)[:days]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.arange(days), total / cases, cases
+
+
+def setting_breakdown(records):
+    """Число заражений по местам"""
+    counts = np.bincount(records["setting"], minlength=len(SETTINGS))
+    return {name: int(c) for name, c in zip(SETTINGS, counts)}
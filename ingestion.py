@@ -0,0 +1,263 @@
+# Начальные модули
+import os
+import csv
+import json
+import time
+import numpy as np
+from batch_ode import default_parameters, initial_state, run_seirs_batch, COMPARTMENTS
+
+# Начальные условия сезона, как в calibration.py
+CALIBRATION_INITIAL = {"I": 87, "V": 356, "E": 20}
+
+
+def read_population(path='data/school/population.csv', group='students'):
+    with open(path, 'r', encoding='UTF-8') as f:
+        for row in csv.DictReader(f):
+            if row['group'] == group:
+                return int(row['count'])
+    raise ValueError(f"В {path} нет группы {group}")
+
+
+def read_vaccinated(path='data/school/vaccination.csv', group='total'):
+    """Число привитых группы из vaccination.csv (колонка vaccinated_percent хранит число людей)"""
+    with open(path, 'r', encoding='UTF-8') as f:
+        for row in csv.DictReader(f):
+            if row['group'] == group:
+                return int(row['vaccinated_percent'])
+    raise ValueError(f"В {path} нет группы {group}")
+
+
+# =========================
+# ХРАНИЛИЩЕ
+# =========================
+
+class CaseStore:
+    """
+    Колоночное хранилище дневных случаев: массивы date (datetime64[D])
+    и new_cases (int32) в одном .npz, отсортированные по дате
+    """
+
+    def __init__(self, path='data/store/cases.npz'):
+        self.path = path
+        if os.path.exists(path):
+            with np.load(path) as data:
+                self.date = data['date']
+                self.new_cases = data['new_cases']
+        else:
+            self.date = np.array([], dtype='datetime64[D]')
+            self.new_cases = np.array([], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.date)
+
+    def append(self, dates, cases):
+        """
+        Добавляет записи; повтор даты с другим значением считается исправлением.
+        Возвращает даты, которых раньше не было
+        """
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        cases = np.asarray(cases, dtype=np.int32)
+        new_dates = np.setdiff1d(dates, self.date)
+
+        # последние значения побеждают: сначала старые, потом новые
+        all_dates = np.concatenate([self.date, dates])
+        all_cases = np.concatenate([self.new_cases, cases])
+        reverse = np.arange(len(all_dates))[::-1]
+        unique, first = np.unique(all_dates[reverse], return_index=True)
+        self.date = unique
+        self.new_cases = all_cases[reverse][first]
+        self.save()
+        return new_dates
+
+    def daily(self):
+        """
+        Ряд по календарю без пропусков от первой до последней даты:
+        (даты, случаи float с NaN в днях, которых нет в хранилище)
+        """
+        if len(self.date) == 0:
+            return self.date, np.array([], dtype=float)
+        calendar = np.arange(self.date[0], self.date[-1] + 1)
+        cases = np.full(len(calendar), np.nan)
+        cases[(self.date - self.date[0]).astype(np.int64)] = self.new_cases
+        return calendar, cases
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp.npz'
+        np.savez(tmp, date=self.date, new_cases=self.new_cases)
+        os.replace(tmp, self.path)
+
+
+def read_cases_csv(path):
+    """
+    Дневные случаи из CSV формата orvi_cases.csv (колонки data, new_cases).
+    Возвращает (даты, случаи, ошибки); строки с ошибками пропускаются
+    """
+    dates, cases, errors = [], [], []
+    with open(path, 'r', encoding='UTF-8') as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or not {'data', 'new_cases'} <= set(reader.fieldnames):
+            return dates, cases, [f"{path}: нет колонок data, new_cases"]
+        for n, row in enumerate(reader, 2):
+            try:
+                date = np.datetime64(row['data'].strip(), 'D')
+                value = int(row['new_cases'])
+                if value < 0:
+                    raise ValueError("отрицательное число случаев")
+            except (ValueError, AttributeError, TypeError) as e:
+                errors.append(f"{path}:{n}: {e}")
+                continue
+            dates.append(date)
+            cases.append(value)
+    return dates, cases, errors
+
+
+class DirectoryWatcher:
+    """
+    Следит за каталогом CSV: отдаёт новые и изменённые файлы, помня (mtime, size).
+    Файл считается просмотренным только после mark — упавший файл придёт снова
+    """
+
+    def __init__(self, directory='data/incoming', state_path='data/store/watcher.json'):
+        self.directory = directory
+        self.state_path = state_path
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                self.seen = json.load(f)
+        except FileNotFoundError:
+            self.seen = {}
+        self.pending = {}
+
+    def poll(self):
+        if not os.path.isdir(self.directory):
+            return []
+        changed = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.csv'):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            signature = [stat.st_mtime, stat.st_size]
+            if self.seen.get(name) != signature:
+                changed.append(name)
+                self.pending[name] = signature
+        return [os.path.join(self.directory, name) for name in changed]
+
+    def mark(self, path):
+        """Файл из poll обработан"""
+        name = os.path.basename(path)
+        self.seen[name] = self.pending.pop(name)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        with open(self.state_path, 'w', encoding='utf-8') as f:
+            json.dump(self.seen, f)
+
+
+# =========================
+# ДООБУЧЕНИЕ И ПРОГНОЗ
+# =========================
+
+class IncrementalFitter:
+    """
+    Подбор beta математической модели по наблюдаемым случаям (как в calibration.py,
+    наблюдение сравнивается с отсеком I; дни без данных — NaN — пропускаются). Все кандидаты считаются одним
+    векторным прогоном; следующий подбор начинается от прошлого beta
+    с узкой сеткой, а прогноз продолжается с сохранённого состояния последнего дня
+    """
+
+    def __init__(self, population_size, initial=CALIBRATION_INITIAL, grid=21,
+                 spans=(0.5, 0.1, 0.02)):
+        if not spans:
+            raise ValueError("Нужен хотя бы один шаг сетки spans")
+        self.population_size = population_size
+        self.initial = initial_state(population_size)
+        self.initial.update({c: float(v) for c, v in initial.items()})
+        self.grid = grid
+        self.spans = spans
+        self.beta = None
+        self.end_state = None
+        self.n_days = 0
+
+    def fit(self, observed):
+        """
+        Возвращает beta и ошибку; при тёплом старте первый, самый широкий шаг
+        пропускается (если шаг один — остаётся он)
+        """
+        observed = np.asarray(observed, dtype=float)
+        known = ~np.isnan(observed)
+        spans = self.spans if self.beta is None else (self.spans[1:] or self.spans[-1:])
+        beta = self.beta if self.beta is not None else default_parameters()['beta']
+
+        for span in spans:
+            candidates = beta * np.linspace(1 - span, 1 + span, self.grid)
+            out = run_seirs_batch({'beta': candidates}, len(observed), self.population_size,
+                                  initial=self.initial)
+            error = np.mean((out['I'][:, known] - observed[known]) ** 2, axis=1)
+            best = int(np.argmin(error))
+            beta = float(candidates[best])
+
+        self.beta = beta
+        self.n_days = len(observed)
+        self.end_state = {c: out[c][best, -1] for c in COMPARTMENTS}
+        return beta, float(np.sqrt(error[best]))
+
+    def forecast(self, horizon):
+        """Прогноз I на horizon дней после последнего наблюдения"""
+        out = run_seirs_batch({'beta': self.beta}, horizon, self.population_size,
+                              initial=self.end_state, start_day=self.n_days)
+        return out['I']
+
+
+class IngestionPipeline:
+    """Один проход: новые файлы -> проверка -> хранилище -> дообучение -> прогноз"""
+
+    def __init__(self, store=None, watcher=None, fitter=None, horizon=7, log_callback=print):
+        self.store = store or CaseStore()
+        self.watcher = watcher or DirectoryWatcher()
+        self.fitter = fitter or IncrementalFitter(read_population())
+        self.horizon = horizon
+        self.log = log_callback
+
+    def run_once(self):
+        """Возвращает отчёт или None, если новых дней нет"""
+        new_dates = np.array([], dtype='datetime64[D]')
+        for path in self.watcher.poll():
+            try:
+                dates, cases, errors = read_cases_csv(path)
+            except (OSError, UnicodeDecodeError, csv.Error) as e:
+                self.log(f"Не прочитан {path}: {e}")
+                continue
+            for error in errors:
+                self.log(f"Пропущено: {error}")
+            if dates:
+                new_dates = np.union1d(new_dates, self.store.append(dates, cases))
+            self.watcher.mark(path)
+        self.watcher.save()
+
+        if len(new_dates) == 0:
+            return None
+
+        # пропуски в датах остаются пропусками, а не сдвигают ряд
+        calendar, observed = self.store.daily()
+        if np.isnan(observed).any():
+            self.log(f"Дней без данных: {int(np.isnan(observed).sum())}")
+        beta, rmse = self.fitter.fit(observed)
+        forecast = self.fitter.forecast(self.horizon)
+        last = calendar[-1]
+        self.log(f"Новых дней: {len(new_dates)}, всего: {len(self.store)}; beta={beta:.4f}, RMSE={rmse:.1f}")
+        return {
+            "new_dates": [str(d) for d in new_dates],
+            "beta": beta,
+            "rmse": rmse,
+            "forecast_dates": [str(last + i) for i in range(1, self.horizon + 1)],
+            "forecast": forecast.round(1).tolist(),
+        }
+
+    def run_forever(self, interval=60):
+        while True:
+            self.run_once()
+            time.sleep(interval)
+
+
+if __name__ == "__main__":
+    IngestionPipeline().run_once()
@@ -0,0 +1,225 @@
+# Начальные модули
+import csv
+import json
+import numpy as np
+from agent_engine import ROLES, STUDENT, TEACHER
+
+# Файл расписания мер по умолчанию
+SCHEDULE_PATH = 'data/interventions.json'
+
+# Поведение моделей без расписания мер: выходной каждый шестой день
+# (Utils.activity_factor) и кампания вакцинации MathematicalModel.vaccination_campaign
+DEFAULT_SCHEDULE = [
+    {"type": "weekend", "period": 6, "offset": 1, "activity": 0.4},
+    {"type": "vaccination", "start": 90, "end": 120, "rate": 0.05, "group": "all"},
+]
+
+GROUPS = {"all": None, "students": STUDENT, "teachers": TEACHER}
+CALENDAR_EVENTS = ("weekend", "holiday", "vaccination", "contact_reduction", "isolation")
+TRIGGERS = ("class_quarantine", "school_closure")
+
+
+def group_shares(path='data/school/population.csv'):
+    """Доли учеников и сотрудников для моделей без ролей"""
+    counts = {}
+    with open(path, 'r', encoding='UTF-8') as f:
+        for row in csv.DictReader(f):
+            counts[row['group']] = int(row['count'])
+    shares = np.array([counts['students'], counts['employee']], dtype=float)
+    return shares / shares.sum()
+
+
+# =========================
+# РАСПИСАНИЕ
+# =========================
+
+class Schedule:
+    """
+    Декларативное расписание мер — список событий (словари из JSON):
+      weekend            — period, offset, activity: выходной, когда (day - offset) % period == 0
+      holiday            — start, end, activity: каникулы
+      vaccination        — start, end, rate, group: ежедневная доля прививаемых из S группы
+      contact_reduction  — start, end, factor, group: множитель контактов с участием группы
+      isolation          — start, end, rate, delay: доля заболевших, остающихся дома
+                           с delay-го дня симптомов (только агентная модель)
+      class_quarantine   — threshold, window, duration: класс закрывается, если в нём
+                           за window дней заболело не меньше threshold учеников (только агентная модель)
+      school_closure     — threshold, window, duration, activity: то же для всей школы
+    Дни считаются от 0, как в моделях; start и end включительно, group — all, students, teachers
+    """
+
+    def __init__(self, events=None):
+        self.events = [dict(e) for e in (DEFAULT_SCHEDULE if events is None else events)]
+        for event in self.events:
+            if event.get("type") not in CALENDAR_EVENTS + TRIGGERS:
+                raise ValueError(f"Неизвестная мера: {event.get('type')}")
+            if event.get("group", "all") not in GROUPS:
+                raise ValueError(f"Неизвестная группа: {event['group']}")
+
+    @classmethod
+    def load(cls, path=SCHEDULE_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)["events"])
+
+    def _active(self, kind, day):
+        for event in self.events:
+            if event["type"] == kind and event.get("start", 0) <= day <= event.get("end", np.inf):
+                yield event
+
+    def triggers(self, kind):
+        return [e for e in self.events if e["type"] == kind]
+
+    # ---------
+
+    def activity(self, day):
+        """Множитель интенсивности контактов в школе: выходные и каникулы"""
+        factor = 1.0
+        for event in self._active("weekend", day):
+            if (day - event.get("offset", 0)) % event["period"] == 0:
+                factor *= event.get("activity", 0.4)
+        for event in self._active("holiday", day):
+            factor *= event.get("activity", 0.4)
+        return factor
+
+    def contact_scale(self, day):
+        """Множители весов контактов [роль источника × роль получателя]"""
+        scale = np.ones((len(ROLES), len(ROLES)))
+        for event in self._active("contact_reduction", day):
+            role = GROUPS[event.get("group", "all")]
+            involved = np.ones((len(ROLES), len(ROLES)), dtype=bool)
+            if role is not None:
+                involved = np.zeros_like(involved)
+                involved[role, :] = involved[:, role] = True
+            scale[involved] *= event["factor"]
+        return scale
+
+    def isolation(self, day):
+        """(доля соблюдающих, задержка) на день; без события — (0, 1)"""
+        for event in self._active("isolation", day):
+            return event["rate"], event.get("delay", 1)
+        return 0.0, 1
+
+    def vaccination(self, day):
+        """Список (роль или None, доля S) на день"""
+        return [(GROUPS[e.get("group", "all")], e["rate"]) for e in self._active("vaccination", day)]
+
+
+class Trigger:
+    """
+    Пороговая мера над массивом счётчиков любой формы (классы, прогоны):
+    скользящая сумма новых случаев за window дней; при достижении threshold
+    мера действует duration дней, начиная со следующего
+    """
+
+    def __init__(self, event, shape=()):
+        self.threshold = event["threshold"]
+        self.duration = event.get("duration", 7)
+        self.activity = event.get("activity", 0.4)
+        self.window = np.zeros((event.get("window", 3),) + tuple(shape))
+        self.until = np.full(shape, -1)
+        self.last_day = -1
+
+    def observe(self, day, cases):
+        """Учитывает случаи дня day; возвращает маску сработавших"""
+        # пропущенные дни (см. VectorPopulation.fast_forward) — без случаев
+        for missed in range(max(self.last_day + 1, day - len(self.window) + 1), day):
+            self.window[missed % len(self.window)] = 0
+        self.last_day = day
+        self.window[day % len(self.window)] = cases
+        fired = (self.window.sum(axis=0) >= self.threshold) & (self.until < day)
+        self.until = np.where(fired, day + self.duration, self.until)
+        return fired
+
+    def active(self, day):
+        return self.until >= day
+
+
+# =========================
+# ПРИМЕНЕНИЕ В МОДЕЛЯХ
+# =========================
+
+class AgentPolicy:
+    """
+    Меры для VectorPopulation (pop.policy): apply в начале дня выставляет
+    contact_scale, закрытые классы и прививает; observe в конце дня получает
+    начала болезни по классам из счётчиков популяции и проверяет пороги.
+    Объектная models.Population мер не применяет: агентная модель в GUI
+    и в job_server строится на VectorPopulation
+    """
+
+    def __init__(self, schedule=None):
+        self.schedule = schedule if schedule is not None else Schedule()
+        self.class_triggers = None
+        self.school_triggers = None
+
+    def _init_triggers(self, pop):
+        n_classes = len(pop.class_ids)
+        self.class_triggers = [Trigger(e, (n_classes,)) for e in self.schedule.triggers("class_quarantine")]
+        self.school_triggers = [Trigger(e) for e in self.schedule.triggers("school_closure")]
+
+    def apply(self, pop):
+        if self.class_triggers is None:
+            self._init_triggers(pop)
+        day = pop.day
+
+        activity = self.schedule.activity(day)
+        for trigger in self.school_triggers:
+            if trigger.active(day):
+                activity *= trigger.activity
+        pop.contact_scale = self.schedule.contact_scale(day) * activity
+
+        closed = np.zeros(len(pop.class_ids), dtype=bool)
+        for trigger in self.class_triggers:
+            closed |= trigger.active(day)
+        pop.set_closed_classes(closed)
+        pop.set_isolation(*self.schedule.isolation(day))
+
+        for role, rate in self.schedule.vaccination(day):
+            pop.vaccinate_population(rate, role=role)
+
+    def observe(self, pop, onsets):
+        """onsets — начала болезни за день по классам, последний элемент — учителя"""
+        day = pop.day - 1
+        messages = []
+        for trigger in self.class_triggers:
+            for c in np.flatnonzero(trigger.observe(day, onsets[:-1])):
+                messages.append(f"Карантин класса {pop.class_ids[c]} до дня {trigger.until[c] + 1}")
+        for trigger in self.school_triggers:
+            if trigger.observe(day, onsets.sum()):
+                messages.append(f"Школа закрыта на карантин до дня {trigger.until + 1}")
+        return messages
+
+
+class MathPolicy:
+    """
+    Меры для SEIRS (MathematicalModel.policy, StructuredMathematicalModel.policy
+    и run_seirs_batch): ролевые меры
+    усредняются по долям групп shares, классовые карантины не применяются.
+    shape — форма массива прогонов для пороговых мер
+    """
+
+    def __init__(self, schedule=None, shape=(), shares=None):
+        self.schedule = schedule if schedule is not None else Schedule()
+        self.shares = shares if shares is not None else group_shares()
+        self.school_triggers = [Trigger(e, shape) for e in self.schedule.triggers("school_closure")]
+
+    def factors(self, day):
+        """(активность, доля S для вакцинации) на день"""
+        scale = self.schedule.contact_scale(day)
+        activity = self.schedule.activity(day)
+        if np.any(scale != 1):
+            activity *= self.shares @ scale @ self.shares
+        for trigger in self.school_triggers:
+            activity = np.where(trigger.active(day), activity * trigger.activity, activity)
+
+        rate = 0.0
+        for role, daily in self.schedule.vaccination(day):
+            rate += daily * (1.0 if role is None else self.shares[role])
+        return activity, rate
+
+    def observe(self, day, new_infected):
+        messages = []
+        for trigger in self.school_triggers:
+            if np.any(trigger.observe(day, new_infected)) and np.ndim(trigger.until) == 0:
+                messages.append(f"Школа закрыта на карантин до дня {trigger.until + 1}")
+        return messages
@@ -0,0 +1,381 @@
+# Начальные модули
+import os
+import json
+import math
+import asyncio
+import itertools
+import threading
+import multiprocessing
+import urllib.request
+from http import HTTPStatus
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from result_cache import ResultCache
+
+# Как часто (в днях) расчёт сообщает о прогрессе
+PROGRESS_EVERY = 5
+
+JOB_TYPES = ("simulation", "sweep", "calibration")
+
+
+# =========================
+# РАСЧЁТЫ (в процессах пула)
+# =========================
+
+def to_json(value):
+    """Массивы и числа NumPy — в обычные списки и числа; NaN и бесконечности — в None (их нет в JSON)"""
+    if isinstance(value, dict):
+        return {k: to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return to_json(value.tolist())
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def reproducible(spec):
+    """Агентная модель без seed даёт каждый раз новую реализацию: такие задания не кэшируются"""
+    return spec.get("model", "math") != "agent" or spec.get("seed") is not None
+
+
+def check_spec(spec):
+    """Ошибки описания задания, которые иначе молча игнорировались бы при расчёте"""
+    if not isinstance(spec, dict):
+        raise ValueError("Описание задания должно быть JSON-объектом")
+    if spec.get("type") not in JOB_TYPES:
+        raise ValueError(f"Неизвестный тип задания: {spec.get('type')}")
+    if spec["type"] == "sweep":
+        if spec.get("model", "math") == "agent":
+            from sensitivity import AGENT_BOUNDS as known
+        else:
+            from batch_ode import SEIRS_PARAMETERS as known
+        if spec.get("parameter") not in known:
+            raise ValueError(f"Неизвестный параметр перебора: {spec.get('parameter')}; допустимы: {', '.join(known)}")
+
+
+def make_model(spec):
+    """Модель по описанию задания: model — "math" или "agent", params — атрибуты модели"""
+    from models import AgentBasedModel, MathematicalModel
+    from interventions import AgentPolicy, MathPolicy, Schedule
+
+    days = spec.get("days", 200)
+    schedule = Schedule(spec["events"]) if "events" in spec else None
+    if spec.get("model", "math") == "math":
+        model = MathematicalModel(spec.get("population_size", 831), days)
+        model.history_file = os.devnull   # параллельные задания не пишут в общий файл истории
+        for name, value in spec.get("params", {}).items():
+            setattr(model, name, value)
+        model.delta = 1 / model.T_immunity
+        if schedule is not None:
+            model.policy = MathPolicy(schedule)
+    elif spec["model"] == "agent":
+        from agent_engine import VectorPopulation
+        pop = VectorPopulation(seed=spec.get("seed"), transmission=spec.get("transmission", "foi"),
+                               static=spec.get("static"))
+        if schedule is not None:
+            pop.policy = AgentPolicy(schedule)
+        model = AgentBasedModel(0, days, population=pop)
+    else:
+        raise ValueError(f"Неизвестная модель: {spec['model']}")
+    return model
+
+
+def run_simulation(spec, report):
+    """Прогон модели; в событиях прогресса — заражённые и текущие R_t и время удвоения"""
+    from analysis import RtTracker, analyze_history
+    model = make_model(spec)
+    tracker = RtTracker()
+
+    def on_day(day, record):
+        estimate = tracker.observe(record)
+        if (day + 1) % PROGRESS_EVERY == 0 or day + 1 == model.days:
+            report({"day": day + 1, "days": model.days, "infected": record["infected"],
+                    "R_t": estimate["R_t"], "doubling_time": estimate["doubling_time"]})
+
+    history = model.run(lambda msg: None, day_callback=on_day)
+    return {"history": history, "peak_day": model.peak_day + 1, "max_infected": model.max_infected,
+            "estimates": analyze_history(history)}
+
+
+def run_sweep(spec, report):
+    """Перебор значений одного параметра: math — одним векторным прогоном, agent — по очереди"""
+    name, values = spec["parameter"], spec["values"]
+    days = spec.get("days", 200)
+    if spec.get("model", "math") == "math":
+        from batch_ode import run_seirs_batch
+        infected = run_seirs_batch({name: np.asarray(values, dtype=float)}, days, spec.get("population_size", 831))["I"]
+        report({"done": len(values), "total": len(values)})
+        return {"values": values, "peak": infected.max(axis=1), "peak_day": infected.argmax(axis=1) + 1}
+
+    from sensitivity import run_agent_sample
+    peaks, peak_days = [], []
+    for i, value in enumerate(values):
+        peak, peak_day = run_agent_sample(({name: value}, days, spec.get("seed"), spec.get("transmission", "foi"),
+                                           spec.get("static")))
+        peaks.append(peak)
+        peak_days.append(peak_day + 1)
+        report({"done": i + 1, "total": len(values)})
+    return {"values": values, "peak": peaks, "peak_day": peak_days}
+
+
+def run_calibration(spec, report):
+    """Подбор beta по ряду случаев (cases или data/school/orvi_cases.csv) и прогноз"""
+    from ingestion import IncrementalFitter, read_cases_csv, read_population
+    cases = spec.get("cases")
+    if cases is None:
+        _, cases, _ = read_cases_csv(spec.get("path", "data/school/orvi_cases.csv"))
+    fitter = IncrementalFitter(spec.get("population_size") or read_population())
+    beta, rmse = fitter.fit(cases)
+    report({"beta": beta})
+    return {"beta": beta, "rmse": rmse, "forecast": fitter.forecast(spec.get("horizon", 7))}
+
+
+RUNNERS = {"simulation": run_simulation, "sweep": run_sweep, "calibration": run_calibration}
+
+
+def execute(job_id, spec, progress):
+    """Точка входа процесса пула: progress — очередь Manager для событий прогресса"""
+    def report(event):
+        progress.put((job_id, to_json(event)))
+    try:
+        return to_json(RUNNERS[spec["type"]](spec, report))
+    finally:
+        progress.put((job_id, None))    # все события отправлены
+
+
+# =========================
+# ОЧЕРЕДЬ ЗАДАНИЙ
+# =========================
+
+class Job:
+    def __init__(self, job_id, spec, key, priority):
+        self.id = job_id
+        self.spec = spec
+        self.key = key
+        self.priority = priority
+        self.status = "queued"
+        self.events = []
+        self.result = None
+        self.error = None
+        self.changed = asyncio.Event()
+        self.flushed = asyncio.Event()
+
+    def push(self, event):
+        self.events.append(event)
+        self.changed.set()
+
+    def info(self, with_result=False):
+        info = {"id": self.id, "type": self.spec["type"], "status": self.status,
+                "priority": self.priority, "progress": self.events[-1] if self.events else None}
+        if with_result:
+            info["result"] = self.result
+            info["error"] = self.error
+        return info
+
+
+class JobServer:
+    """
+    Локальный сервер заданий по HTTP (asyncio, без внешних зависимостей):
+      POST /jobs                 — задание JSON {"type": ..., "priority": ..., ...} -> {"id", "status"}
+      GET  /jobs                 — список заданий
+      GET  /jobs/<id>            — статус и результат
+      GET  /jobs/<id>/progress   — поток событий прогресса (NDJSON) до завершения
+    Задания выполняются в пуле процессов, одновременно не больше max_concurrent,
+    первыми — с большим priority. Одинаковые задания не считаются повторно:
+    готовый результат берётся из ResultCache, а для уже стоящего в очереди
+    возвращается его id. Исключение — агентные задания без seed: каждое
+    считается заново и в кэш не попадает
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, max_workers=None, max_concurrent=None, cache=None):
+        self.host = host
+        self.port = port
+        self.max_workers = max_workers or os.cpu_count()
+        self.max_concurrent = max_concurrent or self.max_workers
+        self.cache = cache if cache is not None else ResultCache()
+        self.jobs = {}
+        self.pending = {}   # ключ кэша -> незавершённое задание
+        self.counter = itertools.count(1)
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.PriorityQueue()
+        self.pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        self.manager = multiprocessing.Manager()
+        self.progress = self.manager.Queue()
+        threading.Thread(target=self._forward_progress, daemon=True).start()
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrent)]
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        for task in self.workers:
+            task.cancel()
+        self.progress.put(None)
+        self.pool.shutdown(cancel_futures=True)
+        self.manager.shutdown()
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    # ---------
+
+    def submit(self, spec):
+        check_spec(spec)
+        priority = spec.pop("priority", 0)
+        key = ResultCache.make_key(spec["type"], spec) if reproducible(spec) else None
+        if key in self.pending:
+            return self.pending[key]
+
+        job = Job(str(next(self.counter)), spec, key, priority)
+        self.jobs[job.id] = job
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            job.status, job.result = "done", cached
+            job.push({"cached": True})
+        else:
+            if key is not None:
+                self.pending[key] = job
+            self.queue.put_nowait((-priority, int(job.id), job))
+        return job
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self.queue.get()
+            job.status = "running"
+            job.changed.set()
+            result, error = None, None
+            try:
+                result = await self.loop.run_in_executor(self.pool, execute, job.id, job.spec, self.progress)
+                if job.key is not None:
+                    self.cache.put(job.key, result)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            # статус меняется после последнего события прогресса, иначе поток закроется раньше
+            try:
+                await asyncio.wait_for(job.flushed.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                pass
+            if error is None:
+                job.result, job.status = result, "done"
+            else:
+                job.status, job.error = "failed", error
+            if job.key is not None:
+                self.pending.pop(job.key, None)
+            job.changed.set()
+
+    def _forward_progress(self):
+        """Поток: события из процессов пула — в задания в цикле asyncio"""
+        while True:
+            item = self.progress.get()
+            if item is None:
+                return
+            job_id, event = item
+            job = self.jobs[job_id]
+            if event is None:
+                self.loop.call_soon_threadsafe(job.flushed.set)
+            else:
+                self.loop.call_soon_threadsafe(job.push, event)
+
+    # ---------
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while (line := (await reader.readline()).decode("latin-1").strip()):
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            if len(request_line) < 2:
+                return
+            method, path = request_line[0], request_line[1].rstrip("/")
+            await self._route(method, path, body, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body, writer):
+        parts = path.strip("/").split("/")
+        if parts[0] != "jobs":
+            return self._send(writer, 404, {"error": "not found"})
+
+        if len(parts) == 1 and method == "POST":
+            try:
+                job = self.submit(json.loads(body or b"{}"))
+            except (ValueError, TypeError) as e:
+                return self._send(writer, 400, {"error": str(e)})
+            return self._send(writer, 202, job.info())
+        if len(parts) == 1 and method == "GET":
+            return self._send(writer, 200, [job.info() for job in self.jobs.values()])
+
+        job = self.jobs.get(parts[1])
+        if job is None or method != "GET":
+            return self._send(writer, 404, {"error": "not found"})
+        if len(parts) == 2:
+            return self._send(writer, 200, job.info(with_result=True))
+        if parts[2] == "progress":
+            return await self._stream(writer, job)
+        return self._send(writer, 404, {"error": "not found"})
+
+    @staticmethod
+    def _send(writer, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data
+        )
+
+    async def _stream(self, writer, job):
+        """Chunked NDJSON: все события прогресса, затем итоговый статус"""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        sent = 0
+        while True:
+            job.changed.clear()
+            for event in job.events[sent:]:
+                self._chunk(writer, {"progress": event})
+            sent = len(job.events)
+            await writer.drain()
+            if job.status in ("done", "failed"):
+                break
+            await job.changed.wait()
+        self._chunk(writer, {"status": job.status, "error": job.error})
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    def _chunk(writer, payload):
+        data = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+        writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+
+
+# =========================
+# КЛИЕНТ
+# =========================
+
+def request(method, url, payload=None):
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    req = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req) as response:
+        return json.loads(response.read())
+
+
+def follow(url):
+    """События прогресса задания по мере поступления"""
+    with urllib.request.urlopen(url) as response:
+        for line in response:
+            yield json.loads(line)
+
+
+if __name__ == "__main__":
+    asyncio.run(JobServer().serve_forever())
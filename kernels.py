@@ -0,0 +1,227 @@
+# Начальные модули
+import sys
+import numpy as np
+from models import HealthState
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+SUSCEPTIBLE = HealthState.SUSCEPTIBLE.value
+EXPOSED = HealthState.EXPOSED.value
+INFECTED = HealthState.INFECTED.value
+RECOVERED = HealthState.RECOVERED.value
+VACCINATED = HealthState.VACCINATED.value
+
+# Константы Person.update в float32, как хранится иммунитет
+ANTIBODY_BOOST = np.float32(0.7)
+MEMORY_BOOST = np.float32(0.5)
+RECOVERED_DECAY = np.float32(0.97)
+VACCINATED_DECAY = np.float32(0.985)
+SUSCEPTIBLE_THRESHOLD = np.float32(0.2)
+ONE = np.float32(1.0)
+
+
+# =========================
+# NUMPY
+# =========================
+
+def advance_states_numpy(state, days_in_state, incubation_period, infectious_period,
+                         strain, antibody, memory):
+    """
+    Векторный Person.update для E и I (на месте): переходы E -> I и I -> R
+    с прибавкой иммунитета. Убывание иммунитета у R и V и переход R -> S
+    считаются отдельно по формуле (VectorPopulation). Возвращает выздоровевших
+    """
+    exposed = state == EXPOSED
+    infected = state == INFECTED
+
+    days_in_state[exposed | infected] += 1
+
+    to_infected = exposed & (days_in_state >= incubation_period)
+    state[to_infected] = INFECTED
+    days_in_state[to_infected] = 0
+
+    to_recovered = np.flatnonzero(infected & (days_in_state >= infectious_period))
+    state[to_recovered] = RECOVERED
+    days_in_state[to_recovered] = 0
+    k = strain[to_recovered]
+    antibody[to_recovered, k] = np.minimum(ONE, antibody[to_recovered, k] + ANTIBODY_BOOST)
+    memory[to_recovered, k] = np.minimum(ONE, memory[to_recovered, k] + MEMORY_BOOST)
+    return to_recovered
+
+
+def contact_hits_numpy(src, dst, strains, role, susceptibility, infectivity, beta,
+                       weight, cross, antibody, memory, noise, u):
+    """
+    Успешные контакты по парам: вероятность как в Population.try_infect,
+    noise — множители uniform(0.7, 1.0), u — равномерные числа для сравнения с p
+    """
+    k = cross.shape[0]
+    protection_ab = (antibody[dst, :k] * cross[strains]).max(axis=1)
+    protection_mem = (memory[dst, :k] * cross[strains]).max(axis=1)
+    immunity_factor = 1 - (protection_ab * 0.7 + protection_mem * 0.3)
+
+    p = (
+        beta[strains]
+        * weight[role[src], role[dst]]
+        * susceptibility[dst]
+        * infectivity[src]
+        * immunity_factor
+    )
+    p *= noise
+    p = np.clip(p, 0.0, 0.9)
+    return u < p
+
+
+def pick_sources_numpy(cumulative, low, high, coef, u, v):
+    """
+    Выбор источника в два этапа (VectorPopulation._record_attributed).
+    low, high, coef — [пути × заражённые]: диапазон пула [low, high) и множитель пути;
+    cumulative — накопленная заразность пула. Путь — пропорционально
+    coef × заразности диапазона (по u), затем позиция в диапазоне — по v.
+    Возвращает позиции в пуле, -1 — заразных на путях нет
+    """
+    share = np.cumsum(coef * (cumulative[high] - cumulative[low]), axis=0)
+    n = share.shape[1]
+    channel = np.minimum((share < u * share[-1]).sum(axis=0), len(share) - 1)
+    rows = np.arange(n)
+    low, high = low[channel, rows], high[channel, rows]
+    point = cumulative[low] + v * (cumulative[high] - cumulative[low])
+    # упорядоченные точки ищутся быстрее
+    sort = np.argsort(point)
+    pos = np.empty(n, dtype=np.int64)
+    pos[sort] = np.searchsorted(cumulative, point[sort], side="right") - 1
+    pos = np.minimum(np.maximum(pos, low), high - 1)
+    return np.where(share[-1] > 0, pos, -1)
+
+
+# =========================
+# NUMBA
+# =========================
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def advance_states_numba(state, days_in_state, incubation_period, infectious_period,
+                             strain, antibody, memory):
+        """То же, что advance_states_numpy, циклом по агентам"""
+        to_recovered = np.empty(state.shape[0], dtype=np.int64)
+        count = 0
+        for i in range(state.shape[0]):
+            s = state[i]
+            if s == EXPOSED:
+                days_in_state[i] += 1
+                if days_in_state[i] >= incubation_period[i]:
+                    state[i] = INFECTED
+                    days_in_state[i] = 0
+
+            elif s == INFECTED:
+                days_in_state[i] += 1
+                if days_in_state[i] >= infectious_period[i]:
+                    state[i] = RECOVERED
+                    days_in_state[i] = 0
+                    k = strain[i]
+                    antibody[i, k] = min(ONE, antibody[i, k] + ANTIBODY_BOOST)
+                    memory[i, k] = min(ONE, memory[i, k] + MEMORY_BOOST)
+                    to_recovered[count] = i
+                    count += 1
+        return to_recovered[:count]
+
+    @njit(cache=True)
+    def contact_hits_numba(src, dst, strains, role, susceptibility, infectivity, beta,
+                           weight, cross, antibody, memory, noise, u):
+        """Та же вероятность try_infect, что и в contact_hits_numpy, цикл по парам"""
+        n_strains = cross.shape[0]
+        hits = np.zeros(src.shape[0], dtype=np.bool_)
+        for j in range(src.shape[0]):
+            a, b, k = src[j], dst[j], strains[j]
+            protection_ab = -np.inf
+            protection_mem = -np.inf
+            for m in range(n_strains):
+                protection_ab = max(protection_ab, antibody[b, m] * cross[k, m])
+                protection_mem = max(protection_mem, memory[b, m] * cross[k, m])
+            immunity_factor = 1 - (protection_ab * 0.7 + protection_mem * 0.3)
+
+            p = (
+                beta[k]
+                * weight[role[a], role[b]]
+                * susceptibility[b]
+                * infectivity[a]
+                * immunity_factor
+            )
+            p *= noise[j]
+            p = min(max(p, 0.0), 0.9)
+            hits[j] = u[j] < p
+        return hits
+
+    @njit(cache=True)
+    def pick_sources_numba(cumulative, low, high, coef, u, v):
+        """Тот же выбор, что и в pick_sources_numpy, цикл по заражённым с бинарным поиском"""
+        n_channels, n = low.shape
+        pos = np.full(n, -1, dtype=np.int64)
+        share = np.empty(n_channels)
+        for t in range(n):
+            total = 0.0
+            for j in range(n_channels):
+                total += coef[j, t] * (cumulative[high[j, t]] - cumulative[low[j, t]])
+                share[j] = total
+            if not total > 0:
+                continue
+            x = u[t] * total
+            j = 0
+            while j < n_channels - 1 and share[j] < x:
+                j += 1
+            a, b = low[j, t], high[j, t] - 1
+            point = cumulative[a] + v[t] * (cumulative[b + 1] - cumulative[a])
+            # последняя позиция диапазона с cumulative <= point
+            while a < b:
+                m = (a + b + 1) // 2
+                if cumulative[m] <= point:
+                    a = m
+                else:
+                    b = m - 1
+            pos[t] = a
+        return pos
+
+
+class Backend:
+    """Набор ядер агентного движка: переходы E и I, заражение по парам и выбор источника"""
+
+    def __init__(self, name, advance_states, contact_hits, pick_sources):
+        self.name = name
+        self.advance_states = advance_states
+        self.contact_hits = contact_hits
+        self.pick_sources = pick_sources
+
+
+BACKENDS = {"numpy": Backend("numpy", advance_states_numpy, contact_hits_numpy, pick_sources_numpy)}
+if NUMBA_AVAILABLE:
+    BACKENDS["numba"] = Backend("numba", advance_states_numba, contact_hits_numba, pick_sources_numba)
+
+
+def get_backend(name=None):
+    """
+    Ядра по имени; без имени — Numba, если установлена. Если Numba
+    запрошена, но не установлена, используется NumPy
+    """
+    if name is None:
+        name = "numba" if NUMBA_AVAILABLE else "numpy"
+    if name not in ("numpy", "numba"):
+        raise ValueError(f"Неизвестный backend: {name}")
+    return BACKENDS.get(name, BACKENDS["numpy"])
+
+
+# Проверка: оба backend'а дают одинаковый прогон при одном seed; при расхождении — код выхода 1
+if __name__ == "__main__":
+    from validation import check_backends
+
+    result = check_backends()
+    if result is None:
+        print("Numba не установлена — сравнивать не с чем")
+    elif result:
+        print("NumPy и Numba совпадают")
+    else:
+        print("РАСХОЖДЕНИЕ NumPy и Numba")
+    sys.exit(0 if result is not False else 1)
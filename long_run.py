@@ -0,0 +1,153 @@
+# Начальные модули
+import os
+import json
+import numpy as np
+from batch_ode import COMPARTMENTS, default_parameters, initial_state, run_seirs_batch
+
+# Колонки дневной записи на диске
+COLUMNS = ("S", "E", "I", "R", "V", "new_cases")
+SEASON_DAYS = 365
+
+
+class DailyStream:
+    """
+    Дневные записи на диске: двоичный файл float64 [дни × колонки], дописываемый
+    блоками по chunk_days строк, и JSON-заголовок рядом. В памяти — только один блок
+    """
+
+    def __init__(self, path, columns=COLUMNS, chunk_days=365):
+        self.path = path
+        self.columns = columns
+        self.buffer = np.empty((chunk_days, len(columns)))
+        self.filled = 0
+        self.days = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        open(path, 'wb').close()
+
+    def append(self, rows):
+        """rows — [дни × колонки]; полные блоки сразу уходят на диск"""
+        rows = np.atleast_2d(rows)
+        while len(rows):
+            take = min(len(rows), len(self.buffer) - self.filled)
+            self.buffer[self.filled:self.filled + take] = rows[:take]
+            self.filled += take
+            rows = rows[take:]
+            if self.filled == len(self.buffer):
+                self.flush()
+
+    def flush(self):
+        with open(self.path, 'ab') as f:
+            self.buffer[:self.filled].tofile(f)
+        self.days += self.filled
+        self.filled = 0
+        with open(self.path + '.json', 'w', encoding='utf-8') as f:
+            json.dump({"columns": list(self.columns), "days": self.days}, f)
+
+
+def read_stream(path):
+    """Записанный поток как memmap [дни × колонки] и список колонок"""
+    with open(path + '.json', 'r', encoding='utf-8') as f:
+        header = json.load(f)
+    data = np.memmap(path, dtype=np.float64, mode='r', shape=(header["days"], len(header["columns"])))
+    return data, header["columns"]
+
+
+class SeasonSummary:
+    """Скользящие итоги по сезонам (SEASON_DAYS дней): пик, день пика, число случаев"""
+
+    def __init__(self):
+        self.seasons = []
+        self._reset(0)
+
+    def _reset(self, start):
+        self.current = {"start": start, "peak": 0.0, "peak_day": start, "cases": 0.0,
+                        "days": 0, "fast_forwarded": 0}
+
+    def add(self, day, infected, new_cases, fast_forwarded=False):
+        season = self.current
+        if day - season["start"] >= SEASON_DAYS:
+            self.close()
+            self._reset(season["start"] + SEASON_DAYS * ((day - season["start"]) // SEASON_DAYS))
+            season = self.current
+        if infected > season["peak"]:
+            season["peak"], season["peak_day"] = float(infected), day
+        season["cases"] += float(new_cases)
+        season["days"] += 1
+        season["fast_forwarded"] += int(fast_forwarded)
+
+    def close(self):
+        if self.current["days"]:
+            self.seasons.append(self.current)
+
+
+# =========================
+# ДОЛГИЕ ПРОГОНЫ
+# =========================
+
+def run_agent_long(pop, days, path='data/long_run/agent.bin', chunk_days=365, fast_forward=True,
+                   log_callback=print):
+    """
+    Агентная модель на days дней без раннего завершения и без истории в памяти:
+    записи дней уходят в DailyStream, в памяти — итоги сезонов.
+    fast_forward — тихие периоды (нет E и I) проходятся VectorPopulation.fast_forward
+    одним шагом; ускорение есть, только если завоз редок и тихие дни бывают
+    """
+    stream = DailyStream(path, chunk_days=chunk_days)
+    summary = SeasonSummary()
+    quiet = False
+    while pop.day < days:
+        if fast_forward and quiet:
+            start = pop.day
+            skipped, lost = pop.fast_forward(days - pop.day)
+            if skipped:
+                # S и R по дням пропуска восстанавливаются из дней переходов R -> S
+                counts = pop.counts()
+                moved = np.cumsum(lost) - lost.sum()
+                rows = np.zeros((skipped, len(COLUMNS)))
+                rows[:, 0] = counts["S"] + moved
+                rows[:, 3] = counts["R"] - moved
+                rows[:, 4] = counts["V"]
+                stream.append(rows)
+                for d in range(skipped):
+                    summary.add(start + d, 0, 0, fast_forwarded=True)
+            if pop.day >= days:
+                break
+
+        day = pop.day
+        stats = pop.step_day()
+        stream.append([stats[c] for c in COLUMNS])
+        summary.add(day, stats["I"], stats["new_cases"])
+        quiet = stats["E"] == 0 and stats["I"] == 0
+
+        if (day + 1) % SEASON_DAYS == 0:
+            log_callback(f"Сезон {(day + 1) // SEASON_DAYS}: пик {summary.current['peak']:.0f}, "
+                         f"случаев {summary.current['cases']:.0f}")
+
+    stream.flush()
+    summary.close()
+    return summary.seasons
+
+
+def run_math_long(days, population_size=831, params=None, path='data/long_run/math.bin', chunk_days=365,
+                  schedule=None, log_callback=print):
+    """SEIRS на days дней блоками run_seirs_batch: каждый блок продолжает состояние предыдущего"""
+    stream = DailyStream(path, chunk_days=chunk_days)
+    summary = SeasonSummary()
+    state = initial_state(population_size)
+    for start in range(0, days, chunk_days):
+        length = min(chunk_days, days - start)
+        out = run_seirs_batch(params or {}, length, population_size, initial=state, start_day=start,
+                              schedule=schedule)
+        # новые заболевшие — переходы E -> I: sigma × E предыдущего дня
+        sigma = (params or {}).get("sigma", default_parameters()["sigma"])
+        previous_E = np.r_[state["E"], out["E"][:-1]]
+        rows = np.column_stack([out["S"], out["E"], out["I"], out["R"], out["V"], sigma * previous_E])
+        stream.append(rows)
+        for d in range(length):
+            summary.add(start + d, rows[d, 2], rows[d, 5])
+        state = {c: out[c][-1] for c in COMPARTMENTS}
+        log_callback(f"Дни {start + 1}–{start + length}: пик {out['I'].max():.0f}")
+
+    stream.flush()
+    summary.close()
+    return summary.seasons
@@ -5,6 +5,8 @@ import json
 from collections import defaultdict
 from abc import ABC, abstractmethod
 from utils import singleton, Utils
+from distributions import draw, draw_days
+from infection_tree import IMPORT, ROLE_SETTING, SEED
 from dataclasses import dataclass, field
 from enum import Enum, auto
 
@@ -46,17 +48,38 @@ class Immunity:
 with open('data/school/classes.json', 'r', encoding='UTF-8') as f:
     SCHOOL_CONFIG = json.load(f)
 
+# Параметры болезни и распределения индивидуальных длительностей и иммунитета
+with open('data/disease.json', 'r', encoding='UTF-8') as f:
+    DISEASE_CONFIG = json.load(f)
+
 @singleton
 class Virus:
     def __new__(cls):
         obj = super().__new__(cls)
-        obj.type = "ОРВИ"
-        obj.time_incubation = 2
-        obj.base_duration = 7
-        obj.infection_probability = 0.02  # ↓ чтобы не вымирали за 10 дней
+        params = DISEASE_CONFIG.get("virus", {})
+        obj.type = params.get("type", "ОРВИ")
+        obj.time_incubation = params.get("time_incubation", 2)
+        obj.base_duration = params.get("base_duration", 7)
+        obj.infection_probability = params.get("infection_probability", 0.02)  # ↓ чтобы не вымирали за 10 дней
         return obj
 virus = Virus()
 
+def duration_spec(name):
+    """Распределение длительности из конфига; без записи — ровно среднее штамма"""
+    return DISEASE_CONFIG.get("durations", {}).get(name, {"distribution": "constant"})
+
+def draw_immunity(size, rng):
+    """
+    Одна векторная выборка всех полей Immunity для size агентов:
+    поля без записи в конфиге остаются значениями по умолчанию
+    """
+    defaults = Immunity()
+    specs = DISEASE_CONFIG.get("immunity", {})
+    return {
+        name: draw(specs.get(name, {"value": value}), size, rng).astype(type(value))
+        for name, value in vars(defaults).items()
+    }
+
 @dataclass
 class Person:
     id: int
@@ -145,19 +168,45 @@ class Population:
         self.teachers = []
         self.classes = {}
         self._next_id = 0
+        self.day = 0
+        self.recorder = None    # infection_tree.InfectionRecorder: журнал заражений
 
         self._build_students()
         self._build_teachers()
+        self._draw_parameters()
 
     # ---------
 
+    def _draw_parameters(self):
+        """
+        Индивидуальные длительности и иммунитет: одна выборка на всю популяцию,
+        генератор NumPy засевается из random, чтобы random.seed воспроизводил прогон.
+        Тот же генератор (self.rng) дальше даёт число завозных заражений по дням
+        """
+        people = self.students + self.teachers
+        self.rng = rng = np.random.default_rng(random.getrandbits(64))
+
+        incubation = draw_days(duration_spec("incubation_period"), len(people), rng, virus.time_incubation)
+        infectious = draw_days(duration_spec("infectious_period"), len(people), rng, virus.base_duration)
+        immunity = {name: values.tolist() for name, values in draw_immunity(len(people), rng).items()}
+
+        for i, p in enumerate(people):
+            p.incubation_period = int(incubation[i])
+            p.infectious_period = int(infectious[i])
+            p.immunity = Immunity(**{name: values[i] for name, values in immunity.items()})
+
     def random_infections(self, chance=0.002):
         """
-        chance — вероятность заражения каждого человека вне контактов
+        chance — вероятность заражения каждого человека вне контактов.
+        Число заражений — биномиальное, выбираются только они, без перебора всех
         """
-        for p in self.students + self.teachers:
-            if p.can_be_infected() and random.random() < chance:
+        people = self.students + self.teachers
+        count = self.rng.binomial(len(people), chance)
+        for p in random.sample(people, count):
+            if p.can_be_infected():
                 p.exposed()
+                if self.recorder is not None:
+                    self.recorder.add_one(self.day, -1, p.id, IMPORT)
 
     def _build_students(self):
         for class_id, info in self.config["classes"].items():
@@ -244,6 +293,8 @@ class Population:
 
         if random.random() < p:
             target.exposed()
+            if self.recorder is not None:
+                self.recorder.add_one(self.day, source.id, target.id, ROLE_SETTING[(source.role, target.role)])
 
     def step_day(self):
         self.random_infections(chance=0.002)  # можно подбирать под динамику
@@ -255,12 +306,15 @@ class Population:
                 if target.id != source.id:
                     self.try_infect(source, target)
 
-        # 3) обновляем состояния
-        for p in self.students + self.teachers:
+        # 3) обновляем состояния; заболевшие за день — переходы E -> I
+        all_p = self.students + self.teachers
+        exposed = [p for p in all_p if p.state == HealthState.EXPOSED]
+        for p in all_p:
             p.update()
+        self.day += 1
 
-        all_p = self.students + self.teachers
         return {
+            "new_cases": sum(p.state == HealthState.INFECTED for p in exposed),
             "S": sum(p.state == HealthState.SUSCEPTIBLE for p in all_p),
             "E": sum(p.state == HealthState.EXPOSED for p in all_p),
             "I": sum(p.state == HealthState.INFECTED for p in all_p),
@@ -268,6 +322,14 @@ class Population:
             "V": sum(p.state == HealthState.VACCINATED for p in all_p),
             }
 
+    def seed_infections(self, count=5):
+        """Начальные заражённые среди учеников"""
+        for _ in range(count):
+            p = random.choice(self.students)
+            if self.recorder is not None and p.state != HealthState.INFECTED:
+                self.recorder.add_one(self.day, -1, p.id, SEED)
+            p.state = HealthState.INFECTED
+
     def vaccinate_population(self, rate=0.5):
         susceptible = [
             p for p in self.students + self.teachers
@@ -282,23 +344,46 @@ class BaseModel(ABC):
         self.population_size = population_size
         self.days = days
         self.history = {}
+        self.stop_requested = False
 
     @abstractmethod
-    def run(self, log_callback):
+    def run(self, log_callback, day_callback=None):
+        """
+        log_callback(msg) — вывод в лог,
+        day_callback(day, record) — необязательный приём записи дня по мере расчёта
+        """
         pass
 
+    def stop(self):
+        """Просьба остановить расчёт: проверяется в начале каждого дня"""
+        self.stop_requested = True
+
+    def day_record(self):
+        """Последняя запись истории в виде {ключ: значение}"""
+        return {key: values[-1] for key, values in self.history.items()}
+
 class AgentBasedModel(BaseModel):
-    def __init__(self, population_size, days):
+    def __init__(self, population_size, days, population=None):
+        """
+        population — готовая популяция с методами seed_infections и step_day
+        (например, VectorPopulation из agent_engine); по умолчанию Population().
+        new_cases в истории — заболевшие за день (переходы E -> I) из step_day
+        """
         super().__init__(population_size, days)
-        self.population = Population()
-        self.history = {'healthy': [], 'vaccinated': [], 'exposed': [], 'infected': [], 'cured': []}
+        self.population = population if population is not None else Population()
+        self.history = {'healthy': [], 'vaccinated': [], 'exposed': [], 'infected': [], 'cured': [],
+                        'new_cases': []}
+        self.strain_history = []
         self.peak_day = 0
         self.max_infected = 0
-        for _ in range(5):
-            random.choice(self.population.students).state = HealthState.INFECTED
+        self.population.seed_infections(5)
 
-    def run(self, log_callback):
+    def run(self, log_callback, day_callback=None):
         for day in range(self.days):
+            if self.stop_requested:
+                log_callback("Симуляция остановлена.")
+                break
+
             stats = self.population.step_day()
 
             S = stats["S"]
@@ -312,11 +397,23 @@ class AgentBasedModel(BaseModel):
             self.history['exposed'].append(E)
             self.history['infected'].append(I)
             self.history['cured'].append(R)
+            self.history['new_cases'].append(stats["new_cases"])
+
+            # заражённые по штаммам (только у многоштаммовых популяций)
+            if "I_by_strain" in stats:
+                self.strain_history.append(stats["I_by_strain"])
+            for k in stats.get("new_strains", []):
+                log_callback(f"Новый штамм №{k} (день {day + 1})")
+            for message in stats.get("events", []):
+                log_callback(message)
 
             if I > self.max_infected:
                 self.max_infected = I
                 self.peak_day = day
 
+            if day_callback:
+                day_callback(day, self.day_record())
+
             log_callback(f"--- День {day + 1} ---")
             log_callback(
                 f"Здоровые: {S}, Вакцинированные: {V}, "
@@ -337,6 +434,7 @@ class MathematicalModel(BaseModel):
         self.peak_day = 0
         self.max_infected = 0
         self.history_file = "data/simulation_history.json"
+        self.policy = None  # interventions.MathPolicy: меры вместо выходных и кампании по умолчанию
 
         # SEIRS параметры
         self.beta = 0.2
@@ -373,15 +471,21 @@ class MathematicalModel(BaseModel):
                 return 0.05  # 5% от S в день
         return 0.0
 
-    def run(self, log_callback):
+    def run(self, log_callback, day_callback=None):
         with open(self.history_file, "w", encoding="utf-8") as f:
             json.dump({}, f)
 
         for day in range(self.days):
-            activity_factor = Utils.activity_factor(day)
-            season_factor = self.seasonal_factor(day)
+            if self.stop_requested:
+                log_callback("Симуляция остановлена.")
+                break
 
-            vacc_rate_today = self.vaccination_campaign(day)
+            season_factor = self.seasonal_factor(day)
+            if self.policy is not None:
+                activity_factor, vacc_rate_today = self.policy.factors(day)
+            else:
+                activity_factor = Utils.activity_factor(day)
+                vacc_rate_today = self.vaccination_campaign(day)
             new_vaccinations = vacc_rate_today * self.S
 
             effective_beta = self.beta * season_factor * activity_factor
@@ -407,6 +511,9 @@ class MathematicalModel(BaseModel):
             self.I = max(self.I, 0)
             self.R = max(self.R, 0)
 
+            if self.policy is not None:
+                for message in self.policy.observe(day, new_infected):
+                    log_callback(message)
 
             self.history['healthy'].append(int(self.S))
             self.history['vaccinated'].append(int(self.V))
@@ -418,6 +525,9 @@ class MathematicalModel(BaseModel):
                 self.max_infected = int(self.I)
                 self.peak_day = day
 
+            if day_callback:
+                day_callback(day, self.day_record())
+
             log_callback(f"--- День {day+1} ---")
             log_callback(
                 f"Здоровые: {int(self.S)}, Вакцинированные: {int(self.V)}, Подверженные: {int(self.E)}, "
@@ -452,6 +562,6 @@ class MathematicalModel(BaseModel):
         return self.history
 
 class HybrydModel(BaseModel):
-    def run(self, log_callback):
+    def run(self, log_callback, day_callback=None):
         log_callback("Гибридная модель пока не реализована.")
         return {'healthy': [], 'exposed': [], 'infected': [], 'cured': []}
@@ -0,0 +1,157 @@
+# Начальные модули
+import numpy as np
+from batch_ode import default_parameters, calendar_factors, seirs_step, run_seirs_batch, COMPARTMENTS
+from plotting import quantile_bands
+
+# Оцениваемые параметры: лог-разброс априорного распределения вокруг значения по умолчанию
+PRIOR_SPREAD = {"beta": 0.3}
+
+
+class ParticleFilter:
+    """
+    Бутстреп-фильтр частиц для SEIRS (динамика MathematicalModel через seirs_step).
+    Каждая частица — отсеки S, V, E, I, R и параметры из PRIOR_SPREAD,
+    которые каждый день немного блуждают в логарифмической шкале.
+    Наблюдение — отсек I (как в calibration.py) или новые заболевшие (observation="incidence"),
+    шум — гауссово приближение отрицательного биномиального с дисперсией dispersion
+    """
+
+    def __init__(self, population_size, n_particles=5000, seed=None, observation="I",
+                 dispersion=20.0, prior_spread=None, drift=0.02, resample_threshold=0.5):
+        if observation not in ("I", "incidence"):
+            raise ValueError(f"Неизвестное наблюдение: {observation}")
+        self.N = float(population_size)
+        self.n = n_particles
+        self.rng = np.random.default_rng(seed)
+        self.observation = observation
+        self.dispersion = dispersion
+        self.prior_spread = prior_spread or PRIOR_SPREAD
+        self.drift = drift
+        self.resample_threshold = resample_threshold
+
+        self.state = None
+        self.params = None
+        self.weights = None
+        self.day = 0
+
+    # ---------
+
+    def initialize(self, first_observation, start_day=0):
+        """Априорные частицы около первого наблюдения"""
+        rng, n, N = self.rng, self.n, self.N
+        defaults = default_parameters()
+        self.params = {name: np.full(n, float(value)) for name, value in defaults.items()}
+        for name, spread in self.prior_spread.items():
+            self.params[name] *= np.exp(rng.normal(0, spread, n))
+
+        if self.observation == "I":
+            I = first_observation * np.exp(rng.normal(0, 0.2, n))
+        else:
+            I = first_observation / self.params["sigma"] * np.exp(rng.normal(0, 0.5, n))
+        E = I * rng.uniform(0.1, 0.5, n)
+        V = N * rng.uniform(0, 0.5, n)
+        R = N * rng.uniform(0, 0.3, n)
+        # лишнее снимается с R и V, чтобы S не был отрицательным
+        excess = np.maximum(I + E + V + R - N, 0)
+        R -= np.minimum(R, excess)
+        V -= np.maximum(I + E + V + R - N, 0)
+        self.state = {"S": N - I - E - V - R, "V": V, "E": E, "I": I, "R": R}
+        self.weights = np.full(n, 1 / n)
+        self.day = start_day
+
+    def step(self, observed, season, activity, campaign):
+        """Прогноз на день, взвешивание по наблюдению, при малом ESS — ресэмплинг. Возвращает log p(y)"""
+        for name in self.prior_spread:
+            self.params[name] *= np.exp(self.rng.normal(0, self.drift, self.n))
+
+        p = self.params
+        s = self.state
+        S, V, E, I, R, new_infected = seirs_step(
+            s["S"], s["V"], s["E"], s["I"], s["R"], self.N,
+            p["beta"], p["epsilon"], p["omega_v"], p["sigma"], p["gamma"], 1 / p["T_immunity"],
+            season, activity, campaign,
+        )
+        self.state = {"S": S, "V": V, "E": E, "I": I, "R": R}
+        self.day += 1
+
+        if observed is None or np.isnan(observed):
+            return 0.0
+        mu = I if self.observation == "I" else new_infected
+        var = mu + mu ** 2 / self.dispersion + 1
+        log_w = np.log(self.weights) - 0.5 * ((observed - mu) ** 2 / var + np.log(2 * np.pi * var))
+        top = log_w.max()
+        w = np.exp(log_w - top)
+        total = w.sum()
+        self.weights = w / total
+
+        if 1 / np.sum(self.weights ** 2) < self.resample_threshold * self.n:
+            self.resample()
+        return float(top + np.log(total))
+
+    def resample(self):
+        """Систематический ресэмплинг"""
+        positions = (self.rng.random() + np.arange(self.n)) / self.n
+        index = np.minimum(np.searchsorted(np.cumsum(self.weights), positions), self.n - 1)
+        self.state = {c: v[index] for c, v in self.state.items()}
+        self.params = {name: v[index] for name, v in self.params.items()}
+        self.weights = np.full(self.n, 1 / self.n)
+
+    def weighted_quantiles(self, values, quantiles):
+        order = np.argsort(values)
+        cumulative = np.cumsum(self.weights[order])
+        index = np.minimum(np.searchsorted(cumulative, quantiles), self.n - 1)
+        return values[order][index]
+
+    # ---------
+
+    def run(self, observed, start_day=0, quantiles=(0.1, 0.5, 0.9)):
+        """
+        Фильтрация ряда наблюдений (NaN — пропуск дня).
+        Возвращает средние отсеков и квантили I и параметров по дням, ESS и логарифм правдоподобия
+        """
+        observed = np.asarray(observed, dtype=float)
+        days = len(observed)
+        self.initialize(observed[0], start_day)
+        season, activity, campaign = calendar_factors(start_day, days - 1)
+
+        mean = {c: np.empty(days) for c in COMPARTMENTS}
+        bands = {name: np.empty((len(quantiles), days)) for name in ("I", *self.prior_spread)}
+        ess = np.empty(days)
+        log_likelihood = 0.0
+
+        for t in range(days):
+            if t > 0:
+                log_likelihood += self.step(observed[t], season[t - 1], activity[t - 1], campaign[t - 1])
+            for c in COMPARTMENTS:
+                mean[c][t] = self.weights @ self.state[c]
+            bands["I"][:, t] = self.weighted_quantiles(self.state["I"], quantiles)
+            for name in self.prior_spread:
+                bands[name][:, t] = self.weighted_quantiles(self.params[name], quantiles)
+            ess[t] = 1 / np.sum(self.weights ** 2)
+
+        return {"mean": mean, "bands": bands, "ess": ess, "log_likelihood": log_likelihood}
+
+    def forecast(self, horizon, quantiles=(0.1, 0.5, 0.9)):
+        """Квантили I на horizon дней вперёд от текущих частиц (после ресэмплинга по весам)"""
+        self.resample()
+        out = run_seirs_batch(self.params, horizon, self.N, initial=self.state, start_day=self.day)
+        return quantile_bands(out["I"], quantiles)
+
+
+if __name__ == "__main__":
+    import csv
+    import time
+    from ingestion import read_population
+
+    with open('data/school/orvi_cases.csv', 'r', encoding='UTF-8') as f:
+        cases = [int(row['new_cases']) for row in csv.DictReader(f)]
+
+    pf = ParticleFilter(read_population(), seed=0)
+    start = time.perf_counter()
+    result = pf.run(cases)
+    elapsed = time.perf_counter() - start
+    low, median, high = result["bands"]["I"]
+    for day, (y, lo, mid, hi) in enumerate(zip(cases, low, median, high), 1):
+        print(f"День {day}: наблюдалось {y}, I = {mid:.1f} [{lo:.1f}; {hi:.1f}]")
+    print(f"beta = {result['bands']['beta'][1, -1]:.4f}, logL = {result['log_likelihood']:.1f}, {elapsed:.3f} с")
+    print("Прогноз I на 7 дней:", pf.forecast(7)[1].round(1).tolist())
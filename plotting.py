@@ -0,0 +1,112 @@
+# Начальные модули
+import numpy as np
+
+# Длительность анимации графика не зависит от длины истории
+ANIMATION_DURATION_MS = 2000
+FRAME_INTERVAL_MS = 40
+
+
+def bucket_starts(n, n_buckets):
+    """Начальные индексы n_buckets корзин примерно равного размера для ряда длины n"""
+    n_buckets = max(1, min(n_buckets, n))
+    return np.linspace(0, n, n_buckets + 1).astype(np.intp)[:-1]
+
+
+def minmax_downsample(x, y, n_out):
+    """
+    Прореживание min/max по корзинам: в каждой корзине остаются
+    минимум и максимум, поэтому пики не теряются
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= n_out or n_out < 2:
+        return x, y
+
+    starts = bucket_starts(n, n_out // 2)
+    bucket_id = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+
+    picked = []
+    for reduce in (np.minimum, np.maximum):
+        extreme = reduce.reduceat(y, starts)
+        hits = np.flatnonzero(y == extreme[bucket_id])
+        _, first = np.unique(bucket_id[hits], return_index=True)
+        picked.append(hits[first])
+
+    idx = np.unique(np.concatenate(picked))
+    return x[idx], y[idx]
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: из каждой корзины берётся точка,
+    образующая наибольший треугольник с соседями. Цикл идёт по корзинам,
+    а не по точкам, поэтому стоимость ~ O(n)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return x, y
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    idx = np.empty(n_out, dtype=np.intp)
+    idx[0], idx[-1] = 0, n - 1
+
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        next_hi = edges[b + 2] if b + 2 < len(edges) else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        idx[b + 1] = a
+
+    return x[idx], y[idx]
+
+
+def bucket_mean(y, n_buckets):
+    """Средние значения по корзинам (для столбчатой диаграммы) и размеры корзин"""
+    y = np.asarray(y, dtype=float)
+    starts = bucket_starts(len(y), n_buckets)
+    sizes = np.diff(np.append(starts, len(y)))
+    return np.add.reduceat(y, starts) / sizes, starts, sizes
+
+
+def envelope(x, lo, hi, n_out):
+    """Огибающая полосы: минимум нижней и максимум верхней границы в каждой корзине"""
+    x = np.asarray(x, dtype=float)
+    lo = np.asarray(lo, dtype=float)
+    hi = np.asarray(hi, dtype=float)
+    if len(x) <= n_out:
+        return x, lo, hi
+    starts = bucket_starts(len(x), n_out)
+    return x[starts], np.minimum.reduceat(lo, starts), np.maximum.reduceat(hi, starts)
+
+
+def stacked_offsets(series):
+    """
+    Нижние границы слоёв для stacked-диаграммы: series — [слои × дни],
+    результат той же формы (накопленная сумма предыдущих слоёв)
+    """
+    stack = np.asarray(series, dtype=float)
+    return np.cumsum(stack, axis=0) - stack
+
+
+def animation_frames(n, duration_ms=ANIMATION_DURATION_MS, interval_ms=FRAME_INTERVAL_MS):
+    """
+    Конечные индексы кадров анимации: число кадров задаётся длительностью,
+    а не числом дней, поэтому длинные истории анимируются с пропуском кадров
+    """
+    n_frames = max(1, min(n, duration_ms // interval_ms))
+    return np.unique(np.linspace(0, n, n_frames + 1).astype(np.intp)[1:])
+
+
+def quantile_bands(runs, quantiles=(0.1, 0.5, 0.9)):
+    """Квантили ансамбля [прогоны × дни] по дням: (нижняя, медиана, верхняя)"""
+    return np.quantile(np.asarray(runs, dtype=float), quantiles, axis=0)
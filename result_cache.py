@@ -0,0 +1,132 @@
+# Начальные модули
+import os
+import json
+import hashlib
+from collections import OrderedDict
+from models import SCHOOL_CONFIG, DISEASE_CONFIG
+
+# Версия кода моделей и формата результата: при их изменении старые записи перестают подходить
+CACHE_VERSION = 2
+
+
+def stable_hash(obj):
+    """SHA-256 от JSON с отсортированными ключами: одинаковые настройки — одинаковый хэш"""
+    text = json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def config_hash():
+    """Хэш конфигурации школы и болезни, на которых строятся модели"""
+    return stable_hash({"school": SCHOOL_CONFIG, "disease": DISEASE_CONFIG})
+
+
+def file_hash(path):
+    """SHA-256 содержимого файла; None, если файла нет"""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def model_parameters(obj):
+    """Числовые и строковые атрибуты модели или популяции (beta, sigma, days, transmission…)"""
+    return {name: value for name, value in vars(obj).items()
+            if isinstance(value, (bool, int, float, str)) and not name.startswith("_")}
+
+
+class ResultCache:
+    """
+    Кэш результатов моделей по содержимому настроек: LRU в памяти и файлы
+    в cache_dir на диске, оба ограничены по размеру (байты JSON).
+    Ключ — хэш типа модели, её параметров, конфигурации, seed и CACHE_VERSION
+    """
+
+    def __init__(self, cache_dir="data/cache", max_memory_bytes=64 * 2**20, max_disk_bytes=512 * 2**20):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = OrderedDict()     # ключ -> (результат, размер)
+        self.memory_bytes = 0
+
+    @staticmethod
+    def make_key(model_type, parameters, config=None, seed=None):
+        return stable_hash({
+            "model": model_type,
+            "parameters": parameters,
+            "config": config if config is not None else config_hash(),
+            "seed": seed,
+            "version": CACHE_VERSION,
+        })
+
+    @classmethod
+    def key_for(cls, model, seed=None, schedule_path=None):
+        """
+        Ключ по построенной, ещё не запущенной модели: её параметры и параметры
+        популяции, хэш файла расписания мер schedule_path и seed
+        """
+        parameters = model_parameters(model)
+        population = getattr(model, "population", None)
+        if population is not None:
+            parameters["population"] = model_parameters(population)
+        if schedule_path is not None:
+            parameters["interventions"] = file_hash(schedule_path)
+        return cls.make_key(type(model).__name__, parameters, seed=seed)
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    # ---------
+
+    def get(self, key):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key][0]
+
+        path = self.path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(path)  # свежий доступ для вытеснения на диске
+        result = json.loads(text)
+        self._remember(key, result, len(text.encode("utf-8")))
+        return result
+
+    def put(self, key, result):
+        text = json.dumps(result, ensure_ascii=False, default=float)
+        self._remember(key, result, len(text.encode("utf-8")))
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = self.path(key) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, self.path(key))
+        self._evict_disk()
+
+    # ---------
+
+    def _remember(self, key, result, size):
+        if key in self.memory:
+            self.memory_bytes -= self.memory.pop(key)[1]
+        self.memory[key] = (result, size)
+        self.memory_bytes += size
+        while self.memory_bytes > self.max_memory_bytes and len(self.memory) > 1:
+            _, (_, old_size) = self.memory.popitem(last=False)
+            self.memory_bytes -= old_size
+
+    def _evict_disk(self):
+        """Удаляет самые давние по доступу файлы, пока кэш больше max_disk_bytes"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
@@ -0,0 +1,239 @@
+# Начальные модули
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from agent_engine import VectorPopulation, AGE_GROUPS, ROLES, STUDENT, TEACHER
+from batch_ode import run_seirs_batch
+from models import AgentBasedModel
+
+# Диапазоны параметров математической модели
+MATH_BOUNDS = {
+    "beta": (0.1, 0.4),
+    "epsilon": (0.1, 0.6),
+    "sigma": (1 / 3, 1.0),
+    "gamma": (1 / 10, 1 / 4),
+    "T_immunity": (30, 180),
+    "omega_v": (1 / 365, 1 / 90),
+}
+
+# Диапазоны параметров агентной модели: virus и таблицы Parameters
+AGENT_BOUNDS = {
+    "infection_probability": (0.01, 0.04),
+    "susceptibility_child": (1.0, 1.4),
+    "susceptibility_teen": (0.8, 1.2),
+    "susceptibility_adult": (0.7, 1.1),
+    "infectivity_student": (0.8, 1.2),
+    "infectivity_teacher": (0.9, 1.3),
+    "weight_student_student": (0.8, 1.2),
+    "weight_student_teacher": (1.0, 1.6),
+    "weight_teacher_teacher": (0.5, 0.9),
+}
+
+
+def scale(unit, bounds):
+    """Точки единичного куба [M × k] в диапазоны bounds"""
+    low = np.array([lo for lo, _ in bounds.values()])
+    high = np.array([hi for _, hi in bounds.values()])
+    return low + unit * (high - low)
+
+
+def peak_outputs(infected):
+    """Размер и день пика по траекториям заражённых [M × дни]"""
+    return {"peak": infected.max(axis=1), "peak_day": infected.argmax(axis=1).astype(float)}
+
+
+# =========================
+# ПЛАНЫ
+# =========================
+
+def saltelli_design(k, n, rng):
+    """
+    План Салтелли в единичном кубе: строки A (n), B (n) и AB_i (k × n),
+    где AB_i — A со столбцом i из B. Всего n × (k + 2) точек
+    """
+    A = rng.random((n, k))
+    B = rng.random((n, k))
+    AB = np.repeat(A[None], k, axis=0)
+    AB[np.arange(k), :, np.arange(k)] = B.T
+    return np.concatenate([A, B, AB.reshape(k * n, k)])
+
+
+def morris_design(k, r, rng, levels=4):
+    """
+    r траекторий Морриса по сетке из levels уровней: каждая из k + 1 точек,
+    на каждом шаге один фактор (в случайном порядке) растёт на delta
+    """
+    delta = levels / (2 * (levels - 1))
+    grid = np.arange(levels // 2) / (levels - 1)
+    base = rng.choice(grid, size=(r, k))
+    order = np.argsort(rng.random((r, k)), axis=1)
+
+    steps = np.zeros((r, k + 1, k))
+    steps[np.arange(r)[:, None], np.arange(1, k + 1)[None, :], order] = delta
+    points = base[:, None, :] + np.cumsum(steps, axis=1)
+    return points.reshape(r * (k + 1), k), order, delta
+
+
+# =========================
+# ИНДЕКСЫ
+# =========================
+
+def sobol_indices(y, k, n, n_boot=200, rng=None):
+    """
+    Индексы Соболя первого порядка (Saltelli 2010) и полные (Jansen)
+    с 95% доверительными интервалами по бутстрепу базовых строк
+    """
+    rng = rng or np.random.default_rng()
+    fA, fB = y[:n], y[n:2 * n]
+    fAB = y[2 * n:].reshape(k, n)
+
+    def estimate(rows):
+        a, b, ab = fA[rows], fB[rows], fAB[:, rows]
+        var = np.var(np.concatenate([a, b]))
+        if var == 0:
+            return np.zeros(k), np.zeros(k)
+        first = np.mean(b * (ab - a), axis=1) / var
+        total = 0.5 * np.mean((a - ab) ** 2, axis=1) / var
+        return first, total
+
+    S1, ST = estimate(np.arange(n))
+    boot = [estimate(rng.integers(0, n, n)) for _ in range(n_boot)]
+    S1_boot = np.array([b[0] for b in boot])
+    ST_boot = np.array([b[1] for b in boot])
+    return {
+        "S1": S1, "S1_conf": 1.96 * S1_boot.std(axis=0),
+        "ST": ST, "ST_conf": 1.96 * ST_boot.std(axis=0),
+    }
+
+
+def morris_indices(y, order, delta, n_boot=200, rng=None):
+    """mu* и sigma элементарных эффектов с доверительным интервалом mu* по бутстрепу траекторий"""
+    rng = rng or np.random.default_rng()
+    r, k = order.shape
+    y = y.reshape(r, k + 1)
+    effects = np.empty((r, k))
+    effects[np.arange(r)[:, None], order] = np.diff(y, axis=1) / delta
+
+    mu_star = np.abs(effects).mean(axis=0)
+    boot = np.array([np.abs(effects[rng.integers(0, r, r)]).mean(axis=0) for _ in range(n_boot)])
+    return {
+        "mu_star": mu_star, "mu_star_conf": 1.96 * boot.std(axis=0),
+        "mu": effects.mean(axis=0), "sigma": effects.std(axis=0, ddof=1) if r > 1 else np.zeros(k),
+    }
+
+
+# =========================
+# ОЦЕНКА МОДЕЛЕЙ
+# =========================
+
+def evaluate_math(samples, names, days=365, population_size=831):
+    """Все точки плана за один векторный прогон run_seirs_batch"""
+    params = {name: samples[:, j] for j, name in enumerate(names)}
+    return peak_outputs(run_seirs_batch(params, days, population_size)["I"])
+
+
+def apply_agent_parameters(pop, values):
+    """Переносит значения AGENT_BOUNDS в массивы популяции"""
+    if "infection_probability" in values:
+        pop.strains.infection_probability[0] = values["infection_probability"]
+
+    table = np.array([values.get(f"susceptibility_{g}", np.nan) for g in AGE_GROUPS])
+    known = ~np.isnan(table)
+    pop.susceptibility = np.where(known[pop.age_group], table[pop.age_group], pop.susceptibility)
+
+    table = np.array([values.get(f"infectivity_{r}", np.nan) for r in ROLES])
+    known = ~np.isnan(table)
+    pop.infectivity = np.where(known[pop.role], table[pop.role], pop.infectivity)
+
+    for (src, dst), name in (((STUDENT, STUDENT), "weight_student_student"),
+                             ((TEACHER, TEACHER), "weight_teacher_teacher")):
+        if name in values:
+            pop.contact_weight[src, dst] = values[name]
+    if "weight_student_teacher" in values:
+        pop.contact_weight[STUDENT, TEACHER] = values["weight_student_teacher"]
+        pop.contact_weight[TEACHER, STUDENT] = values["weight_student_teacher"]
+
+
+def run_agent_sample(args):
+    """Один прогон агентной модели в процессе пула: (пик, день пика)"""
+    values, days, seed, transmission, static = args
+    pop = VectorPopulation(seed=seed, transmission=transmission, static=static)
+    apply_agent_parameters(pop, values)
+    model = AgentBasedModel(0, days, population=pop)
+    model.run(lambda msg: None)
+    return model.max_infected, model.peak_day
+
+
+def evaluate_agent(samples, names, days=200, seed=None, n_workers=None, transmission="foi", static=None):
+    """
+    Точки плана в пуле процессов; у каждой точки свой независимый seed.
+    static — путь к файлу shared_population.save_static: все прогоны на одной
+    школе, статические массивы общие для процессов
+    """
+    seeds = np.random.SeedSequence(seed).spawn(len(samples))
+    tasks = [
+        ({name: float(row[j]) for j, name in enumerate(names)}, days, s, transmission, static)
+        for row, s in zip(samples, seeds)
+    ]
+    with ProcessPoolExecutor(max_workers=n_workers or os.cpu_count()) as pool:
+        results = np.array(list(pool.map(run_agent_sample, tasks, chunksize=max(1, len(tasks) // 64))))
+    return {"peak": results[:, 0].astype(float), "peak_day": results[:, 1].astype(float)}
+
+
+# =========================
+# АНАЛИЗ
+# =========================
+
+def analyze(model="math", method="sobol", n=1024, bounds=None, seed=None, n_boot=200, **evaluate_kwargs):
+    """
+    Глобальный анализ чувствительности пика и дня пика.
+    model — "math" (векторно) или "agent" (пул процессов), method — "sobol" или "morris";
+    n — базовый размер плана (строк Салтелли или траекторий Морриса).
+    Возвращает {выход: {параметр: {индекс: значение}}}
+    """
+    rng = np.random.default_rng(seed)
+    bounds = bounds or (MATH_BOUNDS if model == "math" else AGENT_BOUNDS)
+    names = list(bounds)
+    k = len(names)
+
+    if method == "sobol":
+        unit = saltelli_design(k, n, rng)
+    elif method == "morris":
+        unit, order, delta = morris_design(k, n, rng)
+    else:
+        raise ValueError(f"Неизвестный метод: {method}")
+
+    samples = scale(unit, bounds)
+    if model == "math":
+        outputs = evaluate_math(samples, names, **evaluate_kwargs)
+    elif model == "agent":
+        outputs = evaluate_agent(samples, names, seed=seed, **evaluate_kwargs)
+    else:
+        raise ValueError(f"Неизвестная модель: {model}")
+
+    report = {}
+    for output, y in outputs.items():
+        if method == "sobol":
+            indices = sobol_indices(y, k, n, n_boot, rng)
+        else:
+            indices = morris_indices(y, order, delta, n_boot, rng)
+        report[output] = {
+            name: {index: float(values[j]) for index, values in indices.items()}
+            for j, name in enumerate(names)
+        }
+    return report
+
+
+def format_report(report):
+    """Таблица индексов для вывода в лог"""
+    lines = []
+    for output, params in report.items():
+        lines.append(f"--- {output} ---")
+        for name, indices in params.items():
+            cells = ", ".join(f"{index}={value:.3f}" for index, value in indices.items())
+            lines.append(f"{name:>24}: {cells}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(format_report(analyze("math", "sobol", n=4096, seed=0)))
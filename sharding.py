@@ -0,0 +1,189 @@
+# Начальные модули
+import os
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from agent_engine import VectorPopulation, INFECTED, SUBJECT_TEACHERS
+from models import SCHOOL_CONFIG
+
+# Порядок счётчиков (состояния и заболевшие за день) в общем массиве
+COUNT_KEYS = ("S", "E", "I", "R", "V", "new_cases")
+HISTORY_KEYS = {"S": "healthy", "V": "vaccinated", "E": "exposed", "I": "infected", "R": "cured",
+                "new_cases": "new_cases"}
+
+
+def school_size(config):
+    """Число агентов школы так же, как его строит VectorPopulation"""
+    classes = config["classes"]
+    return sum(info["size"] for info in classes.values()) + len(classes) + SUBJECT_TEACHERS
+
+
+def replicate_school(config=SCHOOL_CONFIG, count=10):
+    """Синтетический город из count копий одной школы"""
+    return [config] * count
+
+
+def partition(sizes, n_shards):
+    """Жадное разбиение школ по процессам: крупные школы первыми, в наименее загруженный"""
+    load = np.zeros(n_shards)
+    shard_of = np.zeros(len(sizes), dtype=np.int64)
+    for school in np.argsort(sizes)[::-1]:
+        shard = int(np.argmin(load))
+        shard_of[school] = shard
+        load[shard] += sizes[school]
+    return shard_of
+
+
+def attach(name, shape, dtype):
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def run_shard(schools, configs, offsets, links, names, days, n_links, seeds, transmission, barrier):
+    """
+    Процесс-шард: ведёт свои школы, состояние агентов — срез общего блока state.
+    Раз в день читает входящее давление по межшкольным связям, пишет исходящее
+    в другой буфер и ждёт остальных на барьере
+    """
+    n_schools = len(configs)
+    blocks = []
+    try:
+        # подготовка тоже внутри try: её ошибка должна сломать барьер для остальных шардов
+        state_block, state = attach(names["state"], (offsets[-1],), np.int8)
+        blocks.append(state_block)
+        counts_block, counts = attach(names["counts"], (n_schools, days, len(COUNT_KEYS)), np.int32)
+        blocks.append(counts_block)
+        links_block, outgoing = attach(names["links"], (2, max(n_links, 1)), np.float64)
+        blocks.append(links_block)
+        link_school, link_agent, link_target = links
+
+        populations = {}
+        for school in schools:
+            pop = VectorPopulation(config=configs[school], seed=seeds[school], transmission=transmission)
+            view = state[offsets[school]:offsets[school + 1]]
+            view[:] = pop.state
+            pop.state = view
+            pop.seed_infections(5)
+            populations[school] = pop
+
+        own_links = {school: np.flatnonzero(link_school == school) for school in schools}
+        incoming = {school: np.flatnonzero(link_target == school) for school in schools}
+
+        for day in range(days):
+            read, write = outgoing[day % 2], outgoing[(day + 1) % 2]
+            for school, pop in populations.items():
+                pop.external_force = np.array([read[incoming[school]].sum()])
+                stats = pop.step_day()
+                counts[school, day] = [stats[key] for key in COUNT_KEYS]
+
+                idx = own_links[school]
+                agents = link_agent[idx]
+                infectious = pop.state[agents] == INFECTED
+                write[idx] = infectious * pop.infectivity[agents] * pop.strains.infection_probability[0]
+            barrier.wait()
+    except BaseException:
+        # сломанный барьер освобождает остальные шарды вместо вечного ожидания
+        barrier.abort()
+        raise
+    finally:
+        for block in blocks:
+            block.close()
+
+
+class ShardedSimulation:
+    """
+    Город из нескольких школ, разбитый по процессам (шардам) с общими массивами
+    в multiprocessing.shared_memory: состояние агентов, дневные счётчики по школам
+    и давление по межшкольным связям. Связь — предметник, который ведёт уроки
+    и в другой школе; его заразность раз в день передаётся школе-получателю.
+    Штаммы между шардами не согласуются, поэтому обмен идёт по базовому штамму
+    """
+
+    def __init__(self, configs, days, n_workers=None, seed=None, shared_teachers=0.1,
+                 transmission="foi"):
+        self.configs = list(configs)
+        self.days = days
+        self.n_workers = min(n_workers or os.cpu_count() or 1, len(self.configs))
+        self.transmission = transmission
+
+        sizes = np.array([school_size(c) for c in self.configs])
+        self.offsets = np.r_[0, np.cumsum(sizes)]
+        self.shard_of = partition(sizes, self.n_workers)
+
+        sequence = np.random.SeedSequence(seed)
+        rng = np.random.default_rng(sequence)
+        self.seeds = sequence.spawn(len(self.configs))
+        self.links = self._make_links(rng, shared_teachers)
+
+        self.history = {key: [] for key in HISTORY_KEYS.values()}
+        self.school_counts = None
+
+    def _make_links(self, rng, shared_teachers):
+        """Связи (школа, локальный номер учителя, школа-получатель)"""
+        n_schools = len(self.configs)
+        per_school = int(round(shared_teachers * SUBJECT_TEACHERS))
+        if n_schools < 2 or per_school == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty
+
+        school, agent, target = [], [], []
+        for s, config in enumerate(self.configs):
+            first_subject = school_size(config) - SUBJECT_TEACHERS
+            teachers = first_subject + rng.choice(SUBJECT_TEACHERS, per_school, replace=False)
+            other = rng.integers(0, n_schools - 1, per_school)
+            school.append(np.full(per_school, s))
+            agent.append(teachers)
+            target.append(other + (other >= s))
+        return np.concatenate(school), np.concatenate(agent), np.concatenate(target)
+
+    def run(self, log_callback):
+        n_schools = len(self.configs)
+        n_links = len(self.links[0])
+        blocks = {
+            "state": shared_memory.SharedMemory(create=True, size=int(self.offsets[-1])),
+            "counts": shared_memory.SharedMemory(
+                create=True, size=n_schools * self.days * len(COUNT_KEYS) * 4),
+            "links": shared_memory.SharedMemory(create=True, size=2 * max(n_links, 1) * 8),
+        }
+        names = {key: block.name for key, block in blocks.items()}
+        np.ndarray((2, max(n_links, 1)), dtype=np.float64, buffer=blocks["links"].buf)[:] = 0
+
+        try:
+            ctx = mp.get_context("spawn")
+            barrier = ctx.Barrier(self.n_workers)
+            workers = [
+                ctx.Process(
+                    target=run_shard,
+                    args=(np.flatnonzero(self.shard_of == shard), self.configs, self.offsets,
+                          self.links, names, self.days, n_links, self.seeds,
+                          self.transmission, barrier),
+                )
+                for shard in range(self.n_workers)
+            ]
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join()
+            if any(w.exitcode != 0 for w in workers):
+                raise RuntimeError("Один из шардов завершился с ошибкой")
+
+            counts = np.ndarray((n_schools, self.days, len(COUNT_KEYS)), dtype=np.int32,
+                                buffer=blocks["counts"].buf)
+            self.school_counts = counts.copy()
+        finally:
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+
+        totals = self.school_counts.sum(axis=0)
+        for j, key in enumerate(COUNT_KEYS):
+            self.history[HISTORY_KEYS[key]] = totals[:, j].tolist()
+
+        infected = totals[:, COUNT_KEYS.index("I")]
+        self.peak_day = int(np.argmax(infected))
+        self.max_infected = int(infected[self.peak_day])
+        log_callback(
+            f"Школ: {n_schools}, процессов: {self.n_workers}, агентов: {int(self.offsets[-1])}; "
+            f"пик {self.max_infected} заражённых на день {self.peak_day + 1}"
+        )
+        return self.history
@@ -0,0 +1,59 @@
+# Начальные модули
+import os
+import json
+import numpy as np
+
+# Статические массивы VectorPopulation: не меняются во время прогона и одинаковы
+# у всех прогонов одной школы. Остальное (состояние, иммунитет, меры) — у каждого своё
+STATIC_FIELDS = ("role", "age", "age_group", "class_idx", "is_homeroom", "susceptibility", "infectivity",
+                 "onset_group", "class_ptr", "class_members", "homeroom_of_class", "subject_teachers")
+
+# Выравнивание массивов в файле, байт
+ALIGNMENT = 64
+
+# Уже открытые файлы в этом процессе: задания пула открывают файл один раз
+_attached = {}
+
+
+def save_static(pop, path='data/shared/population.bin'):
+    """
+    Статические массивы популяции одним двоичным файлом и JSON-заголовок
+    рядом (тип, форма и смещение каждого массива), как DailyStream
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    header = {"class_ids": list(pop.class_ids), "n_students": int(pop.n_students), "n": int(pop.n), "fields": {}}
+    offset = 0
+    with open(path, 'wb') as f:
+        for name in STATIC_FIELDS:
+            array = np.ascontiguousarray(getattr(pop, name))
+            offset = -(-offset // ALIGNMENT) * ALIGNMENT
+            f.seek(offset)
+            f.write(array.tobytes())
+            header["fields"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += array.nbytes
+    with open(path + '.json', 'w', encoding='utf-8') as f:
+        json.dump(header, f)
+    _attached.pop(path, None)
+    return path
+
+
+def attach_static(path='data/shared/population.bin'):
+    """
+    Статические массивы из файла save_static: представления одного memmap
+    только для чтения. Страницы файла общие для всех процессов, которые его
+    открыли, поэтому у каждого процесса в памяти остаётся только своё состояние
+    """
+    if path in _attached:
+        return _attached[path]
+    with open(path + '.json', 'r', encoding='utf-8') as f:
+        header = json.load(f)
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    static = {"class_ids": header["class_ids"], "n_students": header["n_students"], "n": header["n"]}
+    for name, field in header["fields"].items():
+        dtype, shape = np.dtype(field["dtype"]), tuple(field["shape"])
+        if np.prod(shape) == 0:
+            static[name] = np.zeros(shape, dtype=dtype)
+            continue
+        static[name] = np.ndarray(shape, dtype=dtype, buffer=data, offset=field["offset"])
+    _attached[path] = static
+    return static
@@ -0,0 +1,89 @@
+# Начальные модули
+import numpy as np
+from models import virus
+
+
+class StrainPool:
+    """
+    Набор одновременно циркулирующих штаммов в виде массивов.
+    Штамм 0 — базовый, с параметрами синглтона virus.
+    cross[k, j] — защита от штамма k, которую даёт иммунитет к штамму j
+    """
+
+    def __init__(self, base=virus, capacity=4, max_strains=16,
+                 mutation_rate=0.0, similarity=0.7, beta_spread=0.1):
+        self.max_strains = max_strains
+        self.mutation_rate = mutation_rate      # вероятность мутации на одно новое заражение
+        self.similarity = similarity            # перекрёстная защита между родителем и потомком
+        self.beta_spread = beta_spread          # разброс заразности потомка (lognormal)
+
+        self.count = 0
+        self.capacity = 0
+        self.infection_probability = np.zeros(0)
+        self.time_incubation = np.zeros(0, dtype=np.int16)
+        self.base_duration = np.zeros(0, dtype=np.int16)
+        self.parent = np.zeros(0, dtype=np.int16)
+        self.born_day = np.zeros(0, dtype=np.int32)
+        self.cross = np.zeros((0, 0))
+        self._grow(capacity)
+
+        self.add(base.infection_probability, base.time_incubation, base.base_duration)
+
+    # ---------
+
+    def _grow(self, capacity):
+        def extend(arr):
+            out = np.zeros(capacity, dtype=arr.dtype)
+            out[:self.capacity] = arr
+            return out
+
+        self.infection_probability = extend(self.infection_probability)
+        self.time_incubation = extend(self.time_incubation)
+        self.base_duration = extend(self.base_duration)
+        self.parent = extend(self.parent)
+        self.born_day = extend(self.born_day)
+
+        cross = np.zeros((capacity, capacity))
+        cross[:self.capacity, :self.capacity] = self.cross
+        self.cross = cross
+        self.capacity = capacity
+
+    def add(self, infection_probability, time_incubation, base_duration, parent=-1, day=0):
+        """Добавляет штамм и возвращает его номер"""
+        if self.count == self.capacity:
+            self._grow(min(2 * self.capacity, self.max_strains))
+
+        k = self.count
+        self.infection_probability[k] = infection_probability
+        self.time_incubation[k] = time_incubation
+        self.base_duration[k] = base_duration
+        self.parent[k] = parent
+        self.born_day[k] = day
+        self.cross[k, k] = 1.0
+        if parent >= 0:
+            # потомок наследует перекрёстную защиту родителя с ослаблением
+            self.cross[k, :k] = self.similarity * self.cross[parent, :k]
+            self.cross[:k, k] = self.cross[k, :k]
+        self.count += 1
+        return k
+
+    def mutate(self, parent, rng, day=0):
+        """Порождает штамм-потомок; None, если достигнут max_strains"""
+        if self.count >= self.max_strains:
+            return None
+        beta = self.infection_probability[parent] * rng.lognormal(0.0, self.beta_spread)
+        return self.add(
+            min(beta, 1.0),
+            self.time_incubation[parent],
+            self.base_duration[parent],
+            parent=parent,
+            day=day,
+        )
+
+    def protection(self, strains, antibody):
+        """
+        Эффективный уровень защиты от штаммов strains при иммунитете antibody
+        ([агенты × штаммы]) — максимум по перекрёстно защищающим штаммам
+        """
+        k = self.count
+        return (antibody[:, :k] * self.cross[strains, :k]).max(axis=1)
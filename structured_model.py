@@ -0,0 +1,177 @@
+# Начальные модули
+import json
+import numpy as np
+from agent_engine import CONTACT_NOISE_MEAN, SUBJECT_TEACHERS
+from models import MathematicalModel, Parameters, SCHOOL_CONFIG, virus
+from utils import Utils
+
+
+def grade_susceptibility(grade):
+    """Средняя восприимчивость класса по равномерному распределению возрастов параллели"""
+    age_min, age_max = Utils.age_range_for_grade(grade)
+    ages = np.arange(age_min, age_max + 1)
+    groups = np.where(ages <= 10, "child", np.where(ages <= 18, "teen", "adult"))
+    return float(np.mean([Parameters.AGE_SUSCEPTIBILITY.value[g] for g in groups]))
+
+
+def school_groups(config=SCHOOL_CONFIG):
+    """
+    Группы структурированной модели: по одной на класс и общая группа учителей.
+    Возвращает имена, численности, восприимчивость, заразность и роли групп
+    """
+    classes = config["classes"]
+    names = list(classes) + ["teachers"]
+    sizes = np.array([classes[c]["size"] for c in classes] + [len(classes) + SUBJECT_TEACHERS], dtype=float)
+    susceptibility = np.array(
+        [grade_susceptibility(classes[c]["grade"]) for c in classes]
+        + [Parameters.AGE_SUSCEPTIBILITY.value["adult"]]
+    )
+    roles = ["student"] * len(classes) + ["teacher"]
+    infectivity = np.array([Parameters.ROLE_INFECTIVITY.value[r] for r in roles])
+    return names, sizes, susceptibility, infectivity, roles
+
+
+def contact_matrix(sizes):
+    """
+    Ожидаемое число контактов C[a, b] одного агента группы b с группой a в день
+    по правилам Population.get_daily_contacts (последняя группа — учителя):
+    ученик — 3 одноклассника (без себя), классный руководитель и 2 предметника;
+    учитель — свой класс (для классных руководителей) и 2 случайных класса
+    """
+    n_classes = len(sizes) - 1
+    class_sizes = sizes[:-1]
+    teachers = sizes[-1]
+
+    contacts = np.zeros((len(sizes), len(sizes)))
+    classmates = np.minimum(3, class_sizes) * (class_sizes - 1) / class_sizes
+    contacts[np.arange(n_classes), np.arange(n_classes)] = classmates
+    contacts[-1, :n_classes] = 1 + min(2, SUBJECT_TEACHERS)
+    contacts[:n_classes, -1] = class_sizes / teachers + min(2, n_classes) * class_sizes / n_classes
+    return contacts
+
+
+class StructuredMathematicalModel(MathematicalModel):
+    """
+    SEIRS по K группам (классы + учителя) с матрицей контактов K×K, построенной
+    из тех же таблиц Parameters и размеров классов, что и агентная модель.
+    Сила инфекции считается одним умножением матрицы на вектор в день.
+    Матрица отвечает beta по умолчанию; другое значение beta (калибровка,
+    анализ чувствительности) масштабирует её пропорционально
+    """
+
+    def __init__(self, population_size, days, config=SCHOOL_CONFIG):
+        super().__init__(population_size, days)
+        self.reference_beta = self.beta
+        names, sizes, susceptibility, infectivity, roles = school_groups(config)
+        self.groups = names
+        self.N = sizes * population_size / sizes.sum()
+
+        # transmission[a, b] — новые заражения в группе a на одного заражённого из b
+        # при полностью восприимчивой группе a
+        weights = np.array([
+            [Parameters.CONTACT_WEIGHT.value[(src, dst)] for src in roles]
+            for dst in roles
+        ])
+        self.contact_probability = virus.infection_probability * CONTACT_NOISE_MEAN
+        self.contacts = contact_matrix(sizes)
+        self.transmission = (
+            self.contact_probability * weights * self.contacts
+            * susceptibility[:, None] * infectivity[None, :]
+        )
+
+        # доля охвата групп вакцинацией (1 — вся группа участвует в кампании)
+        self.vaccination_weights = np.ones(len(names))
+
+        share = self.N / self.N.sum()
+        self.V = np.zeros(len(names))
+        self.E = round(population_size * 0.03) * share
+        self.I = round(population_size * 0.05) * share
+        self.R = np.zeros(len(names))
+        self.S = self.N - self.E - self.I - self.V
+
+        self.group_history = {'healthy': [], 'vaccinated': [], 'exposed': [], 'infected': [], 'cured': []}
+
+    def target_vaccination(self, groups):
+        """Вакцинация только указанных групп (имена классов или "teachers")"""
+        self.vaccination_weights = np.isin(self.groups, list(groups)).astype(float)
+
+    def transmission_matrix(self):
+        """Матрица передачи с учётом текущего beta"""
+        return self.transmission * (self.beta / self.reference_beta)
+
+    def basic_reproduction_number(self):
+        """Спектральный радиус матрицы следующего поколения при полностью восприимчивой популяции"""
+        return float(np.max(np.abs(np.linalg.eigvals(self.transmission_matrix() / self.gamma))))
+
+    def run(self, log_callback, day_callback=None):
+        share = self.N / self.N.sum()
+        transmission = self.transmission_matrix()
+
+        for day in range(self.days):
+            if self.stop_requested:
+                log_callback("Симуляция остановлена.")
+                break
+
+            season_factor = self.seasonal_factor(day)
+            if self.policy is not None:
+                activity_factor, vacc_rate_today = self.policy.factors(day)
+            else:
+                activity_factor = Utils.activity_factor(day)
+                vacc_rate_today = self.vaccination_campaign(day)
+            new_vaccinations = vacc_rate_today * self.vaccination_weights * self.S
+
+            # сила инфекции на одного восприимчивого в каждой группе
+            force = season_factor * activity_factor * (transmission @ self.I) / self.N
+            imported_exposed = 0.3 * season_factor * share
+
+            new_exposed = force * self.S
+            infected_vaccinated = self.epsilon * force * self.V
+            lost_immunity_v = self.omega_v * self.V
+            new_infected = self.sigma * self.E
+            new_recovered = self.gamma * self.I
+            back_to_susceptible = self.delta * self.R
+
+            self.S = np.maximum(self.S + back_to_susceptible - new_exposed - new_vaccinations + lost_immunity_v, 0)
+            self.V = np.maximum(self.V + new_vaccinations - infected_vaccinated - lost_immunity_v, 0)
+            self.E = np.maximum(self.E + new_exposed + infected_vaccinated - new_infected + imported_exposed, 0)
+            self.I = np.maximum(self.I + new_infected - new_recovered, 0)
+            self.R = np.maximum(self.R + new_recovered - back_to_susceptible, 0)
+
+            if self.policy is not None:
+                for message in self.policy.observe(day, new_infected.sum()):
+                    log_callback(message)
+
+            for key, values in zip(self.group_history, (self.S, self.V, self.E, self.I, self.R)):
+                self.group_history[key].append(values.copy())
+                self.history[key].append(int(values.sum()))
+
+            infected = self.history['infected'][-1]
+            if infected > self.max_infected:
+                self.max_infected = infected
+                self.peak_day = day
+
+            if day_callback:
+                day_callback(day, self.day_record())
+
+            log_callback(f"--- День {day+1} ---")
+            log_callback(
+                f"Здоровые: {int(self.S.sum())}, Вакцинированные: {int(self.V.sum())}, "
+                f"Подверженные: {int(self.E.sum())}, Заражённые: {infected}, Вылеченные: {int(self.R.sum())}"
+            )
+            log_callback(f"Новые заражённые: {int(new_infected.sum())}")
+
+        result = {
+            "meta": {
+                "population_size": self.population_size,
+                "days": self.days,
+                "peak_day": self.peak_day + 1,
+                "max_infected": self.max_infected,
+            },
+            "groups": self.groups,
+            "history": self.history,
+            "group_infected": np.asarray(self.group_history['infected']).round(2).tolist(),
+        }
+        with open(self.history_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=4)
+
+        return self.history
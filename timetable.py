@@ -0,0 +1,132 @@
+# Начальные модули
+import numpy as np
+from agent_engine import STUDENT, TEACHER
+
+# Параллели, которые делят коридор на переменах и смену в столовой
+GRADE_BANDS = ((1, 4), (5, 8), (9, 11))
+CANTEEN_SHIFTS = ((1, 5), (6, 11))
+
+
+def band_of(grade, bands):
+    for i, (lo, hi) in enumerate(bands):
+        if lo <= grade <= hi:
+            return i
+    raise ValueError(f"Параллель {grade} не попадает ни в одну группу")
+
+
+class Timetable:
+    """
+    Недельное расписание школы, заранее скомпилированное в массивы:
+    для каждого слота (урок, перемена, столовая) membership[слот] — номер группы
+    каждого агента (-1 — агента в слоте нет), contacts[слот] — ожидаемое число
+    контактов одного человека в своей группе за слот.
+    Заражение в слоте считается по силе инфекции группы (VectorPopulation.group_hazard),
+    поэтому стоимость слота — O(агентов) независимо от размера групп
+    """
+
+    def __init__(self, population, lessons_per_day=6, school_days=5, days_per_week=7,
+                 canteen_after=3, lesson_contacts=2.0, break_contacts=1.0,
+                 canteen_contacts=1.0, staffroom_contacts=2.0):
+        self.population = population
+        self.days_per_week = days_per_week
+        self.lesson_contacts = lesson_contacts
+        self.break_contacts = break_contacts
+        self.canteen_contacts = canteen_contacts
+        self.staffroom_contacts = staffroom_contacts
+
+        grades = np.array([population.config["classes"][c]["grade"] for c in population.class_ids])
+        self.class_band = np.array([band_of(g, GRADE_BANDS) for g in grades])
+        self.class_shift = np.array([band_of(g, CANTEEN_SHIFTS) for g in grades])
+
+        membership, n_groups, contacts, names = [], [], [], []
+        self.week = []
+        for weekday in range(days_per_week):
+            slots = []
+            if weekday < school_days:
+                for lesson in range(lessons_per_day):
+                    slots.append(self._add(membership, n_groups, contacts, names,
+                                           *self._lesson(weekday, lesson), f"урок {lesson + 1}"))
+                    if lesson == canteen_after - 1:
+                        slots.append(self._add(membership, n_groups, contacts, names,
+                                               *self._canteen(), "столовая"))
+                    elif lesson < lessons_per_day - 1:
+                        slots.append(self._add(membership, n_groups, contacts, names,
+                                               *self._break(), "перемена"))
+            self.week.append(np.array(slots, dtype=np.int64))
+
+        self.membership = np.array(membership, dtype=np.int32)
+        self.n_groups = np.array(n_groups, dtype=np.int64)
+        self.contacts = contacts
+        self.slot_names = names
+
+    # ---------
+
+    @staticmethod
+    def _add(membership, n_groups, contacts, names, group_of, count, slot_contacts, name):
+        membership.append(group_of)
+        n_groups.append(count)
+        contacts.append(slot_contacts)
+        names.append(name)
+        return len(membership) - 1
+
+    def _staffroom(self, group_of, staffroom):
+        """Учителя, не занятые в слоте, сидят в учительской"""
+        pop = self.population
+        idle = (pop.role == TEACHER) & (group_of < 0)
+        group_of[idle] = staffroom
+
+    def _lesson(self, weekday, lesson):
+        """
+        Урок: класс со своим учителем. Первый урок ведёт классный руководитель,
+        остальные — предметники по циклическому сдвигу (один учитель — один класс);
+        классам без свободного предметника урок ведёт классный руководитель
+        """
+        pop = self.population
+        n_classes = len(pop.class_ids)
+        group_of = np.full(pop.n, -1, dtype=np.int32)
+        group_of[pop.class_members] = pop.class_idx[pop.class_members]
+
+        teacher = pop.homeroom_of_class.copy()
+        if lesson > 0 and len(pop.subject_teachers):
+            pool = len(pop.subject_teachers)
+            covered = np.arange(min(n_classes, pool))
+            shift = 7 * lesson + 3 * weekday
+            teacher[covered] = pop.subject_teachers[(covered + shift) % pool]
+        group_of[teacher] = np.arange(n_classes)
+
+        self._staffroom(group_of, n_classes)
+        contacts = np.full(n_classes + 1, self.lesson_contacts)
+        contacts[-1] = self.staffroom_contacts
+        return group_of, n_classes + 1, contacts
+
+    def _by_class_group(self, class_group, n_bands):
+        pop = self.population
+        group_of = np.full(pop.n, -1, dtype=np.int32)
+        students = pop.role == STUDENT
+        group_of[students] = class_group[pop.class_idx[students]]
+        self._staffroom(group_of, n_bands)
+        return group_of
+
+    def _break(self):
+        """Перемена: ученики параллелей одного коридора вместе"""
+        n_bands = len(GRADE_BANDS)
+        contacts = np.full(n_bands + 1, self.break_contacts)
+        contacts[-1] = self.staffroom_contacts
+        return self._by_class_group(self.class_band, n_bands), n_bands + 1, contacts
+
+    def _canteen(self):
+        """Столовая: одна смена — одна группа"""
+        n_shifts = len(CANTEEN_SHIFTS)
+        contacts = np.full(n_shifts + 1, self.canteen_contacts)
+        contacts[-1] = self.staffroom_contacts
+        return self._by_class_group(self.class_shift, n_shifts), n_shifts + 1, contacts
+
+    # ---------
+
+    def slots(self, day):
+        """Номера слотов дня day"""
+        return self.week[day % self.days_per_week]
+
+    def slot(self, index):
+        """Членство в группах, число групп и контакты на человека по группам для слота"""
+        return self.membership[index], self.n_groups[index], self.contacts[index]
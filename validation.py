@@ -0,0 +1,297 @@
+# Начальные модули
+import os
+import sys
+import time
+import random
+import numpy as np
+from agent_engine import VectorPopulation, EXPOSED, INFECTED
+from batch_ode import run_seirs_batch
+from infection_tree import InfectionRecorder
+from interventions import MathPolicy
+from kernels import BACKENDS
+from models import AgentBasedModel, MathematicalModel, Person, Immunity, HealthState, SCHOOL_CONFIG
+from strains import StrainPool
+
+# Состояния Person в коды массива state
+STATE_CODES = {state: state.value for state in HealthState}
+
+
+# =========================
+# СТАТИСТИКА
+# =========================
+
+def ks_2samp(a, b):
+    """Двухвыборочный критерий Колмогорова–Смирнова: (D, асимптотическое p)"""
+    a, b = np.sort(a), np.sort(b)
+    grid = np.concatenate([a, b])
+    D = np.max(np.abs(
+        np.searchsorted(a, grid, side="right") / len(a) - np.searchsorted(b, grid, side="right") / len(b)
+    ))
+    en = np.sqrt(len(a) * len(b) / (len(a) + len(b)))
+    lam = (en + 0.12 + 0.11 / en) * D
+    k = np.arange(1, 101)
+    p = 2 * np.sum((-1) ** (k - 1) * np.exp(-2 * k ** 2 * lam ** 2))
+    return float(D), float(np.clip(p, 0, 1))
+
+
+def tolerance_band(reference, candidate, rel=0.1, z=3.0):
+    """Разница средних в пределах max(rel × среднее эталона, z стандартных ошибок)"""
+    diff = np.mean(candidate) - np.mean(reference)
+    se = np.sqrt(np.var(reference, ddof=1) / len(reference) + np.var(candidate, ddof=1) / len(candidate))
+    bound = max(rel * abs(np.mean(reference)), z * se)
+    return abs(diff) <= bound, float(diff), float(bound)
+
+
+# =========================
+# ДВИЖКИ
+# =========================
+
+def reference_engine(seed):
+    """Эталон: Population с засеянным модулем random"""
+    random.seed(seed)
+    model = AgentBasedModel(0, 0)
+    people = model.population.students + model.population.teachers
+    return model, lambda: np.array([p.state.value for p in people])
+
+
+def vector_engine(transmission="pairs", backend="numpy"):
+    def make(seed):
+        pop = VectorPopulation(seed=seed, transmission=transmission, backend=backend)
+        return AgentBasedModel(0, 0, population=pop), lambda: pop.state.copy()
+    return make
+
+
+ENGINES = {
+    "reference": reference_engine,
+    "vector-pairs": vector_engine("pairs"),
+    "vector-foi": vector_engine("foi"),
+}
+if "numba" in BACKENDS:
+    ENGINES["vector-pairs-numba"] = vector_engine("pairs", "numba")
+
+
+def run_metrics(make, seed, days):
+    """
+    Заражений на человека (attack rate, с повторными может быть больше 1), пик и день пика прогона.
+    Новое заражение — переход в E или I из другого состояния между днями,
+    поэтому метрика считается одинаково для любого движка по массиву состояний
+    """
+    model, states = make(seed)
+    model.days = days
+    sick = (EXPOSED, INFECTED)
+    before = states()
+    infections = np.count_nonzero(np.isin(before, sick))
+
+    def on_day(day, record):
+        nonlocal before, infections
+        now = states()
+        infections += np.count_nonzero(np.isin(now, sick) & ~np.isin(before, sick))
+        before = now
+
+    model.run(lambda msg: None, day_callback=on_day)
+    return {"attack_rate": infections / len(before), "peak": model.max_infected, "peak_day": model.peak_day}
+
+
+def collect(make, seeds, days):
+    runs = [run_metrics(make, seed, days) for seed in seeds]
+    return {name: np.array([r[name] for r in runs], dtype=float) for name in runs[0]}
+
+
+def compare_engines(candidates=None, seeds=range(40), days=120, alpha=0.01, rel=0.1):
+    """Сравнение распределений метрик кандидатов с эталоном: KS и полоса допуска"""
+    reference = collect(ENGINES["reference"], seeds, days)
+    rows = []
+    for name in candidates or [e for e in ENGINES if e != "reference"]:
+        sample = collect(ENGINES[name], [seed + 10_000 for seed in seeds], days)
+        for metric, ref in reference.items():
+            D, p = ks_2samp(ref, sample[metric])
+            in_band, diff, bound = tolerance_band(ref, sample[metric], rel)
+            rows.append({
+                "engine": name, "metric": metric, "reference": float(ref.mean()),
+                "candidate": float(sample[metric].mean()), "D": D, "p": p,
+                "diff": diff, "bound": bound, "ok": bool(p >= alpha and in_band),
+            })
+    return rows
+
+
+# =========================
+# ТОЧНЫЕ ПРОВЕРКИ
+# =========================
+
+def check_person_update(days=40, seed=0):
+    """
+    Person.update и VectorPopulation.update дают одинаковые переходы; иммунитет
+    популяции сравнивается по current_immunity, дни в R и V — по immunity_t0
+    """
+    pop = VectorPopulation(seed=seed)
+    n = pop.n
+    rng = np.random.default_rng(seed)
+    states = rng.choice(list(HealthState), n)
+    incubation = rng.integers(1, 6, n)
+    infectious = rng.integers(1, 11, n)
+    days_in_state = np.where(states == HealthState.SUSCEPTIBLE, 0, rng.integers(0, 5, n)).astype(np.int16)
+    antibody = rng.random(n).astype(np.float32)
+    memory = rng.random(n).astype(np.float32)
+    decay = rng.uniform(0.005, 0.05, n).astype(np.float32)
+
+    people = []
+    for i in range(n):
+        p = Person(id=i, role="student", age=10, state=states[i],
+                   incubation_period=int(incubation[i]), infectious_period=int(infectious[i]),
+                   immunity=Immunity(antibody_level=float(antibody[i]), memory_strength=float(memory[i]),
+                                     memory_decay_rate=float(decay[i])))
+        p.days_exposed = p.days_infected = p.days_since_recovery = p.days_since_vaccination = int(days_in_state[i])
+        people.append(p)
+
+    pop.state[:] = [STATE_CODES[s] for s in states]
+    pop.days_in_state[:] = days_in_state
+    pop.incubation_period[:] = incubation
+    pop.infectious_period[:] = infectious
+    pop.antibody[:, 0], pop.memory[:, 0] = antibody, memory
+    pop.memory_decay_rate = decay
+    pop.strain[:] = 0
+    # уровни на день 0; у R и V счётчик дней уже идёт
+    pop._schedule_waning(np.flatnonzero(pop.state == STATE_CODES[HealthState.RECOVERED]))
+    waning = np.isin(states, [HealthState.RECOVERED, HealthState.VACCINATED])
+
+    counter_of = {
+        HealthState.SUSCEPTIBLE: lambda p: 0,
+        HealthState.EXPOSED: lambda p: p.days_exposed,
+        HealthState.INFECTED: lambda p: p.days_infected,
+        HealthState.RECOVERED: lambda p: p.days_since_recovery,
+        HealthState.VACCINATED: lambda p: p.days_since_vaccination,
+    }
+    for _ in range(days):
+        for p in people:
+            p.update()
+        pop.update()
+        pop.day += 1
+
+    ref_state = np.array([STATE_CODES[p.state] for p in people])
+    ref_days = np.array([counter_of[p.state](p) for p in people])
+    ref_antibody = np.array([p.immunity.antibody_level for p in people])
+    ref_memory = np.array([p.immunity.memory_strength for p in people])
+    state = pop.state
+    lazy = np.isin(state, [STATE_CODES[HealthState.RECOVERED], STATE_CODES[HealthState.VACCINATED]])
+    since_t0 = pop.day - pop.immunity_t0 + np.where(waning & (pop.immunity_t0 == 0), days_in_state, 0)
+    antibody, memory = pop.current_immunity()
+    return bool(
+        np.array_equal(ref_state, state)
+        and np.array_equal(ref_days, np.where(lazy, since_t0, pop.days_in_state))
+        and np.allclose(ref_antibody, antibody[:, 0], rtol=1e-4, atol=1e-6)
+        and np.allclose(ref_memory, memory[:, 0], rtol=1e-4, atol=1e-6)
+    )
+
+
+def check_math_trajectories(days=365, population_size=831):
+    """MathematicalModel, та же модель с расписанием по умолчанию и run_seirs_batch совпадают точно"""
+    keys = {"healthy": "S", "vaccinated": "V", "exposed": "E", "infected": "I", "cured": "R"}
+    plain = MathematicalModel(population_size, days)
+    with_policy = MathematicalModel(population_size, days)
+    with_policy.policy = MathPolicy()
+    for model in (plain, with_policy):
+        model.history_file = os.devnull
+        model.run(lambda msg: None)
+    batch = run_seirs_batch({}, days, population_size)
+    return bool(
+        plain.history == with_policy.history
+        and all(np.array_equal(plain.history[key], batch[c].astype(int)) for key, c in keys.items())
+    )
+
+
+def check_determinism(days=60):
+    """Один seed — один прогон: у эталона (random.seed) и у векторного движка"""
+    ok = True
+    for make in ENGINES.values():
+        histories = []
+        for _ in range(2):
+            model, _ = make(7)
+            model.days = days
+            model.run(lambda msg: None)
+            histories.append(model.history)
+        ok &= histories[0] == histories[1]
+    return bool(ok)
+
+
+def check_backends(days=150, seeds=range(5), vaccination_day=30):
+    """
+    NumPy и Numba дают побитово одинаковый прогон: счётчики по дням, состояние
+    и иммунитет в конце (с мутациями штаммов и вакцинацией посреди прогона),
+    а в режиме foi — и одинаковый журнал заражений
+    """
+    if "numba" not in BACKENDS:
+        return None
+    for seed in seeds:
+        for transmission in ("pairs", "foi"):
+            runs = []
+            for backend in ("numpy", "numba"):
+                pop = VectorPopulation(seed=seed, strains=StrainPool(mutation_rate=0.01),
+                                       transmission=transmission, backend=backend)
+                pop.recorder = InfectionRecorder()
+                pop.seed_infections(5)
+                history = []
+                for day in range(days):
+                    if day == vaccination_day:
+                        pop.vaccinate_population(rate=0.3)
+                    history.append(tuple(pop.step_day()[c] for c in "SEIRV"))
+                runs.append((history, pop))
+            (a, pa), (b, pb) = runs
+            if a != b or not all(np.array_equal(getattr(pa, name), getattr(pb, name))
+                                 for name in ("state", "antibody", "memory")):
+                return False
+            if not np.array_equal(pa.recorder.records(), pb.recorder.records()):
+                return False
+    return True
+
+
+def check_recording_overhead(scale=64, days=60, repeats=3, limit=0.1):
+    """
+    Журнал заражений замедляет прогон foi (школа, увеличенная в scale раз,
+    ~50 тыс. агентов) не более чем на limit. Журнал не меняет прогон, поэтому
+    популяции с журналом и без идут вместе и дни чередуются — медленные
+    моменты машины достаются обеим; сравниваются лучшие суммы из repeats
+    """
+    config = dict(SCHOOL_CONFIG)
+    config["classes"] = {c: {**info, "size": info["size"] * scale} for c, info in SCHOOL_CONFIG["classes"].items()}
+
+    best_off, best_on = np.inf, np.inf
+    for _ in range(repeats):
+        pops = [VectorPopulation(config, seed=1, transmission="foi") for _ in range(2)]
+        pops[1].recorder = InfectionRecorder()
+        elapsed = [0.0, 0.0]
+        for pop in pops:
+            pop.seed_infections(50)
+        for _ in range(days):
+            for i, pop in enumerate(pops):
+                start = time.perf_counter()
+                pop.step_day()
+                elapsed[i] += time.perf_counter() - start
+        best_off, best_on = min(best_off, elapsed[0]), min(best_on, elapsed[1])
+    return best_on <= (1 + limit) * best_off
+
+
+def run_all(seeds=range(40), days=120):
+    """Все проверки; возвращает (строки отчёта, всё ли прошло)"""
+    lines, passed = [], True
+    for name, check in (("Person.update", check_person_update), ("MathematicalModel", check_math_trajectories),
+                        ("Детерминизм", check_determinism), ("NumPy/Numba", check_backends),
+                        ("Журнал заражений", check_recording_overhead)):
+        result = check()
+        status = "пропущено" if result is None else ("OK" if result else "ОШИБКА")
+        passed &= result is not False
+        lines.append(f"{name:>20}: {status}")
+
+    for row in compare_engines(seeds=seeds, days=days):
+        passed &= row["ok"]
+        lines.append(
+            f"{row['engine']:>20} {row['metric']:>12}: эталон {row['reference']:.3f}, "
+            f"кандидат {row['candidate']:.3f}, KS D={row['D']:.3f} p={row['p']:.3f}, "
+            f"Δ={row['diff']:+.3f} (допуск {row['bound']:.3f}) {'OK' if row['ok'] else 'ОШИБКА'}"
+        )
+    return lines, passed
+
+
+if __name__ == "__main__":
+    lines, passed = run_all()
+    print("\n".join(lines))
+    sys.exit(0 if passed else 1)